@@ -1,16 +1,45 @@
+import os
+import threading
+
 from flask import Flask
-from flask_socketio import SocketIO
 from flask_restx import Api
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from src.database.utils.setup import logger
+from src.database.utils.service import ensure_indexes_until_created
+from src.database.utils.change_streams import start_invalidation_bus
+from src.utils.log import configure_logging, init_request_logging
+from src.utils.metrics import init_request_metrics
+from src.sockets.events import socketio, start_presence_broadcast, start_outbound_queue_monitor
 from src.routes.auth_routes import auth_ns
-from src.routes.user_routes import user_ns
+from src.routes.user_routes import user_ns, users_ns
 from src.routes.general_routes import general_ns
 from src.routes.quest_routes import quest_ns, quests_ns
+from src.routes.metrics_routes import metrics_ns
+from src.routes.admin_routes import admin_ns
+
+configure_logging()
 
 app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*")
+init_request_logging(app)
+init_request_metrics(app)
+socketio.init_app(app)
+# nginx (.ebextensions/nginx.config) appends the address it received the request from to X-Forwarded-For.
+# Only the entries appended by this many trusted proxies are used for `request.remote_addr`, so clients
+# cannot pick their address (e.g. the admission control key) by sending the header. 0 when not proxied.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 1))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# Green thread under the eventlet worker, plain thread otherwise; startup does not wait for MongoDB.
+# Retried until it succeeds; the readiness probe fails until the indexes exist.
+threading.Thread(target=ensure_indexes_until_created, name="ensure-indexes", daemon=True).start()
+# Evicts cached quests and users changed by other workers or instances.
+start_invalidation_bus()
+# Sends changed quest player counts to the quest rooms at a fixed tick.
+start_presence_broadcast()
+start_outbound_queue_monitor()
 
 CORS(app, resources={r"/*": {"origins": "*"}}, allow_headers="*")
 
@@ -21,18 +50,9 @@ api = Api(app, version='1.0', title='MVP Quests API',
 
 api.add_namespace(auth_ns)
 api.add_namespace(user_ns)
+api.add_namespace(users_ns)
 api.add_namespace(quest_ns)
 api.add_namespace(quests_ns)
 api.add_namespace(general_ns)
-
-@socketio.on("progressUpdate")
-def handle_message(data):
-    """
-    Handles incoming messages and emits a userProgressUpdate event.
-
-    :param data: JSON object received from the client.
-    """
-    if isinstance(data, dict):
-        socketio.emit("userProgressUpdate", {"status": "success", "received": data})
-    else:
-        socketio.emit("userProgressUpdate", {"status": "error", "received": data})
+api.add_namespace(metrics_ns)
+api.add_namespace(admin_ns)
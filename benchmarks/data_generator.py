@@ -0,0 +1,172 @@
+"""
+Deterministic data generator for benchmarks.
+
+The same seed and parameters always produce the same users, quests, ratings and quest histories
+(including ObjectIds), so results of different commits are measured on identical data.
+"""
+import random
+import datetime
+from dataclasses import dataclass, field
+from typing import List
+
+from bson import ObjectId
+from werkzeug.security import generate_password_hash
+
+BENCHMARK_PASSWORD = "benchmark-password"
+_EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+
+
+@dataclass
+class DatasetConfig:
+    """
+    Attributes:
+    - users: Number of users.
+    - quests: Number of quests.
+    - levels_per_quest: Number of levels in each quest.
+    - ratings_per_quest: Average number of ratings per quest.
+    - history_per_user: Average number of quest history entries per user.
+    - skew: Zipf exponent of quest popularity (0 = uniform; higher = a few quests get most plays and ratings).
+    - seed: Random seed.
+    """
+    users: int = 200
+    quests: int = 50
+    levels_per_quest: int = 10
+    ratings_per_quest: int = 5
+    history_per_user: int = 10
+    skew: float = 1.1
+    seed: int = 42
+
+
+@dataclass
+class Dataset:
+    config: DatasetConfig
+    users: List[dict] = field(default_factory=list)
+    quests: List[dict] = field(default_factory=list)
+
+
+class _Generator:
+    def __init__(self, config: DatasetConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._object_id_counter = 0
+
+    def object_id(self) -> ObjectId:
+        # 4-byte timestamp + 8 seeded random bytes: unique, sortable and reproducible.
+        self._object_id_counter += 1
+        timestamp = int(_EPOCH.timestamp()) + self._object_id_counter
+        return ObjectId(timestamp.to_bytes(4, "big") + self.random.getrandbits(64).to_bytes(8, "big"))
+
+    def timestamp(self) -> datetime.datetime:
+        return _EPOCH + datetime.timedelta(seconds=self.random.randint(0, 365 * 24 * 3600))
+
+    def popularity_weights(self, count: int) -> List[float]:
+        return [1 / (rank ** self.config.skew) for rank in range(1, count + 1)]
+
+    def level(self, index: int) -> dict:
+        level_id = f"level-{index}"
+        picture_urls = [f"https://cdn.example.com/{self.random.getrandbits(64):016x}.png"
+                        for _ in range(self.random.randint(0, 2))]
+        if index % 2:
+            return {
+                "type": "input",
+                "id": level_id,
+                "name": f"Level {index}",
+                "question": f"Question {index} " + "lorem ipsum " * self.random.randint(2, 20),
+                "picture_urls": picture_urls,
+                "try_limit": self.random.randint(1, 5),
+            }
+        options = [{"text": f"Option {option}", "id": f"option-{option}"} for option in range(4)]
+        return {
+            "type": "quiz",
+            "id": level_id,
+            "name": f"Level {index}",
+            "question": f"Question {index} " + "lorem ipsum " * self.random.randint(2, 20),
+            "picture_urls": picture_urls,
+            "options": options,
+            "correct_option_id": self.random.choice(options)["id"],
+        }
+
+    def generate(self) -> Dataset:
+        config = self.config
+        dataset = Dataset(config=config)
+        password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+
+        for index in range(config.users):
+            dataset.users.append({
+                "_id": self.object_id(),
+                "name": f"User {index}",
+                "email": f"user{index}@benchmark.example.com",
+                "about_me": "",
+                "password": password_hash,
+                "created_at": self.timestamp(),
+                "profile_picture": None,
+                "created_quests": [],
+                "quest_history": [],
+            })
+
+        for index in range(config.quests):
+            creator = self.random.choice(dataset.users)
+            quest = {
+                "_id": self.object_id(),
+                "name": f"Quest {index}",
+                "title": f"Quest title {index}",
+                "description": "Benchmark quest " + "lorem ipsum " * self.random.randint(5, 50),
+                "time_limit": self.random.randint(60, 3600),
+                "created_at": self.timestamp(),
+                "difficulty": self.random.choice(["easy", "medium", "hard"]),
+                "main_picture": f"https://cdn.example.com/{self.random.getrandbits(64):016x}.png",
+                "created_by": creator["_id"],
+                "levels": [self.level(level) for level in range(config.levels_per_quest)],
+                "ratings": [],
+                "times_played": 0,
+                "avg_rating": None,
+            }
+            creator["created_quests"].append(quest["_id"])
+            dataset.quests.append(quest)
+
+        weights = self.popularity_weights(len(dataset.quests))
+
+        for _ in range(config.ratings_per_quest * len(dataset.quests)):
+            quest = self.random.choices(dataset.quests, weights=weights)[0]
+            quest["ratings"].append({
+                "user_id": self.random.choice(dataset.users)["_id"],
+                "rating": self.random.randint(1, 5),
+                "review": self.random.choice([None, "Nice quest", "Too hard", "Loved it"]),
+            })
+
+        for quest in dataset.quests:
+            if quest["ratings"]:
+                quest["avg_rating"] = round(sum(rating["rating"] for rating in quest["ratings"]) / len(quest["ratings"]), 1)
+
+        for user in dataset.users:
+            for _ in range(self.random.randint(0, 2 * config.history_per_user)):
+                quest = self.random.choices(dataset.quests, weights=weights)[0]
+                completed = self.random.random() < 0.7
+                quest["times_played"] += 1
+                user["quest_history"].append({
+                    "quest_id": quest["_id"],
+                    "result": self.random.randint(0, len(quest["levels"])) if completed else None,
+                    "completed": completed,
+                    "time_spent": self.random.randint(10, quest["time_limit"]),
+                    "attempted_at": self.timestamp(),
+                    "quest_summary": {
+                        "title": quest["title"],
+                        "difficulty": quest["difficulty"],
+                        "main_picture": quest["main_picture"],
+                        "level_count": len(quest["levels"]),
+                    },
+                })
+
+        return dataset
+
+
+def generate_dataset(config: DatasetConfig) -> Dataset:
+    return _Generator(config).generate()
+
+
+def seed_database(db, dataset: Dataset):
+    """Replaces the Users and Quests collections of `db` with the dataset."""
+    for collection_name, documents in (("Users", dataset.users), ("Quests", dataset.quests)):
+        db[collection_name].delete_many({})
+        if documents:
+            db[collection_name].insert_many([dict(document) for document in documents], ordered=False)
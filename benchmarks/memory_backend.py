@@ -0,0 +1,69 @@
+"""
+In-memory MongoDB stand-in (mongomock) for the benchmarks and tests.
+
+mongomock lags behind the PyMongo version the app uses, so the client returned here is patched where
+the two disagree: bulk writes accept the `sort=None` PyMongo 4.11 passes along with every update (and
+reject an actual sort, which mongomock cannot apply), expressions can use `$round`, and `create_indexes` rejects anything but a list, as PyMongo does.
+"""
+import functools
+
+import mongomock
+import pymongo.mongo_client
+from mongomock import aggregate
+from mongomock.collection import BulkOperationBuilder, Collection
+
+
+def _reject_sort(add_operation):
+    """Accepts the `sort` argument of PyMongo 4.11 bulk operations, raising if a sort is actually requested."""
+    @functools.wraps(add_operation)
+    def wrapper(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock cannot sort the documents of single-document bulk writes.")
+        return add_operation(self, *args, **kwargs)
+    return wrapper
+
+
+def _require_list(create_indexes):
+    @functools.wraps(create_indexes)
+    def wrapper(self, indexes, *args, **kwargs):
+        if not isinstance(indexes, list):
+            raise TypeError("indexes must be a list")
+        return create_indexes(self, indexes, *args, **kwargs)
+    return wrapper
+
+
+def _with_round(handle_arithmetic_operator):
+    """Evaluates `{"$round": [<number>, <places>]}` like MongoDB (half to even), on top of mongomock's operators."""
+    @functools.wraps(handle_arithmetic_operator)
+    def wrapper(self, operator, values):
+        if operator != "$round":
+            return handle_arithmetic_operator(self, operator, values)
+        number, places = list(self.parse_many(values)) if isinstance(values, list) else (self.parse(values), 0)
+        if number is None:
+            return None
+        return round(number, places or 0)
+    return wrapper
+
+
+def _patch_mongomock():
+    if getattr(BulkOperationBuilder.add_update, "__wrapped__", None) is not None:
+        return
+    BulkOperationBuilder.add_update = _reject_sort(BulkOperationBuilder.add_update)
+    BulkOperationBuilder.add_replace = _reject_sort(BulkOperationBuilder.add_replace)
+    Collection.create_indexes = _require_list(Collection.create_indexes)
+    aggregate.arithmetic_operators.add("$round")
+    aggregate._Parser._handle_arithmetic_operator = _with_round(aggregate._Parser._handle_arithmetic_operator)
+
+
+def install() -> mongomock.MongoClient:
+    """
+    Makes every `MongoClient` built from now on the same in-memory client.
+
+    Returns:
+        mongomock.MongoClient: The shared client.
+    """
+    _patch_mongomock()
+    shared_client = mongomock.MongoClient()
+    # setup.py binds this name at import time and builds the shared client from it on first use.
+    pymongo.mongo_client.MongoClient = lambda *client_args, **client_kwargs: shared_client
+    return shared_client
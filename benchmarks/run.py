@@ -0,0 +1,313 @@
+"""
+End-to-end benchmarks for the API and Socket.IO hub.
+
+Runs every scenario through the Flask test client against seeded data and prints
+p50/p95/p99 latency and throughput per scenario as JSON.
+
+Usage:
+    python -m benchmarks.run --backend memory --output results.json
+    python -m benchmarks.run --backend mongod --mongo-uri mongodb://localhost:27017 --compare baseline.json
+
+Backends:
+    memory  in-memory MongoDB stand-in (mongomock), no server needed
+    mongod  a real MongoDB server; the benchmark database is dropped and re-seeded
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+import subprocess
+from dataclasses import asdict
+from typing import Callable, Dict, List
+
+from benchmarks.data_generator import DatasetConfig, generate_dataset, seed_database, BENCHMARK_PASSWORD
+
+BENCHMARK_DB_NAME = "quest_benchmark"
+BENCHMARK_BUCKET = "quest-benchmark"
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Latency and throughput of the successful iterations; failed ones only count as `errors`."""
+    latencies = sorted(latencies)
+    to_ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "scenario": name,
+        "iterations": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": to_ms(percentile(latencies, 50)),
+        "p95_ms": to_ms(percentile(latencies, 95)),
+        "p99_ms": to_ms(percentile(latencies, 99)),
+        "mean_ms": to_ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def run_scenario(name: str, scenario: Callable[[int], bool], iterations: int, warmup: int) -> dict:
+    for iteration in range(warmup):
+        scenario(iteration)
+
+    latencies = []
+    errors = 0
+    started_at = time.perf_counter()
+    for iteration in range(warmup, warmup + iterations):
+        request_started_at = time.perf_counter()
+        ok = scenario(iteration)
+        if ok:
+            latencies.append(time.perf_counter() - request_started_at)
+        else:
+            errors += 1
+    return summarize(name, latencies, errors, time.perf_counter() - started_at)
+
+
+def _configure_environment(args):
+    os.environ["MONGO_DB_NAME"] = args.db_name
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("S3_BUCKET_RESOURCES", BENCHMARK_BUCKET)
+    os.environ.setdefault("S3_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("CLOUDFRONT_DISTRIBUTION", "https://cdn.example.com")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # All scenarios come from one client address; measure the handlers, not the rate limiter.
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+    if args.backend == "mongod":
+        os.environ["MONGO_URI"] = args.mongo_uri
+        return
+
+    try:
+        from benchmarks import memory_backend
+    except ImportError:
+        raise SystemExit("The memory backend needs mongomock: pip install -r benchmarks/requirements.txt")
+
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    memory_backend.install()
+
+
+def _start_s3_mock():
+    """Starts moto's S3 mock; returns None (upload scenario skipped) if moto is not installed."""
+    try:
+        from moto import mock_aws
+    except ImportError:
+        return None
+
+    mock = mock_aws()
+    mock.start()
+    import boto3
+    boto3.client("s3", region_name=os.environ["S3_REGION"]).create_bucket(Bucket=os.environ["S3_BUCKET_RESOURCES"])
+    return mock
+
+
+def build_scenarios(app_module, dataset, args) -> Dict[str, Callable[[int], bool]]:
+    from src.utils.helpers import generate_jwt_token
+
+    rng = random.Random(args.seed)
+    client = app_module.app.test_client()
+    users = dataset.users
+    quests = dataset.quests
+    tokens = {str(user["_id"]): generate_jwt_token(str(user["_id"])) for user in users}
+    weights = [1 / (rank ** dataset.config.skew) for rank in range(1, len(quests) + 1)]
+
+    def pick_user() -> str:
+        return str(rng.choice(users)["_id"])
+
+    def pick_quest() -> str:
+        return str(rng.choices(quests, weights=weights)[0]["_id"])
+
+    def auth(user_id: str) -> dict:
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    def signup(iteration: int) -> bool:
+        response = client.post("/auth/signup/email", json={
+            "name": f"Signup {iteration}",
+            "email": f"signup{args.seed}-{iteration}@benchmark.example.com",
+            "password": BENCHMARK_PASSWORD,
+        })
+        return response.status_code == 201
+
+    def login(iteration: int) -> bool:
+        user = rng.choice(users)
+        response = client.post("/auth/login/email", json={"email": user["email"], "password": BENCHMARK_PASSWORD})
+        return response.status_code == 200
+
+    def quests_list(iteration: int) -> bool:
+        return client.get("/quests", headers=auth(pick_user())).status_code == 200
+
+    def quest_detail(iteration: int) -> bool:
+        return client.get(f"/quest/{pick_quest()}", headers=auth(pick_user())).status_code == 200
+
+    def quest_detail_summary(iteration: int) -> bool:
+        return client.get(f"/quest/{pick_quest()}?levels=summary", headers=auth(pick_user())).status_code == 200
+
+    def quest_level(iteration: int) -> bool:
+        level_id = f"level-{iteration % dataset.config.levels_per_quest}"
+        return client.get(f"/quest/{pick_quest()}/levels/{level_id}", headers=auth(pick_user())).status_code == 200
+
+    def rate(iteration: int) -> bool:
+        response = client.patch(f"/quest/{pick_quest()}/rate", headers=auth(pick_user()),
+                                json={"rating": rng.randint(1, 5), "review": "Benchmark review"})
+        return response.status_code == 200
+
+    def history_write(iteration: int) -> bool:
+        user_id = pick_user()
+        response = client.patch(f"/user/{user_id}/quest_history", headers=auth(user_id), json={
+            "quest_id": pick_quest(),
+            "result": rng.randint(0, dataset.config.levels_per_quest),
+            "completed": True,
+            "time_spent": rng.randint(10, 600),
+        })
+        return response.status_code == 200
+
+    def history_read(iteration: int) -> bool:
+        user_id = pick_user()
+        return client.get(f"/user/{user_id}/quest_history", headers=auth(user_id)).status_code == 200
+
+    upload_payload = os.urandom(args.upload_size)
+
+    def upload(iteration: int) -> bool:
+        response = client.put("/general/upload", headers=auth(pick_user()),
+                              data={"files": (io.BytesIO(upload_payload), f"benchmark-{iteration}.png")},
+                              content_type="multipart/form-data")
+        return response.status_code == 200
+
+    socket_listeners = [app_module.socketio.test_client(app_module.app) for _ in range(args.socket_clients)]
+    socket_sender = app_module.socketio.test_client(app_module.app)
+
+    def socketio_fanout(iteration: int) -> bool:
+        socket_sender.emit("progressUpdate", {"user_id": pick_user(), "quest_id": pick_quest(), "level": iteration % 10})
+        delivered = all(listener.get_received() for listener in socket_listeners)
+        socket_sender.get_received()
+        return delivered
+
+    scenarios = {
+        "signup": signup,
+        "login": login,
+        "quests_list": quests_list,
+        "quest_detail": quest_detail,
+        "quest_detail_summary": quest_detail_summary,
+        "quest_level": quest_level,
+        "rate": rate,
+        "quest_history_write": history_write,
+        "quest_history_read": history_read,
+        "upload": upload,
+        "socketio_fanout": socketio_fanout,
+    }
+    return scenarios
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict) -> List[dict]:
+    baseline_by_name = {scenario["scenario"]: scenario for scenario in baseline.get("scenarios", [])}
+    deltas = []
+    for scenario in results["scenarios"]:
+        previous = baseline_by_name.get(scenario["scenario"])
+        if not previous or "p50_ms" not in previous or "p50_ms" not in scenario:
+            continue
+        delta = {"scenario": scenario["scenario"]}
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if previous[metric]:
+                delta[f"{metric}_change_pct"] = round((scenario[metric] - previous[metric]) / previous[metric] * 100, 1)
+        deltas.append(delta)
+    return deltas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "mongod"), default="memory")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default=BENCHMARK_DB_NAME)
+    parser.add_argument("--users", type=int, default=DatasetConfig.users)
+    parser.add_argument("--quests", type=int, default=DatasetConfig.quests)
+    parser.add_argument("--levels-per-quest", type=int, default=DatasetConfig.levels_per_quest)
+    parser.add_argument("--ratings-per-quest", type=int, default=DatasetConfig.ratings_per_quest)
+    parser.add_argument("--history-per-user", type=int, default=DatasetConfig.history_per_user)
+    parser.add_argument("--skew", type=float, default=DatasetConfig.skew)
+    parser.add_argument("--seed", type=int, default=DatasetConfig.seed)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--socket-clients", type=int, default=50)
+    parser.add_argument("--upload-size", type=int, default=64 * 1024, help="Upload size in bytes")
+    parser.add_argument("--scenario", action="append", help="Run only these scenarios (repeatable)")
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    _configure_environment(args)
+    s3_mock = _start_s3_mock()
+
+    import app as app_module
+    from src.database.utils.setup import get_client
+    client = get_client()
+
+    config = DatasetConfig(users=args.users, quests=args.quests, levels_per_quest=args.levels_per_quest,
+                           ratings_per_quest=args.ratings_per_quest, history_per_user=args.history_per_user,
+                           skew=args.skew, seed=args.seed)
+    dataset = generate_dataset(config)
+    if args.backend == "mongod":
+        client.drop_database(args.db_name)
+    seed_database(client[args.db_name], dataset)
+
+    scenarios = build_scenarios(app_module, dataset, args)
+    selected = args.scenario or list(scenarios)
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "socket_clients": args.socket_clients,
+            "dataset": asdict(config),
+        },
+        "scenarios": [],
+    }
+    for name in selected:
+        if name == "upload" and s3_mock is None:
+            results["scenarios"].append({"scenario": name, "skipped": "moto is not installed"})
+            continue
+        results["scenarios"].append(run_scenario(name, scenarios[name], args.iterations, args.warmup))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            results["comparison"] = compare(results, json.load(baseline_file))
+
+    if s3_mock is not None:
+        s3_mock.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+    failed = [scenario["scenario"] for scenario in results["scenarios"] if scenario.get("errors")]
+    if failed:
+        sys.stderr.write(f"Scenarios with failed iterations: {', '.join(failed)}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Socket.IO encoding benchmark: CPU time per broadcast and bytes per event, JSON vs MessagePack.
+
+A `socketio.Server` with the app's client manager gets `--connections` simulated clients (no sockets:
+Engine.IO sends are counted and dropped), and `userProgressUpdate` is broadcast to all of them. Setups:
+
+- `baseline`: the stock JSON-only manager, as before per-client codecs
+- `json`, `msgpack`, `mixed`: the app's manager (per-client codecs and outbound queue limits) with all, none
+  or half of the clients on JSON
+
+Bytes per event are reported for the trimmed event and for the old one that echoed the received payload.
+
+Usage:
+    python -m benchmarks.socketio_codec --connections 5000 --emits 200 --output socketio_codec.json
+"""
+import sys
+import json
+import time
+import argparse
+
+import socketio
+
+from src.sockets.backpressure import BackpressureManager
+from src.sockets.codec import NegotiatedPacket, MSGPACK, JSON, MsgPackPacket
+
+_UPDATE = {"user_id": "65f1c0ffee0000000000a001", "quest_id": "65f1c0ffee0000000000b002", "level": 3,
+           "score_delta": 10, "time_delta": 42}
+EVENTS = {
+    "trimmed": _UPDATE,
+    "echo": {"status": "success", "received": {**_UPDATE, "completed": False, "level_name": "The lighthouse",
+                                               "answer": "north"}},
+}
+SETUPS = {"baseline": None, "json": 0.0, "msgpack": 1.0, "mixed": 0.5}
+
+
+def build_server(connections: int, msgpack_share: float = None) -> socketio.Server:
+    """Returns a server with `connections` clients on `/`; `msgpack_share` None uses the stock manager."""
+    if msgpack_share is None:
+        server = socketio.Server(async_mode="threading")
+    else:
+        server = socketio.Server(async_mode="threading", serializer=NegotiatedPacket, client_manager=BackpressureManager())
+    msgpack_clients = int(connections * (msgpack_share or 0))
+    for index in range(connections):
+        eio_sid = f"eio-{index}"
+        codec = MSGPACK if index < msgpack_clients else JSON
+        server.environ[eio_sid] = {"QUERY_STRING": f"codec={codec}"}
+        server.manager.connect(eio_sid, "/")
+    return server
+
+
+def frame_size(eio_pkt) -> int:
+    """Size of the WebSocket frame payload: text frames carry the Engine.IO type prefix, binary frames do not."""
+    encoded = eio_pkt.encode()
+    return len(encoded.encode("utf-8") if isinstance(encoded, str) else encoded)
+
+
+def measure_bytes(codec: str, data: dict) -> int:
+    server = build_server(1, 1.0 if codec == MSGPACK else 0.0)
+    sizes = []
+    server.eio.send_packet = lambda eio_sid, eio_pkt: sizes.append(frame_size(eio_pkt))
+    server.emit("userProgressUpdate", data)
+    return sum(sizes)
+
+
+def measure_cpu(connections: int, emits: int, msgpack_share: float) -> dict:
+    server = build_server(connections, msgpack_share)
+    sent = 0
+
+    def send_packet(eio_sid, eio_pkt):
+        nonlocal sent
+        sent += 1
+
+    server.eio.send_packet = send_packet
+    started_at = time.process_time()
+    for _ in range(emits):
+        server.emit("userProgressUpdate", EVENTS["trimmed"])
+    elapsed = time.process_time() - started_at
+    return {
+        "cpu_us_per_emit": round(elapsed / emits * 1e6, 1),
+        "cpu_us_per_delivery": round(elapsed / emits / connections * 1e6, 3),
+        "packets_sent": sent,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.socketio_codec", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--emits", type=int, default=200)
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if MsgPackPacket is None:
+        raise SystemExit("msgpack is not installed (pip install -r benchmarks/requirements.txt).")
+
+    results = {
+        "connections": args.connections,
+        "emits": args.emits,
+        "bytes_per_event": {name: {codec: measure_bytes(codec, data) for codec in (JSON, MSGPACK)}
+                            for name, data in EVENTS.items()},
+        "cpu": {setup: measure_cpu(args.connections, args.emits, share) for setup, share in SETUPS.items()},
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
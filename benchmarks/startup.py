@@ -0,0 +1,100 @@
+"""
+Startup benchmark: import time of `app` and time to first request.
+
+Each run starts a fresh interpreter with `python -X importtime`, imports `app` and serves
+`GET /general/health` through the Flask test client. MongoDB and S3 are not needed: the
+clients are created lazily, so the default MONGO_URI points to a closed port on purpose.
+
+Usage:
+    python -m benchmarks.startup --runs 5 --budget-ms 1500 --output startup.json
+
+Exits with status 1 if the median import time exceeds `--budget-ms`.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import List
+
+_CHILD = """
+import json, sys, time
+started_at = time.perf_counter()
+import app
+imported_at = time.perf_counter()
+response = app.app.test_client().get("/general/health")
+served_at = time.perf_counter()
+sys.stdout.write(json.dumps({"import_s": imported_at - started_at, "first_request_s": served_at - started_at,
+                             "status": response.status_code}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Parses `-X importtime` lines into {"module", "self_us", "cumulative_us"} entries."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        modules.append({"module": module.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return modules
+
+
+def run_once(env: dict) -> dict:
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD],
+                               capture_output=True, text=True, env=env, check=False)
+    if completed.returncode != 0:
+        raise SystemExit(f"Startup run failed:\n{completed.stderr[-4000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["modules"] = parse_importtime(completed.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Maximum median import time of `app`")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules (self time) to report")
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    env.setdefault("MONGO_URI", "mongodb://localhost:1")
+    env.setdefault("MONGO_DB_NAME", "startup_benchmark")
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    env.setdefault("LOG_LEVEL", "CRITICAL")
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    to_ms = lambda seconds: round(seconds * 1000, 1)
+    import_ms = [to_ms(run["import_s"]) for run in runs]
+    first_request_ms = [to_ms(run["first_request_s"]) for run in runs]
+    slowest = sorted(runs[-1]["modules"], key=lambda module: module["self_us"], reverse=True)[:args.top]
+
+    median_import_ms = statistics.median(import_ms)
+    results = {
+        "runs": args.runs,
+        "import_ms": {"median": median_import_ms, "max": max(import_ms)},
+        "first_request_ms": {"median": statistics.median(first_request_ms), "max": max(first_request_ms)},
+        "budget_ms": args.budget_ms,
+        "within_budget": median_import_ms <= args.budget_ms,
+        "slowest_modules": [{"module": module["module"], "self_ms": round(module["self_us"] / 1000, 1)}
+                            for module in slowest],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+    if not results["within_budget"]:
+        sys.stderr.write(f"Median import time {median_import_ms} ms exceeds the budget of {args.budget_ms} ms.\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Maintenance commands.
+
+Usage:
+    python -m src.cli profiler-report --log slow_queries.jsonl [--no-explain]
+    python -m src.cli import-quests quests.ndjson [--batch-size 500]
+    python -m src.cli export-quests [--output quests.ndjson] [--batch-size 500]
+    python -m src.cli backfill-quest-summaries [--batch-size 500]
+    python -m src.cli rebuild-user-stats [--batch-size 500]
+    python -m src.cli watch-invalidations
+"""
+import sys
+import json
+import argparse
+
+
+def profiler_report(args):
+    from src.database.utils.profiler import load_entries, build_report, MONGO_PROFILER_LOG
+
+    log_path = args.log or MONGO_PROFILER_LOG
+    if not log_path:
+        raise SystemExit("No slow query log given. Use --log or set MONGO_PROFILER_LOG.")
+
+    client = None
+    if not args.no_explain:
+        from src.database.utils.setup import get_client
+        client = get_client()
+
+    report = build_report(load_entries(log_path), client=client)
+    print(json.dumps(report, indent=2, default=str))
+
+
+def import_quests(args):
+    from src.services.quest_transfer import import_quests_ndjson
+
+    with open(args.file, encoding="utf-8") as ndjson_file:
+        report = import_quests_ndjson(ndjson_file, batch_size=args.batch_size)
+    print(json.dumps(report, indent=2))
+
+
+def export_quests(args):
+    from src.services.quest_transfer import export_quests_ndjson
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        output.writelines(export_quests_ndjson(batch_size=args.batch_size))
+    finally:
+        if args.output:
+            output.close()
+
+
+def backfill_quest_summaries(args):
+    from src.services.user import backfill_quest_summaries
+
+    print(json.dumps(backfill_quest_summaries(batch_size=args.batch_size), indent=2))
+
+
+def rebuild_user_stats(args):
+    from src.services.user import rebuild_user_stats
+
+    print(json.dumps(rebuild_user_stats(batch_size=args.batch_size), indent=2))
+
+
+def watch_invalidations(args):
+    from src.utils.cache import CacheRegistry, DocumentCache
+    from src.database.utils.change_streams import InvalidationBus
+    from src.database.utils.collections import Collections
+
+    class PrintingRegistry(CacheRegistry):
+        def invalidate(self, collection_name, document_id, source="local"):
+            print(json.dumps({"invalidate": collection_name, "_id": str(document_id), "source": source}), flush=True)
+
+        def clear(self, collection_name=None, source="local"):
+            print(json.dumps({"clear": collection_name or "*", "source": source}), flush=True)
+
+    registry = PrintingRegistry()
+    for collection in (Collections.QUEST, Collections.USER):
+        registry.register(DocumentCache(collection.value.name, collection.value.name))
+
+    bus = InvalidationBus(registry=registry)
+    try:
+        bus.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("profiler-report", help="Summarize and explain slow MongoDB commands")
+    report_parser.add_argument("--log", help="Slow query log written by the profiler (default: MONGO_PROFILER_LOG)")
+    report_parser.add_argument("--no-explain", action="store_true", help="Do not connect to MongoDB to run explain")
+    report_parser.set_defaults(handler=profiler_report)
+
+    import_parser = subparsers.add_parser("import-quests", help="Import quests from an NDJSON file")
+    import_parser.add_argument("file", help="NDJSON file, one quest per line (plain or Extended JSON)")
+    import_parser.add_argument("--batch-size", type=int, default=500)
+    import_parser.set_defaults(handler=import_quests)
+
+    export_parser = subparsers.add_parser("export-quests", help="Export all quests as NDJSON")
+    export_parser.add_argument("--output", help="Output file (default: stdout)")
+    export_parser.add_argument("--batch-size", type=int, default=500)
+    export_parser.set_defaults(handler=export_quests)
+
+    backfill_parser = subparsers.add_parser("backfill-quest-summaries",
+                                            help="Store current quest summaries on all quest history entries")
+    backfill_parser.add_argument("--batch-size", type=int, default=500)
+    backfill_parser.set_defaults(handler=backfill_quest_summaries)
+
+    stats_parser = subparsers.add_parser("rebuild-user-stats", help="Recompute all user stats from quest history")
+    stats_parser.add_argument("--batch-size", type=int, default=500)
+    stats_parser.set_defaults(handler=rebuild_user_stats)
+
+    watch_parser = subparsers.add_parser("watch-invalidations",
+                                         help="Print the cache invalidations the change stream bus would apply")
+    watch_parser.set_defaults(handler=watch_invalidations)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Annotated, List, Literal, Optional, Union
 from bson import ObjectId
-from pydantic import BaseModel, Field, HttpUrl, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict
+
+from src.database.utils.types import HttpUrlStr
 
 class QuizOption(BaseModel):
     """
@@ -28,11 +30,11 @@ class QuizLevel(BaseModel):
     - options: A list of possible options for the quiz.
     - correct_option_id: The ID of the correct answer.
     """
-    type: str = Field("quiz", description="The type of the level")
+    type: Literal["quiz"] = Field("quiz", description="The type of the level")
     id: str = Field(..., description="Unique identifier for the quiz level")
     name: str = Field(..., description="Name or title of the quiz level")
     question: str = Field(..., description="The question text for the quiz")
-    picture_urls: List[HttpUrl] = Field(..., description="List of URLs for images related to the question")
+    picture_urls: List[HttpUrlStr] = Field(..., description="List of URLs for images related to the question")
     options: Optional[List[QuizOption]] = Field(..., description="List of options for the quiz question")
     correct_option_id: Optional[str] = Field(..., description="The ID of the correct quiz option")
 
@@ -49,13 +51,16 @@ class InputLevel(BaseModel):
     - picture_urls: A list of URLs for images associated with the question.
     - try_limit: The number of attempts allowed for the input level.
     """
-    type: str = Field("input", description="The type of the level")
+    type: Literal["input"] = Field("input", description="The type of the level")
     id: str = Field(..., description="Unique identifier for the input level")
     name: str = Field(..., description="Name or title of the input level")
     question: str = Field(..., description="The question text for the input level")
-    picture_urls: List[HttpUrl] = Field(..., description="List of URLs for images related to the question")
+    picture_urls: List[HttpUrlStr] = Field(..., description="List of URLs for images related to the question")
     try_limit: Optional[int] = Field(..., description="The number of attempts allowed for the input level")
 
+# Levels are told apart by their `type` instead of trying each union member in turn.
+Level = Annotated[Union[InputLevel, QuizLevel], Field(discriminator="type")]
+
 class QuestRating(BaseModel):
     """
     Schema for defining a user's rating of a quest.
@@ -72,7 +77,8 @@ class QuestRating(BaseModel):
 
     model_config = ConfigDict(
         extra='forbid',
-        arbitrary_types_allowed=True
+        arbitrary_types_allowed=True,
+        defer_build=True
     )
 
 class CreateQuest(BaseModel):
@@ -89,6 +95,7 @@ class CreateQuest(BaseModel):
     - main_picture: URL for the main picture of the quest.
     - created_by: ObjectId of the user who created the quest.
     - levels: A list of levels (input or quiz) for the quest.
+    - version: Incremented by every update; quests stored without it are at version 0.
     """
     name: str = Field(..., description="Name of the quest")
     title: str = Field(..., description="Title of the quest")
@@ -96,16 +103,18 @@ class CreateQuest(BaseModel):
     time_limit: int = Field(..., description="Time limit for completing the quest (in minutes)")
     created_at: datetime = Field(default_factory=lambda: datetime.now().astimezone(), description="Timestamp of when the quest was created")
     difficulty: str = Field(..., description="The difficulty level of the quest")
-    main_picture: Optional[HttpUrl] = Field(..., description="URL of the main picture for the quest")
+    main_picture: Optional[HttpUrlStr] = Field(..., description="URL of the main picture for the quest")
     created_by: ObjectId = Field(..., description="ObjectId of the user who created the quest")
-    levels: List[Union[InputLevel, QuizLevel]] = Field(default_factory=list, description="A list of levels in the quest (can be input or quiz levels)")
+    levels: List[Level] = Field(default_factory=list, description="A list of levels in the quest (can be input or quiz levels)")
     ratings: List[QuestRating] = Field(default_factory=list, description="A list of user ratings of the quiz")
     times_played: int = Field(default=0, description="Number of times the quest has been played")
     avg_rating: Union[float, None] = Field(default=0.0, description="Average rating of the quest, calculated from user ratings")
+    version: int = Field(default=0, description="Incremented by every update, for optimistic concurrency control")
 
     model_config = ConfigDict(
         extra='forbid',
-        arbitrary_types_allowed=True
+        arbitrary_types_allowed=True,
+        defer_build=True
     )
 
 
@@ -127,13 +136,75 @@ class UpdateQuest(BaseModel):
     description: Optional[str] = Field(..., description="Description of the quest")
     time_limit: Optional[int] = Field(..., description="Time limit for completing the quest (in seconds)")
     difficulty: Optional[str] = Field(..., description="The difficulty level of the quest")
-    main_picture: Optional[Union[HttpUrl, None]] = Field(..., description="URL of the main picture for the quest")
-    levels: Optional[List[Union[InputLevel, QuizLevel]]] = Field(default_factory=list, description="A list of levels in the quest (can be input or quiz levels)")
+    main_picture: Optional[Union[HttpUrlStr, None]] = Field(..., description="URL of the main picture for the quest")
+    levels: Optional[List[Level]] = Field(default_factory=list, description="A list of levels in the quest (can be input or quiz levels)")
     ratings: Optional[List[QuestRating]] = Field(default_factory=list, description="A list of user ratings of the quest")
     times_played: Optional[int] = Field(description="Number of times the quest has been played")
     avg_rating: Optional[float] = Field(default=0.0, description="Average rating of the quest, calculated from user ratings")
 
     model_config = ConfigDict(
         extra='forbid',
-        arbitrary_types_allowed=True
+        arbitrary_types_allowed=True,
+        defer_build=True
+    )
+
+
+class LevelUpdate(BaseModel):
+    """
+    Schema for changing fields of an existing level; only the given fields are written.
+
+    Attributes:
+    - id: ID of the level to change.
+    - name, question, picture_urls: Fields of any level.
+    - options, correct_option_id: Fields of quiz levels.
+    - try_limit: Field of input levels.
+    """
+    id: str = Field(..., description="ID of the level to change")
+    name: Optional[str] = Field(None, description="Name or title of the level")
+    question: Optional[str] = Field(None, description="The question text of the level")
+    picture_urls: Optional[List[HttpUrlStr]] = Field(None, description="List of URLs for images related to the question")
+    options: Optional[List[QuizOption]] = Field(None, description="List of options for the quiz question")
+    correct_option_id: Optional[str] = Field(None, description="The ID of the correct quiz option")
+    try_limit: Optional[int] = Field(None, description="The number of attempts allowed for the input level")
+
+    model_config = ConfigDict(extra='forbid')
+
+
+class LevelChanges(BaseModel):
+    """
+    Schema for changes to the levels of a quest.
+
+    Attributes:
+    - update: Field changes of existing levels.
+    - add: New levels, appended at the end.
+    - remove: IDs of levels to remove.
+    """
+    update: List[LevelUpdate] = Field(default_factory=list, description="Field changes of existing levels")
+    add: List[Level] = Field(default_factory=list, description="New levels, appended at the end")
+    remove: List[str] = Field(default_factory=list, description="IDs of levels to remove")
+
+    model_config = ConfigDict(extra='forbid')
+
+
+class QuestPatch(BaseModel):
+    """
+    Schema for a partial quest update; only the given fields are written.
+
+    Attributes:
+    - version: The version of the quest the changes are based on.
+    - name, title, description, time_limit, difficulty, main_picture: New values of quest fields.
+    - levels: Changes to the levels of the quest.
+    """
+    version: int = Field(..., ge=0, description="The version of the quest the changes are based on")
+    name: Optional[str] = Field(None, description="Name of the quest")
+    title: Optional[str] = Field(None, description="Title of the quest")
+    description: Optional[str] = Field(None, description="Description of the quest")
+    time_limit: Optional[int] = Field(None, description="Time limit for completing the quest (in minutes)")
+    difficulty: Optional[str] = Field(None, description="The difficulty level of the quest")
+    main_picture: Optional[HttpUrlStr] = Field(None, description="URL of the main picture for the quest")
+    levels: Optional[LevelChanges] = Field(None, description="Changes to the levels of the quest")
+
+    model_config = ConfigDict(
+        extra='forbid',
+        defer_build=True
     )
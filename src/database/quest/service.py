@@ -1,15 +1,18 @@
 import os
+from typing import List, Union
 from bson import ObjectId
 from bson.errors import InvalidId
 
 from src.utils.helpers import upload_to_s3
 from src.database.quest.schema import QuestRating
 from src.database.utils.collections import Collections
-from src.database.utils.service import read, logger, update_records, custom_update_records, aggregate
+from src.database.utils.setup import STALE_OK_READ_PREFERENCE, ReadPreferenceMode
+from src.database.utils.service import read, iter_read, logger, update_records, conditional_update, aggregate, \
+    custom_update_records
 
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 
-def find_quest_by_id(quest_id: str) -> dict:
+def find_quest_by_id(quest_id: str, projection: dict = None) -> dict:
     try:
         quest_id_obj = ObjectId(quest_id)
     except InvalidId as e:
@@ -20,26 +23,115 @@ def find_quest_by_id(quest_id: str) -> dict:
                 collection_name="Quests",
                 query={"_id": quest_id_obj},
                 find_one=True,
-                exclude_id=False)
+                exclude_id=False,
+                projection=projection)
 
-def find_all_quests():
+# Fields copied into quest history entries; only level ids are read to count the levels.
+QUEST_SUMMARY_SOURCE_PROJECTION = {"title": 1, "difficulty": 1, "main_picture": 1, "levels.id": 1}
 
+def build_quest_summary(quest: dict) -> dict:
+    return {
+        "title": quest.get("title"),
+        "difficulty": quest.get("difficulty"),
+        "main_picture": quest.get("main_picture"),
+        "level_count": len(quest.get("levels") or []),
+    }
+
+def find_quest_summary(quest_id: Union[str, ObjectId]) -> dict:
+    """
+    Returns the summary of a quest stored on quest history entries, or None if the quest does not exist.
+    """
+    quest = find_quest_by_id(quest_id, projection=QUEST_SUMMARY_SOURCE_PROJECTION)["result"]
+    return build_quest_summary(quest) if quest else None
+
+def find_quest_level(quest_id: str, level_id: str) -> dict:
+    """Reads a single level of a quest; `$elemMatch` makes the server return only that array element."""
+    try:
+        quest_id_obj = ObjectId(quest_id)
+    except InvalidId as e:
+        logger.error("Invalid ObjectId.")
+        raise e
+
+    return read(db_name=MONGO_DB_NAME,
+                collection_name="Quests",
+                query={"_id": quest_id_obj},
+                find_one=True,
+                exclude_id=False,
+                projection={"levels": {"$elemMatch": {"id": level_id}}})
+
+def find_quests_by_ids(quest_ids: List[ObjectId], projection: dict = None) -> dict:
+    """Reads several quests with a single `$in` query, in no particular order."""
     return read(db_name=MONGO_DB_NAME,
                 collection_name="Quests",
-                query={},
+                query={"_id": {"$in": quest_ids}},
                 find_one=False,
-                exclude_id=False)
+                exclude_id=False,
+                projection=projection,
+                read_preference=STALE_OK_READ_PREFERENCE)
+
+def iter_all_quests(batch_size: int = None, projection: dict = None, read_preference: ReadPreferenceMode = STALE_OK_READ_PREFERENCE):
+    return iter_read(db_name=MONGO_DB_NAME,
+                     collection_name="Quests",
+                     query={},
+                     exclude_id=False,
+                     batch_size=batch_size,
+                     projection=projection,
+                     read_preference=read_preference)
+
+def add_new_rating(_id: ObjectId, rating: dict):
+    """
+    Appends `rating` and recomputes `avg_rating` from the stored ratings in one atomic update,
+    so concurrent ratings of the same quest cannot overwrite each other's average.
+
+    Raises:
+        NotFoundError: If the quest does not exist.
+
+    Returns:
+        dict: Update result; "result" holds the quest `_id` and its new `avg_rating`.
+    """
+    custom_query = [
+        # `$literal` keeps user-provided strings (e.g. a review starting with "$") from being read as expressions.
+        {"$set": {"ratings": {"$concatArrays": [{"$ifNull": ["$ratings", []]}, {"$literal": [rating]}]}}},
+        {"$set": {"avg_rating": {"$avg": "$ratings.rating"}}},
+        {"$set": {"avg_rating": {"$round": ["$avg_rating", 1]}}},
+    ]
+    return conditional_update(collection=Collections.QUEST,
+                              query={"_id": _id},
+                              update=custom_query,
+                              projection={"avg_rating": 1},
+                              validate_with=QuestRating,
+                              validate_dict=rating)
+
+# What explains a failed conditional quest update: owner, version and which levels exist.
+QUEST_UPDATE_STATE_PROJECTION = {"created_by": 1, "version": 1, "levels.id": 1, "levels.type": 1}
+
+def version_condition(version: int) -> dict:
+    # Quests stored before versioning have no `version` field and are at version 0.
+    return {"version": version} if version else {"version": {"$in": [0, None]}}
+
+def update_quest_document(quest_id: ObjectId,
+                          user_id: ObjectId,
+                          version: int,
+                          update: dict,
+                          conditions: List[dict] = None,
+                          array_filters: List[dict] = None) -> dict:
+    """
+    Applies `update` to a quest of `user_id` if it is still at `version` and matches `conditions`,
+    and increments the version in the same write.
+
+    Raises:
+        NotFoundError: If no quest matches (missing, other owner, other version or unmet conditions).
+        UpdateError: If update operation fails.
+    """
+    query_filter = {"created_by": user_id, **version_condition(version)}
+    if conditions:
+        query_filter["$and"] = conditions
 
-def add_new_rating(_id: ObjectId, rating: dict, avg_rating: float):
-    custom_query = {
-        "$push": {"ratings": rating},
-        "$set": {"avg_rating": avg_rating}
-    }
     return custom_update_records(collection=Collections.QUEST,
-                                 _id=_id,
-                                 custom_query=custom_query,
-                                 validate_with=QuestRating,
-                                 validate_dict=rating)
+                                 _id=quest_id,
+                                 custom_query={**update, "$inc": {"version": 1}},
+                                 query_filter=query_filter,
+                                 array_filters=array_filters)
 
 def get_quest_ratings_full_info(quest_id: str):
     if isinstance(quest_id, str):
@@ -53,6 +145,7 @@ def get_quest_ratings_full_info(quest_id: str):
 
     pipeline = [
         {"$match": {"_id": quest_id_obj}},
+        {"$project": {"_id": 0, "ratings": 1}},
         {"$unwind": "$ratings"},
         {"$lookup": {
             "from": "Users",
@@ -72,4 +165,5 @@ def get_quest_ratings_full_info(quest_id: str):
     ]
 
     return aggregate(collection=Collections.QUEST,
-                     pipeline=pipeline)
\ No newline at end of file
+                     pipeline=pipeline,
+                     read_preference=STALE_OK_READ_PREFERENCE)
\ No newline at end of file
@@ -1,7 +1,25 @@
 from datetime import datetime
 from typing import List, Optional, Union
 from bson import ObjectId
-from pydantic import BaseModel, Field, HttpUrl, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict
+
+from src.database.utils.types import HttpUrlStr
+
+class QuestSummary(BaseModel):
+    """
+    Copy of the quest fields shown in quest history, stored on each history entry so reading
+    the history needs no join. Refreshed in the background when the quest changes.
+
+    Attributes:
+    - title: A title of the quest
+    - difficulty: The difficulty level of the quest
+    - main_picture: URL of the main picture of the quest
+    - level_count: Number of levels in the quest
+    """
+    title: Optional[str] = None
+    difficulty: Optional[str] = None
+    main_picture: Optional[str] = None
+    level_count: int = 0
 
 class QuestHistory(BaseModel):
     """
@@ -14,11 +32,13 @@ class QuestHistory(BaseModel):
     - time_spent: Time spent on the quest (in seconds or any unit)
     - rating: Rating the user gave to the quest (if any)
     - attempted_at: Timestamp for when the quest was attempted
+    - quest_summary: Denormalized quest fields shown with the entry
     """
     quest_id: str
     result: Optional[int] = None
     completed: bool = False
     time_spent: Optional[int] = None
+    quest_summary: Optional[QuestSummary] = None
     attempted_at: datetime = Field(default_factory=lambda: datetime.now().astimezone(), description="Timestamp of account creation")
 
 class CreateUser(BaseModel):
@@ -41,13 +61,14 @@ class CreateUser(BaseModel):
     about_me: str = Field(..., description="User About me info")
     password: str = Field(..., description="User password hash")
     created_at: datetime = Field(default_factory=lambda: datetime.now().astimezone(), description="Timestamp of account creation")
-    profile_picture: Union[HttpUrl, None] = Field(..., description="User profile picture S3 url")
+    profile_picture: Union[HttpUrlStr, None] = Field(..., description="User profile picture S3 url")
     created_quests: List[ObjectId] = Field(default_factory=list, description="List of quests created by the user")
     quest_history: List[QuestHistory] = Field(default_factory=list, description="History of quests attempted by the user")
 
     model_config = ConfigDict(
         extra='forbid',
-        arbitrary_types_allowed=True
+        arbitrary_types_allowed=True,
+        defer_build=True
     )
 
 class UpdateUser(BaseModel):
@@ -70,7 +91,7 @@ class UpdateUser(BaseModel):
     id: ObjectId = Field(..., description="User unique ObjectId in string format", alias="_id")
     name: Optional[str] = Field(None, description="User name")
     about_me: Optional[str] = Field(None, description="User About me info")
-    profile_picture: Optional[HttpUrl] = Field(None, description="User profile picture S3 url")
+    profile_picture: Optional[HttpUrlStr] = Field(None, description="User profile picture S3 url")
     created_quests: Optional[List[ObjectId]] = Field(default_factory=list,
                                                      description="List of quests created by the user")
     quest_history: Optional[List[QuestHistory]] = Field(default_factory=list,
@@ -79,3 +100,4 @@ class UpdateUser(BaseModel):
     class Config:
         extra = 'forbid'
         arbitrary_types_allowed = True
+        defer_build = True
@@ -1,23 +1,31 @@
 import os
 import datetime
-from typing import Union
+from typing import List, Union
 from bson import ObjectId
 from bson.errors import InvalidId
 
 from src.utils.helpers import upload_to_s3
+from src.utils.exceptions import NotFoundError
 from src.database.utils.collections import Collections
-from src.database.utils.service import read, logger, update_records, aggregate
+from src.database.utils.setup import STALE_OK_READ_PREFERENCE
+from src.database.user_stats.service import increment_user_stats, history_entry_increments
+from src.database.utils.service import read, exists, logger, update_records, conditional_update, update_many_records
 
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 
-def find_user_by_email(user_email: str) -> dict:
+def find_user_by_email(user_email: str, projection: dict = None) -> dict:
     return read(db_name=MONGO_DB_NAME,
                 collection_name="Users",
                 query={"email": user_email},
                 find_one=True,
-                exclude_id=False)
+                exclude_id=False,
+                projection=projection)
 
-def find_user_by_id(user_id: str) -> dict:
+def user_exists(user_id: ObjectId) -> bool:
+    return exists(collection=Collections.USER,
+                  query={"_id": user_id})
+
+def find_user_by_id(user_id: str, projection: dict = None) -> dict:
     try:
         user_id_obj = ObjectId(user_id)
     except InvalidId as e:
@@ -28,7 +36,18 @@ def find_user_by_id(user_id: str) -> dict:
                 collection_name="Users",
                 query={"_id": user_id_obj},
                 find_one=True,
-                exclude_id=False)
+                exclude_id=False,
+                projection=projection)
+
+def find_users_by_ids(user_ids: List[ObjectId], projection: dict = None) -> dict:
+    """Reads several users with a single `$in` query, in no particular order."""
+    return read(db_name=MONGO_DB_NAME,
+                collection_name="Users",
+                query={"_id": {"$in": user_ids}},
+                find_one=False,
+                exclude_id=False,
+                projection=projection,
+                read_preference=STALE_OK_READ_PREFERENCE)
 
 def update_user_info(user_id: Union[str, ObjectId],
                      data: dict,
@@ -61,7 +80,28 @@ def update_user_info(user_id: Union[str, ObjectId],
 
     return result
 
+def _history_entry_info(entry: dict) -> dict:
+    summary = entry.get("quest_summary") or {}
+    return {
+        "quest_id": entry.get("quest_id"),
+        "quest_title": summary.get("title"),
+        "quest_difficulty": summary.get("difficulty"),
+        "quest_main_picture": summary.get("main_picture"),
+        "result": entry.get("result"),
+        "completed": entry.get("completed"),
+        "time_spent": entry.get("time_spent"),
+        "attempted_at": entry.get("attempted_at"),
+        "user_rating": entry.get("rating"),
+        "quest_total_levels": summary.get("level_count"),
+    }
+
 def get_user_quest_history_full_info(user_id: Union[str, ObjectId]):
+    """
+    Reads a user's quest history with the quest summaries stored on each entry (no join with Quests).
+
+    Raises:
+        NotFoundError: If the user does not exist.
+    """
     if isinstance(user_id, str):
         try:
             user_id_obj = ObjectId(user_id)
@@ -71,36 +111,27 @@ def get_user_quest_history_full_info(user_id: Union[str, ObjectId]):
     else:
         user_id_obj = user_id
 
-    pipeline = [
-        {"$match": {"_id": user_id_obj}},
-        {"$unwind": "$quest_history"},
-        {"$lookup": {
-            "from": "Quests",
-            "localField": "quest_history.quest_id",
-            "foreignField": "_id",
-            "as": "quest_details"
-        }},
-        {"$unwind": "$quest_details"},
-        {"$project": {
-            "_id": 0,
-            "quest_id": "$quest_history.quest_id",
-            "quest_title": "$quest_details.title",
-            "quest_difficulty": "$quest_details.difficulty",
-            "quest_main_picture": "$quest_details.main_picture",
-            "result": "$quest_history.result",
-            "completed": "$quest_history.completed",
-            "time_spent": "$quest_history.time_spent",
-            "attempted_at": "$quest_history.attempted_at",
-            "user_rating": "$quest_history.rating",
-            "quest_total_levels": {"$size": "$quest_details.levels"}  # Count levels array length
-        }}
-    ]
-
-    return aggregate(collection=Collections.USER,
-                     pipeline=pipeline)
+    user = read(db_name=MONGO_DB_NAME,
+                collection_name="Users",
+                query={"_id": user_id_obj},
+                find_one=True,
+                projection={"quest_history": 1},
+                read_preference=STALE_OK_READ_PREFERENCE)["result"]
+    if user is None:
+        raise NotFoundError()
+
+    return [_history_entry_info(entry) for entry in user.get("quest_history", [])]
+
+def refresh_quest_history_summaries(quest_id: ObjectId, quest_summary: dict) -> dict:
+    """Overwrites the stored summary of `quest_id` on every history entry of every user (indexed by quest id)."""
+    return update_many_records(collection=Collections.USER,
+                               query={"quest_history.quest_id": quest_id},
+                               update={"$set": {"quest_history.$[entry].quest_summary": quest_summary}},
+                               array_filters=[{"entry.quest_id": quest_id}])
 
 def add_new_user_quest_history(user_id: Union[str, ObjectId],
-                              data: dict):
+                              data: dict,
+                              quest_summary: dict = None):
     new_data = {}
     if isinstance(user_id, str):
         try:
@@ -115,12 +146,15 @@ def add_new_user_quest_history(user_id: Union[str, ObjectId],
 
     data["quest_id"] = ObjectId(data["quest_id"])
     data["attempted_at"] = datetime.datetime.now(datetime.UTC)
-
-    new_data["quest_history"] = data
-
-    update_result = update_records(collection=Collections.USER,
-                                   documents=new_data,
-                                   update_type="$push",
-                                   safe_mode=False)
-
-    return update_result
\ No newline at end of file
+    data["quest_summary"] = quest_summary
+
+    # One conditional write: the `_id` filter is the existence check, so there is no read before the push.
+    update_result = conditional_update(collection=Collections.USER,
+                                       query={"_id": new_data["_id"]},
+                                       update={"$push": {"quest_history": data}},
+                                       projection={"_id": 1},
+                                       safe_mode=False)
+    # Separate document, so not atomic with the push; `python -m src.cli rebuild-user-stats` repairs drift.
+    increment_user_stats(new_data["_id"], history_entry_increments(data))
+
+    return {"success": update_result["success"], "message": update_result["message"]}
\ No newline at end of file
@@ -0,0 +1,29 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict
+
+class UserStats(BaseModel):
+    """
+    Schema for per-user statistics, maintained incrementally (`$inc`) when quest history entries
+    are added and quests are created. The document `_id` is the user's `_id`.
+
+    Attributes:
+    - quests_attempted: Number of quest history entries.
+    - quests_completed: Number of completed attempts.
+    - scored_attempts: Number of attempts with a result, the denominator of the average score.
+    - total_score: Sum of results.
+    - total_time_spent: Sum of time spent on quests (in seconds).
+    - quests_created: Number of quests created by the user.
+    - updated_at: Timestamp of the last change.
+    """
+    quests_attempted: int = Field(default=0, description="Number of quest history entries")
+    quests_completed: int = Field(default=0, description="Number of completed attempts")
+    scored_attempts: int = Field(default=0, description="Number of attempts with a result")
+    total_score: int = Field(default=0, description="Sum of results")
+    total_time_spent: int = Field(default=0, description="Sum of time spent on quests (in seconds)")
+    quests_created: int = Field(default=0, description="Number of quests created by the user")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now().astimezone(), description="Timestamp of the last change")
+
+    model_config = ConfigDict(
+        extra='forbid',
+        defer_build=True
+    )
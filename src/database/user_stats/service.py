@@ -0,0 +1,40 @@
+import os
+import datetime
+from typing import List
+from bson import ObjectId
+
+from src.database.utils.collections import Collections
+from src.database.utils.service import read, conditional_update, replace_records
+
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+
+STATS_FIELDS = ("quests_attempted", "quests_completed", "scored_attempts", "total_score", "total_time_spent", "quests_created")
+
+def history_entry_increments(entry: dict) -> dict:
+    """Stats deltas of one quest history entry."""
+    result = entry.get("result")
+    return {
+        "quests_attempted": 1,
+        "quests_completed": 1 if entry.get("completed") else 0,
+        "scored_attempts": 1 if result is not None else 0,
+        "total_score": result or 0,
+        "total_time_spent": entry.get("time_spent") or 0,
+    }
+
+def increment_user_stats(user_id: ObjectId, increments: dict) -> dict:
+    """Atomically adds `increments` to the user's stats, creating the stats document if needed."""
+    return conditional_update(collection=Collections.USER_STATS,
+                              query={"_id": user_id},
+                              update={"$inc": increments, "$set": {"updated_at": datetime.datetime.now(datetime.UTC)}},
+                              projection={"_id": 1},
+                              upsert=True)
+
+def find_user_stats(user_id: ObjectId) -> dict:
+    return read(db_name=MONGO_DB_NAME,
+                collection_name=Collections.USER_STATS.value.name,
+                query={"_id": user_id},
+                find_one=True,
+                exclude_id=False)
+
+def replace_user_stats(stats: List[dict]) -> dict:
+    return replace_records(collection=Collections.USER_STATS, documents=stats, upsert=True)
@@ -0,0 +1,150 @@
+import os
+import logging
+import threading
+from typing import List
+
+from dotenv import load_dotenv
+from pymongo import errors
+
+from src.database.utils.setup import get_client
+from src.utils.cache import cache_registry, CacheRegistry, CACHE_TTL_SECONDS, CACHE_FALLBACK_TTL_SECONDS
+from src.utils.metrics import CHANGE_STREAM_UP
+
+load_dotenv()
+logger = logging.getLogger('myLog')
+
+DB_NAME = os.getenv("MONGO_DB_NAME")
+CHANGE_STREAMS_ENABLED = os.getenv("CHANGE_STREAMS_ENABLED", "true").lower() in ("1", "true", "yes")
+# How long to wait before reopening a failed stream, and how often to probe when change streams are unsupported.
+CHANGE_STREAM_RETRY_SECONDS = float(os.getenv("CHANGE_STREAM_RETRY_SECONDS", 5))
+CHANGE_STREAM_UNSUPPORTED_RETRY_SECONDS = float(os.getenv("CHANGE_STREAM_UNSUPPORTED_RETRY_SECONDS", 300))
+CHANGE_STREAM_MAX_AWAIT_MS = int(os.getenv("CHANGE_STREAM_MAX_AWAIT_MS", 1000))
+
+# Standalone servers do not support change streams ($changeStream needs a replica set or sharded cluster).
+_UNSUPPORTED_CODES = {40573}
+# The resume token can no longer be used (oplog rolled over, or the token is malformed).
+_RESUME_FAILED_CODES = {136, 260, 280, 286}
+
+_DOCUMENT_EVENTS = ("insert", "update", "replace", "delete")
+
+
+class InvalidationBus:
+    """
+    Evicts cached documents of this process when they change in MongoDB, whoever wrote them.
+
+    Tails one change stream on the database, filtered to the collections with registered caches and
+    projected to the document key, and evicts the changed document from every cache of its collection.
+    Writes of this process also invalidate locally (see `src.database.utils.service`), so the stream
+    only closes the gap for other workers and instances.
+
+    The last resume token is kept, so a reopened stream continues where it stopped without losing
+    events. When no token can be used (first start, expired token, `invalidate` event) the caches are
+    cleared before tailing. When change streams are unavailable (standalone server, connection errors)
+    the caches fall back to the short `CACHE_FALLBACK_TTL_SECONDS`, and the stream is retried.
+    """
+
+    def __init__(self, registry: CacheRegistry = cache_registry, db_name: str = DB_NAME):
+        self.registry = registry
+        self.db_name = db_name
+        self.resume_token = None
+        self.connected = False
+        self.last_error = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> "InvalidationBus":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pipeline(self) -> List[dict]:
+        return [
+            {"$match": {"$or": [{"ns.coll": {"$in": self.registry.collection_names}},
+                                {"operationType": {"$in": ["dropDatabase", "invalidate"]}}]}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+        ]
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._tail()
+            except errors.OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    self._fall_back(f"change streams are not supported by this deployment ({e})")
+                    self._stopped.wait(CHANGE_STREAM_UNSUPPORTED_RETRY_SECONDS)
+                    continue
+                if e.code in _RESUME_FAILED_CODES:
+                    logger.warning(f"Change stream cannot resume ({e}); resynchronizing caches.")
+                    self.resume_token = None
+                    continue
+                self._fall_back(str(e))
+                self._stopped.wait(CHANGE_STREAM_RETRY_SECONDS)
+            except Exception as e:
+                self._fall_back(str(e))
+                self._stopped.wait(CHANGE_STREAM_RETRY_SECONDS)
+        self._set_connected(False)
+
+    def _tail(self):
+        database = get_client()[self.db_name]
+        with database.watch(self.pipeline(),
+                            resume_after=self.resume_token,
+                            max_await_time_ms=CHANGE_STREAM_MAX_AWAIT_MS) as stream:
+            if self.resume_token is None:
+                # Nothing is known about changes made before the stream opened.
+                self.registry.clear(source="resync")
+            self._set_connected(True)
+
+            while stream.alive and not self._stopped.is_set():
+                change = stream.try_next()
+                if change is not None and not self._apply(change):
+                    self.resume_token = None
+                    return
+                # Advances on empty batches too (post-batch resume token), so resuming skips nothing.
+                self.resume_token = stream.resume_token
+
+    def _apply(self, change: dict) -> bool:
+        """Evicts what `change` affects. Returns False if the stream was invalidated and must be reopened."""
+        operation = change.get("operationType")
+        if operation in _DOCUMENT_EVENTS:
+            self.registry.invalidate(change["ns"]["coll"], change["documentKey"]["_id"], source="change_stream")
+        elif operation in ("drop", "rename"):
+            self.registry.clear(change["ns"]["coll"], source="change_stream")
+        elif operation in ("dropDatabase", "invalidate"):
+            self.registry.clear(source="change_stream")
+            return operation != "invalidate"
+        return True
+
+    def _fall_back(self, reason: str):
+        if self.connected:
+            # Entries cached with the long TTL could otherwise outlive the missed changes.
+            self.registry.clear(source="resync")
+        if reason != self.last_error:
+            logger.warning(f"Cache invalidation change stream is unavailable, caches expire after "
+                           f"{CACHE_FALLBACK_TTL_SECONDS} s. Reason: {reason}")
+        self.last_error = reason
+        self._set_connected(False)
+
+    def _set_connected(self, connected: bool):
+        if connected and not self.connected:
+            logger.info(f"Cache invalidation change stream is open on {self.registry.collection_names}.")
+            self.last_error = None
+        self.connected = connected
+        self.registry.set_ttl(CACHE_TTL_SECONDS if connected else CACHE_FALLBACK_TTL_SECONDS)
+        CHANGE_STREAM_UP.set(value=1 if connected else 0)
+
+
+invalidation_bus = InvalidationBus()
+
+
+def start_invalidation_bus() -> InvalidationBus:
+    """Starts tailing change streams in a daemon thread, unless disabled with CHANGE_STREAMS_ENABLED=false."""
+    if not CHANGE_STREAMS_ENABLED:
+        logger.info(f"Cache invalidation change stream is disabled, caches expire after {CACHE_FALLBACK_TTL_SECONDS} s.")
+        return invalidation_bus
+    return invalidation_bus.start()
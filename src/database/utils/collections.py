@@ -1,11 +1,14 @@
 from enum import Enum
 from collections import namedtuple
+from pymongo import IndexModel, ASCENDING
 
 from src.database.user.schema import CreateUser, UpdateUser
 from src.database.quest.schema import CreateQuest, UpdateQuest
+from src.database.user_stats.schema import UserStats
+from src.database.utils.serializers import USER_SERIALIZER, QUEST_SERIALIZER, USER_STATS_SERIALIZER
 
 
-CollectionMetadata = namedtuple("CollectionMetadata", ["name", "validation_schema_create", "validation_schema_update"])
+CollectionMetadata = namedtuple("CollectionMetadata", ["name", "validation_schema_create", "validation_schema_update", "serializer", "indexes"])
 
 class Collections(Enum):
 
@@ -13,9 +16,24 @@ class Collections(Enum):
         name='Users',
         validation_schema_create=CreateUser,
         validation_schema_update=UpdateUser,
+        serializer=USER_SERIALIZER,
+        indexes=[
+            IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+            # Finds the history entries to refresh when a quest's summary changes.
+            IndexModel([("quest_history.quest_id", ASCENDING)], name="quest_history_quest_id"),
+        ],
     )
     QUEST = CollectionMetadata(
         name='Quests',
         validation_schema_create=CreateQuest,
         validation_schema_update=UpdateQuest,
-    )
\ No newline at end of file
+        serializer=QUEST_SERIALIZER,
+        indexes=[],
+    )
+    USER_STATS = CollectionMetadata(
+        name='UserStats',
+        validation_schema_create=UserStats,
+        validation_schema_update=UserStats,
+        serializer=USER_STATS_SERIALIZER,
+        indexes=[],
+    )
@@ -0,0 +1,71 @@
+from pymongo import monitoring
+
+from src.utils.metrics import MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, MONGO_POOL_CONNECTIONS, \
+    MONGO_POOL_CHECKOUT_FAILURES
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Records the latency of every MongoDB command the driver sends.
+
+    The collection name is only available on the started event, so it is kept by request id
+    until the matching succeeded/failed event arrives.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.observe(event.command_name, collection, value=event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.observe(event.command_name, collection, value=event.duration_micros / 1_000_000)
+        MONGO_COMMAND_FAILURES.inc(event.command_name, collection)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Keeps open and checked-out connection gauges per server."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(_address(event), "open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(_address(event), "open")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(_address(event), event.reason)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CONNECTIONS.inc(_address(event), "checked_out")
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.dec(_address(event), "checked_out")
@@ -0,0 +1,205 @@
+import os
+import sys
+import logging
+import threading
+import datetime
+from collections import deque
+from typing import List, Optional
+
+from bson import json_util
+from dotenv import load_dotenv
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+load_dotenv()
+logger = logging.getLogger('myLog')
+
+MONGO_PROFILER_ENABLED = os.getenv("MONGO_PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+MONGO_PROFILER_MAX_ENTRIES = int(os.getenv("MONGO_PROFILER_MAX_ENTRIES", 500))
+MONGO_PROFILER_LOG = os.getenv("MONGO_PROFILER_LOG")
+
+EXPLAINABLE_COMMANDS = frozenset({"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"})
+
+# Driver/session fields that cannot be sent back inside an `explain` command.
+_NON_EXPLAINABLE_FIELDS = frozenset({"lsid", "txnNumber", "autocommit", "startTransaction",
+                                     "apiVersion", "apiStrict", "apiDeprecationErrors"})
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_DATABASE_UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _find_call_site() -> str:
+    """
+    Returns the first application function up the stack that issued the command,
+    preferring the collection-level helpers (e.g. `find_user_by_email`) over generic ones.
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_SRC_DIR) and not filename.startswith(_DATABASE_UTILS_DIR):
+            return frame.f_code.co_name
+        if fallback is None and filename.startswith(_DATABASE_UTILS_DIR) and frame.f_code.co_filename != __file__:
+            fallback = frame.f_code.co_name
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def _explainable(command: dict) -> dict:
+    return {key: value for key, value in command.items()
+            if not key.startswith("$") and key not in _NON_EXPLAINABLE_FIELDS}
+
+
+class SlowQueryProfiler(monitoring.CommandListener):
+    """
+    Records MongoDB commands slower than `threshold_ms` together with the function that issued them.
+
+    Meant for development and staging: it walks the stack for every explainable command.
+    The most recent `max_entries` slow commands are kept in memory and, if `log_path` is set,
+    appended as JSON lines so they can be analyzed later with `python -m src.cli profiler-report`.
+    """
+
+    def __init__(self,
+                 threshold_ms: float = MONGO_SLOW_QUERY_MS,
+                 max_entries: int = MONGO_PROFILER_MAX_ENTRIES,
+                 log_path: Optional[str] = MONGO_PROFILER_LOG):
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.entries = deque(maxlen=max_entries)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        self._pending[event.request_id] = (event.database_name, dict(event.command), _find_call_site())
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < self.threshold_ms:
+            return
+
+        database_name, command, call_site = pending
+        entry = {
+            "recorded_at": datetime.datetime.now(datetime.UTC),
+            "call_site": call_site,
+            "database": database_name,
+            "command_name": event.command_name,
+            "collection": command.get(event.command_name),
+            "duration_ms": round(duration_ms, 3),
+            "command": _explainable(command),
+        }
+        self.entries.append(entry)
+
+        if self.log_path:
+            try:
+                with self._lock, open(self.log_path, "a") as log_file:
+                    log_file.write(json_util.dumps(entry) + "\n")
+            except OSError as e:
+                logger.error(f"Failed writing slow query log: {e}")
+
+    def reset(self):
+        self.entries.clear()
+
+
+profiler = SlowQueryProfiler() if MONGO_PROFILER_ENABLED else None
+
+
+def load_entries(log_path: str) -> List[dict]:
+    with open(log_path) as log_file:
+        return [json_util.loads(line) for line in log_file if line.strip()]
+
+
+def _collect_stages(plan, stages: set):
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.add(stage)
+        for value in plan.values():
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+
+
+def _unindexed_lookups(client, database_name: str, pipeline: list) -> List[str]:
+    """Returns `$lookup`s whose `foreignField` is not the leading key of any index."""
+    unindexed = []
+    for stage in pipeline or []:
+        lookup = stage.get("$lookup") if isinstance(stage, dict) else None
+        if not lookup:
+            continue
+        foreign_field = lookup.get("foreignField")
+        if foreign_field is None:
+            unindexed.append(f"{lookup.get('from')} (pipeline $lookup, check its $match stages)")
+            continue
+        if foreign_field == "_id":
+            continue
+        indexes = client[database_name][lookup["from"]].index_information()
+        if not any(index["key"][0][0] == foreign_field for index in indexes.values()):
+            unindexed.append(f"{lookup['from']}.{foreign_field}")
+    return unindexed
+
+
+def explain_entry(client, entry: dict) -> dict:
+    """
+    Runs `explain` (queryPlanner verbosity) for a recorded command and flags
+    collection scans and `$lookup`s without a supporting index.
+    """
+    analysis = {"collscan": False, "unindexed_lookups": [], "stages": [], "error": None}
+    try:
+        explain = client[entry["database"]].command({"explain": entry["command"], "verbosity": "queryPlanner"})
+        stages = set()
+        _collect_stages(explain, stages)
+        analysis["stages"] = sorted(stages)
+        analysis["collscan"] = "COLLSCAN" in stages
+        if entry["command_name"] == "aggregate":
+            analysis["unindexed_lookups"] = _unindexed_lookups(client, entry["database"], entry["command"].get("pipeline"))
+    except PyMongoError as e:
+        analysis["error"] = str(e)
+    return analysis
+
+
+def build_report(entries: List[dict], client=None) -> List[dict]:
+    """
+    Groups slow commands by call site and command, slowest first.
+
+    If `client` is given, the slowest command of each group is explained.
+    """
+    groups = {}
+    for entry in entries:
+        key = (entry["call_site"], entry["command_name"], entry["collection"])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "call_site": entry["call_site"],
+                "command_name": entry["command_name"],
+                "collection": entry["collection"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "slowest": entry,
+            }
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        if entry["duration_ms"] >= group["max_ms"]:
+            group["max_ms"] = entry["duration_ms"]
+            group["slowest"] = entry
+
+    report = []
+    for group in sorted(groups.values(), key=lambda item: item["max_ms"], reverse=True):
+        slowest = group.pop("slowest")
+        group["avg_ms"] = round(group.pop("total_ms") / group["count"], 3)
+        group["command"] = json_util.dumps(slowest["command"])
+        if client is not None:
+            group.update(explain_entry(client, slowest))
+        report.append(group)
+    return report
@@ -0,0 +1,108 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _to_isoformat(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def _each(converter: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert_list(values):
+        if values is None:
+            return []
+        return [converter(value) for value in values]
+
+    return convert_list
+
+
+class DocumentSerializer:
+    """
+    Converts MongoDB documents into JSON-serializable dicts in a single pass.
+
+    The field map is resolved once, at definition time, so serializing a document is a single
+    dict comprehension over its fields: fields with a converter are converted, excluded fields
+    are dropped and everything else is copied as is.
+
+    Attributes:
+    - converters: Mapping of field name to a callable converting the raw BSON value.
+    - exclude: Fields that are never returned to the client (e.g. password hash).
+    - include: If set, only these fields are returned (e.g. to shape nested entries).
+    - projection: MongoDB projection matching `exclude`, to skip those fields on the DB side.
+    """
+
+    def __init__(self,
+                 converters: Dict[str, Callable[[Any], Any]] = None,
+                 exclude: Iterable[str] = (),
+                 include: Iterable[str] = None):
+        self.converters = dict(converters or {})
+        self.exclude = frozenset(exclude)
+        self.include = tuple(include) if include is not None else None
+        self.projection = {field: 0 for field in self.exclude} or None
+
+    def __call__(self, document: Optional[dict]) -> Optional[dict]:
+        if document is None:
+            return None
+
+        converters = self.converters
+        if self.include is not None:
+            return {field: converters[field](document.get(field)) if field in converters else document.get(field)
+                    for field in self.include}
+
+        exclude = self.exclude
+        return {field: converters[field](value) if field in converters else value
+                for field, value in document.items() if field not in exclude}
+
+    def many(self, documents: Iterable[dict]) -> List[dict]:
+        return [self(document) for document in documents]
+
+
+QUEST_RATING_SERIALIZER = DocumentSerializer(
+    converters={"user_id": _to_str},
+)
+
+QUEST_RATING_ENTRY_SERIALIZER = DocumentSerializer(
+    converters={"user_id": _to_str},
+    include=("user_id", "review", "rating"),
+)
+
+QUEST_SERIALIZER = DocumentSerializer(
+    converters={
+        "_id": _to_str,
+        "created_by": _to_str,
+        "created_at": _to_isoformat,
+        "ratings": _each(QUEST_RATING_ENTRY_SERIALIZER),
+    },
+)
+
+QUEST_HISTORY_SERIALIZER = DocumentSerializer(
+    converters={
+        "quest_id": _to_str,
+        "attempted_at": _to_isoformat,
+    },
+)
+
+USER_SERIALIZER = DocumentSerializer(
+    converters={
+        "_id": _to_str,
+        "created_at": _to_isoformat,
+        "created_quests": _each(_to_str),
+        "quest_history": _each(QUEST_HISTORY_SERIALIZER),
+    },
+    exclude=("password",),
+)
+
+USER_STATS_SERIALIZER = DocumentSerializer(
+    converters={
+        "_id": _to_str,
+        "updated_at": _to_isoformat,
+    },
+)
+
+JOB_SERIALIZER = DocumentSerializer(
+    converters={
+        "created_at": _to_isoformat,
+        "updated_at": _to_isoformat,
+    },
+    exclude=("owner_id",),
+)
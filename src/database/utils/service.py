@@ -1,20 +1,29 @@
 import os
+import time
 import logging
+import threading
 from bson import ObjectId
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from typing import List, Union, Type
-from pymongo import errors, UpdateOne
+from typing import Iterator, List, Union, Type
+from pymongo import errors, UpdateOne, ReplaceOne, ReturnDocument
 
-from src.database.utils.setup import client
+from src.database.utils.setup import get_client, ReadPreferenceMode
 from src.database.utils.collections import Collections
 from src.database.utils.validators import validate_records
-from src.utils.exceptions import InsertionError, DatabaseConnectionError, DocumentValidationError, UpdateError, NotFoundError
+from src.utils.log import log_event, DocumentSummary
+from src.utils.cache import cache_registry
+from src.utils.exceptions import InsertionError, DatabaseConnectionError, DocumentValidationError, UpdateError, NotFoundError, \
+    DuplicateRecordError
 
 load_dotenv()
 logger = logging.getLogger('myLog')
 
 DB_NAME = os.getenv("MONGO_DB_NAME")
+ENSURE_INDEXES_RETRY_SECONDS = float(os.getenv("ENSURE_INDEXES_RETRY_SECONDS", 30))
+
+# Set once every index declared in `Collections` exists; the readiness probe fails until then.
+_indexes_ensured = threading.Event()
 
 def _create(documents: Union[List[dict], dict], db_name: str, collection_name: str) -> dict:
     """
@@ -22,6 +31,7 @@ def _create(documents: Union[List[dict], dict], db_name: str, collection_name: s
 
     Raises:
         DatabaseConnectionError: If `db_name` or `collection_name` is empty.
+        DuplicateRecordError: If a single inserted document violates a unique index.
         InsertionError: If insertion fails.
     """
     if not documents:
@@ -30,18 +40,21 @@ def _create(documents: Union[List[dict], dict], db_name: str, collection_name: s
         raise ValueError("db_name and collection_name cannot be empty.")
 
     try:
-        db = client[db_name]
+        db = get_client()[db_name]
         collection = db[collection_name]
 
         if isinstance(documents, list):
             result = collection.insert_many(documents, ordered=False)
-            logger.info(f"Inserted document IDs: {result.inserted_ids}")
+            log_event(logging.INFO, "db.create", collection=collection_name, inserted=len(result.inserted_ids))
+            return {"success": True, "message": "Successfully inserted documents.", "inserted_ids": result.inserted_ids}
         else:
             result = collection.insert_one(documents)
-            logger.info(f"Inserted document ID: {result.inserted_id}")
-
-        return {"success": True, "message": "Successfully inserted documents.", "inserted_id": result.inserted_id}
+            log_event(logging.INFO, "db.create", collection=collection_name, inserted_id=result.inserted_id)
+            return {"success": True, "message": "Successfully inserted documents.", "inserted_id": result.inserted_id}
 
+    except errors.DuplicateKeyError as e:
+        logger.info(f"Duplicate key in {collection_name}: {e.details.get('keyValue') if e.details else e}")
+        raise DuplicateRecordError(f"Document violates a unique index. Info: {e.details.get('keyValue') if e.details else e}")
     except errors.BulkWriteError as e:
         logger.error(f"Bulk write error occurred: {e.details}")
         raise InsertionError(f"Failed bulk write. Info: {e.details}")
@@ -50,23 +63,46 @@ def _create(documents: Union[List[dict], dict], db_name: str, collection_name: s
         raise InsertionError(f"Failed to insert documents. Info: {str(e)}")
 
 
+def _split_ids(documents: Union[List[dict], dict]):
+    """Separates preassigned `_id`s, which are not part of the validation schemas, without mutating `documents`."""
+    if isinstance(documents, list):
+        return [document.get("_id") for document in documents], [_without_id(document) for document in documents]
+    return documents.get("_id"), _without_id(documents)
+
+def _without_id(document: dict) -> dict:
+    return {key: value for key, value in document.items() if key != "_id"} if "_id" in document else document
+
+def _restore_ids(ids, documents: Union[List[dict], dict]):
+    if isinstance(documents, list):
+        for document_id, document in zip(ids, documents):
+            if document_id is not None:
+                document["_id"] = document_id
+    elif ids is not None:
+        documents["_id"] = ids
+    return documents
+
 def add_new_records(collection: Collections, documents: Union[List[dict], dict], safe_mode: bool = True):
     """
     Adds new records to a specified MongoDB collection with optional safety validation.
 
+    A preassigned `_id` is kept, so inserts can be retried safely (a repeat raises `DuplicateRecordError`).
+
     Raises:
         DocumentValidationError: If validation fails in safe mode.
         DatabaseConnectionError: If `db_name` is missing.
+        DuplicateRecordError: If a single document violates a unique index (e.g. `email_unique`).
         InsertionError: If insertion fails.
     """
     collection_name = collection.value.name
 
     if safe_mode:
+        ids, documents = _split_ids(documents)
         result = validate_records(collection.value.validation_schema_create, documents)
         if not result["success"]:
             logger.error(f"Failed document validation for {collection_name} Collection. Info: {result["failed_records"]}. "
                         f"To force add new records, set safe_mode=False (not recommended).")
             raise DocumentValidationError("Failed validation.")
+        documents = _restore_ids(ids, result["validated_records"])
     else:
         logger.info("Safe mode is off.")
         logger.warning("Force adding new records without validation is not recommended.")
@@ -78,10 +114,80 @@ def add_new_records(collection: Collections, documents: Union[List[dict], dict],
     return _create(documents, db_name, collection_name)
 
 
-def read(db_name: str, collection_name: str, query: dict = None, exclude_id: bool = True, find_one: bool = False):
+def import_records(collection: Collections, documents: List[dict]) -> dict:
+    """
+    Validates a batch of documents and inserts the valid ones, reporting failures per document.
+
+    Unlike `add_new_records`, invalid documents or duplicate keys do not fail the whole batch.
+    An existing `_id` is kept, so exported documents can be re-imported as is.
+
+    Raises:
+        DatabaseConnectionError: If `db_name` is missing.
+        InsertionError: If insertion fails for a reason other than per-document write errors.
+
+    Returns:
+        dict: A dictionary containing:
+            - "inserted" (int): Number of inserted documents.
+            - "failed_records" (List[dict]): {"index": <position in `documents`>, "error": <message>}.
+    """
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    ids = [document.pop("_id", None) for document in documents]
+    result = validate_records(collection.value.validation_schema_create, documents)
+    failed_records = [{"index": failed["index"], "error": failed["error"]} for failed in result["failed_records"]]
+
+    valid_indexes = result["valid_indexes"]
+    to_insert = result["validated_records"]
+    for index, document in zip(valid_indexes, to_insert):
+        if ids[index] is not None:
+            document["_id"] = ids[index]
+
+    if not to_insert:
+        return {"inserted": 0, "failed_records": failed_records}
+
+    try:
+        inserted = len(get_client()[db_name][collection.value.name].insert_many(to_insert, ordered=False).inserted_ids)
+    except errors.BulkWriteError as e:
+        inserted = e.details.get("nInserted", 0)
+        failed_records.extend({"index": valid_indexes[write_error["index"]], "error": write_error.get("errmsg", "Write error")}
+                              for write_error in e.details.get("writeErrors", []))
+    except Exception as e:
+        logger.error(f"Error occurred during import: {str(e)}")
+        raise InsertionError(f"Failed to import documents. Info: {str(e)}")
+
+    log_event(logging.INFO, "db.import", collection=collection.value.name, inserted=inserted, failed=len(failed_records))
+    return {"inserted": inserted, "failed_records": sorted(failed_records, key=lambda failed: failed["index"])}
+
+
+def _build_projection(projection: dict = None, exclude_id: bool = True) -> dict:
+    fields_projection = dict(projection) if projection else {}
+    if exclude_id:
+        fields_projection["_id"] = 0
+    return fields_projection
+
+def _get_collection(db_name: str, collection_name: str, read_preference: ReadPreferenceMode = None):
+    collection = get_client()[db_name][collection_name]
+    if read_preference is not None:
+        collection = collection.with_options(read_preference=read_preference)
+    return collection
+
+def read(db_name: str,
+         collection_name: str,
+         query: dict = None,
+         exclude_id: bool = True,
+         find_one: bool = False,
+         projection: dict = None,
+         read_preference: ReadPreferenceMode = None):
     """
     Retrieves records from a specified MongoDB collection.
 
+    Args:
+        projection: MongoDB projection, so only the fields a caller uses are transferred.
+        read_preference: Overrides the client's read preference for this read
+                         (e.g. `STALE_OK_READ_PREFERENCE` to offload the primary).
+
     Raises:
         DatabaseConnectionError: If `db_name` or `collection_name` is missing.
         ReadError: If reading from the database fails.
@@ -90,27 +196,116 @@ def read(db_name: str, collection_name: str, query: dict = None, exclude_id: boo
         raise ValueError("db_name and collection_name cannot be empty.")
 
     try:
-        db = client[db_name]
-        collection = db[collection_name]
+        collection = _get_collection(db_name, collection_name, read_preference)
 
-        if exclude_id:
-            exclude_fields_dict = {"_id": 0}
-        else:
-            exclude_fields_dict = {}
+        exclude_fields_dict = _build_projection(projection, exclude_id)
 
         if find_one:
             document = collection.find_one(query, exclude_fields_dict)
-            logger.info(f"Got document: {document}")
+            log_event(logging.DEBUG, "db.read", collection=collection_name, result=DocumentSummary(document))
             return {"success": True, "result": document}
         else:
             documents = list(collection.find(query, exclude_fields_dict))
-            logger.info(f"Got records: {documents}")
+            log_event(logging.DEBUG, "db.read", collection=collection_name, result=DocumentSummary(documents))
             return {"success": True, "result": documents}
 
     except Exception as e:
         logger.error(f"Failed getting info from DB: {e}")
         raise e
 
+def iter_read(db_name: str,
+              collection_name: str,
+              query: dict = None,
+              exclude_id: bool = True,
+              batch_size: int = None,
+              limit: int = 0,
+              sort: list = None,
+              max_time_ms: int = None,
+              projection: dict = None,
+              read_preference: ReadPreferenceMode = None) -> Iterator[dict]:
+    """
+    Streams records from a specified MongoDB collection instead of materializing them.
+
+    Documents are fetched lazily from a server-side cursor, `batch_size` per round trip,
+    and the cursor is closed when the iterator is exhausted or discarded.
+
+    Args:
+        limit: Maximum number of documents (0 means no limit).
+        sort: List of (field, direction) pairs.
+        max_time_ms: Server-side time limit for the query.
+        read_preference: Overrides the client's read preference for this read.
+
+    Raises:
+        ValueError: If `db_name` or `collection_name` is missing.
+    """
+    if not db_name or not collection_name:
+        raise ValueError("db_name and collection_name cannot be empty.")
+
+    collection = _get_collection(db_name, collection_name, read_preference)
+    cursor = collection.find(query or {}, _build_projection(projection, exclude_id), limit=limit, sort=sort)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    if max_time_ms:
+        cursor = cursor.max_time_ms(max_time_ms)
+
+    log_event(logging.DEBUG, "db.iter_read", collection=collection_name, batch_size=batch_size, limit=limit)
+    with cursor:
+        yield from cursor
+
+def exists(collection: Collections, query: dict) -> bool:
+    """
+    Checks whether any document matches `query` without fetching it.
+
+    Only the queried fields are projected (and `_id` is excluded unless queried), so with an
+    index on those fields the query is covered and never reads the documents themselves.
+
+    Raises:
+        DatabaseConnectionError: If `db_name` is missing.
+    """
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    projection = {field: 1 for field in query if not field.startswith("$")}
+    if "_id" not in projection:
+        projection["_id"] = 0
+
+    return get_client()[db_name][collection.value.name].find_one(query, projection) is not None
+
+def ensure_indexes() -> bool:
+    """
+    Creates the indexes declared in `Collections` metadata. Safe to run on every start.
+
+    Returns:
+        bool: True if every declared index exists. Failures are logged, and the readiness probe
+              reports the service as unavailable until a later call succeeds.
+    """
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    ensured = True
+    for collection in Collections:
+        if not collection.value.indexes:
+            continue
+        try:
+            get_client()[db_name][collection.value.name].create_indexes(list(collection.value.indexes))
+        except Exception as e:
+            logger.error(f"Failed to create indexes for {collection.value.name}: {e}")
+            ensured = False
+    if ensured:
+        _indexes_ensured.set()
+    return ensured
+
+def ensure_indexes_until_created(retry_seconds: float = ENSURE_INDEXES_RETRY_SECONDS):
+    """Runs `ensure_indexes` every `retry_seconds` until it succeeds, e.g. once MongoDB becomes reachable."""
+    while not ensure_indexes():
+        time.sleep(retry_seconds)
+
+def indexes_ensured() -> bool:
+    """Returns whether `ensure_indexes` has created every declared index in this process."""
+    return _indexes_ensured.is_set()
+
 def _update(documents: Union[List[dict], dict],
             db_name: str,
             collection_name: str,
@@ -134,7 +329,7 @@ def _update(documents: Union[List[dict], dict],
         raise ValueError("db_name and collection_name cannot be empty.")
 
     try:
-        db = client[db_name]
+        db = get_client()[db_name]
         collection = db[collection_name]
 
         if isinstance(documents, list):
@@ -142,12 +337,15 @@ def _update(documents: Union[List[dict], dict],
             result = collection.bulk_write([
                 UpdateOne({'_id': doc['_id']}, {update_type: doc}) for doc in documents
             ], ordered=False)
-            logger.info(f"Updated document IDs: {result.modified_count}")
+            for doc in documents:
+                cache_registry.invalidate(collection_name, doc['_id'])
+            log_event(logging.INFO, "db.update", collection=collection_name, modified=result.modified_count)
         else:
             success_return_message = "Successfully updated document."
             document_id = documents.pop('_id')
             result = collection.update_one({'_id': document_id}, {update_type: documents})
-            logger.info(f"Updated document ID: {document_id}")
+            cache_registry.invalidate(collection_name, document_id)
+            log_event(logging.INFO, "db.update", collection=collection_name, document_id=document_id)
 
         if result.matched_count == 0:
             raise NotFoundError("No matching documents found to update.")
@@ -168,18 +366,23 @@ def _update(documents: Union[List[dict], dict],
 def _custom_query_update(db_name: str,
                          collection_name: str,
                          _id: ObjectId,
-                         custom_query: dict) -> dict:
+                         custom_query: dict,
+                         query_filter: dict = None,
+                         array_filters: List[dict] = None) -> dict:
     """
-    Updates one or more documents in a specified MongoDB collection.
+    Applies an update document (e.g. targeted `$set`/`$push`/`$pull` operators) to a single document.
 
     Args:
-        documents: A single document (dict) or a list of documents (list of dicts) to be updated.
         db_name: Name of the database where the collection is located.
         collection_name: Name of the collection to update documents in.
+        _id: `_id` of the document to update.
+        custom_query: The update document.
+        query_filter: Extra conditions the document must match (e.g. an expected version), combined with `_id`.
+        array_filters: Filters of the `$[<identifier>]` positional operators used in `custom_query`.
 
     Raises:
-        ValueError: If `documents` is empty or if `db_name` or `collection_name` is empty.
-        DatabaseConnectionError: If there are issues connecting to the database.
+        ValueError: If `custom_query` or `_id` is empty or if `db_name` or `collection_name` is empty.
+        NotFoundError: If no document matches `_id` and `query_filter`.
         UpdateError: If update fails due to issues with the documents or MongoDB operations.
     """
     if not custom_query or not _id:
@@ -188,17 +391,14 @@ def _custom_query_update(db_name: str,
         raise ValueError("db_name and collection_name cannot be empty.")
 
     try:
-        db = client[db_name]
+        db = get_client()[db_name]
         collection = db[collection_name]
 
-        update_query = [
-            UpdateOne(
-                {"_id": _id},  # Quest filter
-                custom_query
-            )
-        ]
-
-        result = collection.bulk_write(update_query)
+        result = collection.update_one({**(query_filter or {}), "_id": _id},
+                                       custom_query,
+                                       array_filters=array_filters)
+        cache_registry.invalidate(collection_name, _id)
+        log_event(logging.INFO, "db.update", collection=collection_name, document_id=_id, matched=result.matched_count)
 
         if result.matched_count == 0:
             raise NotFoundError("No matching documents found to update.")
@@ -208,9 +408,8 @@ def _custom_query_update(db_name: str,
         else:
             return {"success": True, "message": "Successfully updated document."}
 
-    except errors.BulkWriteError as e:
-        logger.error(f"Bulk write error occurred: {e.details}")
-        raise UpdateError(f"Failed bulk update. {e.details}")
+    except NotFoundError:
+        raise
     except Exception as e:
         logger.error(f"Failed to update records in {collection_name}.")
         logger.error(f"Error occurred during update: {str(e)}")
@@ -236,11 +435,12 @@ def update_records(collection: Collections,
             validate_with = custom_validate_rule
         else:
             validate_with = collection.value.validation_schema_update
-        result = validate_records(validate_with, documents)
+        result = validate_records(validate_with, documents, only_set_fields=True)
         if not result["success"]:
             logger.error(f"Failed document validation for {collection_name} Collection. Info: {result['failed_records']}. "
                         f"To force update records, set safe_mode=False (not recommended).")
             raise DocumentValidationError("Failed validation.")
+        documents = result["validated_records"]
     else:
         logger.info("Safe mode is off.")
         logger.warning("Force updating records without validation is not recommended.")
@@ -251,25 +451,46 @@ def update_records(collection: Collections,
 
     return _update(documents, db_name, collection_name, update_type=update_type)
 
-def custom_update_records(collection: Collections,
-                          _id: ObjectId,
-                          custom_query: dict,
-                          validate_with: Type[BaseModel] = None,
-                          validate_dict: dict = None,
-                          safe_mode: bool = True):
-
-    collection_name = collection.value.name
-
+def _validate_in_place(collection_name: str,
+                       validate_with: Type[BaseModel],
+                       validate_dict: dict,
+                       safe_mode: bool):
+    if safe_mode and validate_with is None:
+        # Nothing user-provided to validate (e.g. server-computed `$inc` counters).
+        return
     if safe_mode:
         result = validate_records(validate_with, validate_dict)
         if not result["success"]:
             logger.error(f"Failed document validation for {collection_name} Collection. Info: {result['failed_records']}. "
                         f"To force update records, set safe_mode=False (not recommended).")
             raise DocumentValidationError("Failed validation.")
+        # Update queries reference `validate_dict`, so normalizing it in place persists the validated values.
+        validate_dict.update(result["validated_records"])
     else:
         logger.info("Safe mode is off.")
         logger.warning("Force updating records without validation is not recommended.")
 
+def custom_update_records(collection: Collections,
+                          _id: ObjectId,
+                          custom_query: dict,
+                          validate_with: Type[BaseModel] = None,
+                          validate_dict: dict = None,
+                          safe_mode: bool = True,
+                          query_filter: dict = None,
+                          array_filters: List[dict] = None):
+    """
+    Applies `custom_query` to the document with `_id`, if it also matches `query_filter`.
+
+    Raises:
+        DocumentValidationError: If validation fails in safe mode.
+        DatabaseConnectionError: If `db_name` is missing.
+        NotFoundError: If no document matches.
+        UpdateError: If update operation fails.
+    """
+    collection_name = collection.value.name
+
+    _validate_in_place(collection_name, validate_with, validate_dict, safe_mode)
+
     db_name = DB_NAME
     if not db_name:
         raise DatabaseConnectionError("Database name is not set in environment variables.")
@@ -277,10 +498,149 @@ def custom_update_records(collection: Collections,
     return _custom_query_update(db_name=db_name,
                                 collection_name=collection_name,
                                 _id=_id,
-                                custom_query=custom_query)
+                                custom_query=custom_query,
+                                query_filter=query_filter,
+                                array_filters=array_filters)
+
+def conditional_update(collection: Collections,
+                       query: dict,
+                       update: Union[dict, list],
+                       projection: dict = None,
+                       validate_with: Type[BaseModel] = None,
+                       validate_dict: dict = None,
+                       safe_mode: bool = True,
+                       upsert: bool = False) -> dict:
+    """
+    Applies `update` to the document matching `query` with a single atomic `find_one_and_update`.
+
+    Preconditions belong in `query`, so callers do not need to read the document before writing it.
+    `update` may be an update document or an aggregation pipeline (e.g. to recompute derived fields
+    from the updated arrays). With `upsert`, a missing document is created instead (e.g. for `$inc` counters).
+
+    Raises:
+        DocumentValidationError: If validation fails in safe mode.
+        DatabaseConnectionError: If `db_name` is missing.
+        NotFoundError: If no document matches `query`.
+        UpdateError: If update operation fails.
+
+    Returns:
+        dict: A dictionary containing:
+            - "success" (bool): True.
+            - "message" (str): Result message.
+            - "result" (dict): The updated document, restricted to `projection`.
+    """
+    if not query or not update:
+        raise ValueError("Nothing to update.")
+
+    collection_name = collection.value.name
+
+    _validate_in_place(collection_name, validate_with, validate_dict, safe_mode)
+
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    try:
+        updated = get_client()[db_name][collection_name].find_one_and_update(query,
+                                                                       update,
+                                                                       projection=projection,
+                                                                       upsert=upsert,
+                                                                       return_document=ReturnDocument.AFTER)
+    except Exception as e:
+        logger.error(f"Failed to update records in {collection_name}.")
+        logger.error(f"Error occurred during update: {str(e)}")
+        raise UpdateError(f"Failed to update documents. Info: {str(e)}")
+
+    if updated is None:
+        raise NotFoundError("No matching documents found to update.")
+
+    cache_registry.invalidate(collection_name, updated.get("_id", query.get("_id")))
+    log_event(logging.INFO, "db.update", collection=collection_name, document_id=updated.get("_id"))
+    return {"success": True, "message": "Successfully updated document.", "result": updated}
+
+def replace_records(collection: Collections,
+                    documents: List[dict],
+                    upsert: bool = True) -> dict:
+    """
+    Validates documents and replaces the stored documents with the same `_id` in one bulk write.
+
+    Raises:
+        DocumentValidationError: If validation fails.
+        DatabaseConnectionError: If `db_name` is missing.
+        UpdateError: If the bulk write fails.
+
+    Returns:
+        dict: {"success": True, "matched": <replaced documents>, "upserted": <created documents>}
+    """
+    if not documents:
+        return {"success": True, "matched": 0, "upserted": 0}
+
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    collection_name = collection.value.name
+    ids, to_validate = _split_ids(documents)
+    result = validate_records(collection.value.validation_schema_create, to_validate)
+    if not result["success"]:
+        logger.error(f"Failed document validation for {collection_name} Collection. Info: {result['failed_records']}.")
+        raise DocumentValidationError("Failed validation.")
+
+    requests = [ReplaceOne({"_id": document_id}, document, upsert=upsert)
+                for document_id, document in zip(ids, result["validated_records"])]
+    try:
+        write_result = get_client()[db_name][collection_name].bulk_write(requests, ordered=False)
+    except errors.BulkWriteError as e:
+        logger.error(f"Bulk write error occurred: {e.details}")
+        raise UpdateError(f"Failed bulk update. Info: {e.details}")
+    except Exception as e:
+        logger.error(f"Failed to update records in {collection_name}.")
+        logger.error(f"Error occurred during update: {str(e)}")
+        raise UpdateError(f"Failed to update documents. Info: {str(e)}")
+    finally:
+        for document_id in ids:
+            cache_registry.invalidate(collection_name, document_id)
+
+    log_event(logging.INFO, "db.replace", collection=collection_name,
+              matched=write_result.matched_count, upserted=write_result.upserted_count)
+    return {"success": True, "matched": write_result.matched_count, "upserted": write_result.upserted_count}
+
+def update_many_records(collection: Collections,
+                        query: dict,
+                        update: dict,
+                        array_filters: List[dict] = None) -> dict:
+    """
+    Applies `update` to every document matching `query` (e.g. to refresh denormalized copies).
+
+    Raises:
+        DatabaseConnectionError: If `db_name` is missing.
+        UpdateError: If update operation fails.
+
+    Returns:
+        dict: {"success": True, "matched": <matched documents>, "modified": <modified documents>}
+    """
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    collection_name = collection.value.name
+    try:
+        result = get_client()[db_name][collection_name].update_many(query, update, array_filters=array_filters)
+    except Exception as e:
+        logger.error(f"Failed to update records in {collection_name}.")
+        logger.error(f"Error occurred during update: {str(e)}")
+        raise UpdateError(f"Failed to update documents. Info: {str(e)}")
+    finally:
+        # The modified documents are not known; drop every cached document of the collection.
+        cache_registry.clear(collection_name)
+
+    log_event(logging.INFO, "db.update_many", collection=collection_name,
+              matched=result.matched_count, modified=result.modified_count)
+    return {"success": True, "matched": result.matched_count, "modified": result.modified_count}
 
 def aggregate(collection: Collections,
-              pipeline: list):
+              pipeline: list,
+              read_preference: ReadPreferenceMode = None):
 
     db_name = DB_NAME
     if not db_name:
@@ -288,8 +648,31 @@ def aggregate(collection: Collections,
 
     collection_name = collection.value.name
 
-    db = client[db_name]
-    collection = db[collection_name]
+    collection = _get_collection(db_name, collection_name, read_preference)
 
     result = list(collection.aggregate(pipeline))
     return result
+
+def iter_aggregate(collection: Collections,
+                   pipeline: list,
+                   batch_size: int = None,
+                   max_time_ms: int = None,
+                   read_preference: ReadPreferenceMode = None) -> Iterator[dict]:
+    """
+    Streams the results of an aggregation pipeline, `batch_size` documents per round trip.
+
+    Raises:
+        DatabaseConnectionError: If `db_name` is missing.
+    """
+    db_name = DB_NAME
+    if not db_name:
+        raise DatabaseConnectionError("Database name is not set in environment variables.")
+
+    options = {}
+    if batch_size:
+        options["batchSize"] = batch_size
+    if max_time_ms:
+        options["maxTimeMS"] = max_time_ms
+
+    with _get_collection(db_name, collection.value.name, read_preference).aggregate(pipeline, **options) as cursor:
+        yield from cursor
@@ -1,31 +1,88 @@
 import os
 import logging
+import threading
+import contextlib
+from typing import Union
+
+import pymongo
 
 from dotenv import load_dotenv
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+
+from src.database.utils.profiler import profiler
+from src.database.utils.monitoring import CommandMetricsListener, PoolMetricsListener
 
 logger = logging.getLogger('myLog')
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI, server_api=ServerApi('1'))
 
-def test_connection() -> dict:
+# Pool and timeout settings; unset values keep the driver defaults (e.g. maxPoolSize=100, minPoolSize=0).
+_POOL_SETTINGS = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+}
+pool_settings = {option: int(os.getenv(env_name)) for option, env_name in _POOL_SETTINGS.items() if os.getenv(env_name)}
+
+# Reads that tolerate bounded staleness (catalog listing, ratings, quest history) go to secondaries when
+# available. MongoDB requires max staleness of at least 90 seconds; -1 disables the bound.
+MONGO_SECONDARY_READS = os.getenv("MONGO_SECONDARY_READS", "true").lower() in ("1", "true", "yes")
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", 90))
+
+STALE_OK_READ_PREFERENCE = SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS) if MONGO_SECONDARY_READS else Primary()
+
+# The read preference modes a query can be sent with.
+ReadPreferenceMode = Union[Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest]
+
+event_listeners = [CommandMetricsListener(), PoolMetricsListener()]
+if profiler:
+    logger.warning(f"Slow query profiler is enabled (threshold {profiler.threshold_ms} ms). Do not use in production.")
+    event_listeners.append(profiler)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> MongoClient:
+    """
+    Returns the shared MongoClient, creating it on first use.
+
+    Creating the client does not block: it connects in the background, and the first operation waits
+    for server selection. Readiness is reported by `test_connection` (see `/general/health/ready`).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI,
+                                      server_api=ServerApi('1'),
+                                      event_listeners=event_listeners,
+                                      **pool_settings)
+    return _client
+
+def test_connection(timeout_ms: int = None) -> dict:
     """
     Tests the connection to the MongoDB server by sending a ping command.
 
+    Args:
+        timeout_ms: Upper bound for server selection and the ping; defaults to the client's timeouts.
+
     Returns:
         dict: A dictionary containing the connection status.
               - If successful: {"success": True, "message": "Pinged deployment. Successfully connected to MongoDB!"}
               - If failed: {"success": False, "message": "Error message: <error details>"}
     """
     try:
-        client.admin.command('ping')
+        with pymongo.timeout(timeout_ms / 1000) if timeout_ms else contextlib.nullcontext():
+            get_client().admin.command('ping')
         logger.info("Successfully connected to MongoDB.")
         return {"success": True, "message": "Pinged deployment. Successfully connected to MongoDB!"}
     except Exception as e:
         logger.error(f"Error message: {e}")
         return {"success": False, "message": f"Error message: {e}"}
-
-test_connection()
@@ -0,0 +1,6 @@
+from typing import Annotated
+
+from pydantic import AfterValidator, HttpUrl, PlainSerializer
+
+# Validated as an HTTP(S) URL but kept (and dumped) as a plain string, so validated models can be persisted as is.
+HttpUrlStr = Annotated[HttpUrl, AfterValidator(str), PlainSerializer(str, return_type=str)]
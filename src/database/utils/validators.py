@@ -1,32 +1,89 @@
+from functools import lru_cache
 from typing import Type, Union, List, Dict, Any
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 
+@lru_cache(maxsize=None)
+def get_adapter(validation_schema: Type[BaseModel]) -> TypeAdapter:
+    """Returns the cached TypeAdapter of a single `validation_schema` record."""
+    return TypeAdapter(validation_schema)
+
+@lru_cache(maxsize=None)
+def get_list_adapter(validation_schema: Type[BaseModel]) -> TypeAdapter:
+    """Returns the cached TypeAdapter validating a list of `validation_schema` records in one call."""
+    return TypeAdapter(List[validation_schema])
+
+def _dump(model: BaseModel, only_set_fields: bool) -> Dict[str, Any]:
+    document = model.model_dump(by_alias=True)
+    if not only_set_fields:
+        return document
+
+    fields = type(model).model_fields
+    set_keys = {fields[name].alias or name for name in model.model_fields_set}
+    return {key: value for key, value in document.items() if key in set_keys}
+
 def validate_records(
-    validation_schema: Type[BaseModel], records_to_check: Union[List[Dict[str, Any]], Dict[str, Any]]
+    validation_schema: Type[BaseModel], records_to_check: Union[List[Dict[str, Any]], Dict[str, Any]],
+    only_set_fields: bool = False
 ) -> Dict[str, Any]:
     """
     Validates a list of records or a single record against a specified Pydantic schema.
 
+    All records are validated with a single call of a cached TypeAdapter.
+
     Args:
         validation_schema (Type[BaseModel]): The Pydantic schema class used for validation.
         records_to_check (Union[List[Dict[str, Any]], Dict[str, Any]]): A list of records or a single record.
+        only_set_fields (bool): Keep only top-level fields present in the input (for partial updates),
+                                instead of filling in schema defaults.
 
     Returns:
         Dict[str, Any]: A dictionary containing:
             - "success" (bool): `True` if all records are valid, `False` if any fail validation.
-            - "failed_records" (List[Dict[str, Any]]): List of failed records with error details.
+            - "failed_records" (List[Dict[str, Any]]): List of failed records with their index and error details.
+            - "validated_records" (Union[List[Dict[str, Any]], Dict[str, Any], None]): Normalized output of the
+              valid records, in the same shape as the input (a single dict, or None if it failed).
+            - "valid_indexes" (List[int]): Input indexes of the records in "validated_records".
     """
+    is_list = isinstance(records_to_check, list)
+    records = records_to_check if is_list else [records_to_check]
+    adapter = get_list_adapter(validation_schema)
+
     failed_records = []
-    success = True
+    valid_indexes = range(len(records))
+    try:
+        models = adapter.validate_python(records)
+    except ValidationError as e:
+        errors_by_index = {}
+        for error in e.errors(include_url=False):
+            errors_by_index.setdefault(error["loc"][0], []).append(error)
+        failed_records = [{"index": index,
+                           "record": records[index],
+                           "error": "; ".join(f"{'.'.join(map(str, error['loc'][1:]))}: {error['msg']}" for error in errors)}
+                          for index, errors in sorted(errors_by_index.items())]
+        valid_indexes = [index for index in range(len(records)) if index not in errors_by_index]
+        models = adapter.validate_python([records[index] for index in valid_indexes])
 
-    records = records_to_check if isinstance(records_to_check, list) else [records_to_check]
+    validated_records = [_dump(model, only_set_fields) for model in models]
+    if not is_list:
+        validated_records = validated_records[0] if validated_records else None
 
-    for record in records:
-        try:
-            validation_schema(**record)
-        except ValidationError as e:
-            failed_records.append({"record": record, "error": str(e)})
-            success = False
+    return {"success": not failed_records,
+            "failed_records": failed_records,
+            "validated_records": validated_records,
+            "valid_indexes": list(valid_indexes)}
 
-    return {"success": success, "failed_records": failed_records}
+def validate_payload(validation_schema: Type[BaseModel], payload: Any, exclude_unset: bool = False) -> Dict[str, Any]:
+    """
+    Validates a request payload with the cached adapter of `validation_schema`.
+
+    Args:
+        exclude_unset (bool): Leave out fields missing from the payload, also in nested models (for partial updates).
+
+    Raises:
+        ValidationError: If the payload is invalid.
+
+    Returns:
+        Dict[str, Any]: The validated payload.
+    """
+    return get_adapter(validation_schema).validate_python(payload).model_dump(exclude_unset=exclude_unset)
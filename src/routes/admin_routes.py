@@ -0,0 +1,111 @@
+from flask import request, Response, stream_with_context
+from flask_restx import Namespace, Resource, fields
+
+from src.utils.helpers import admin_required
+from src.database.utils.setup import get_client
+from src.database.utils.profiler import profiler, build_report
+from src.services.quest_transfer import import_quests_ndjson, export_quests_ndjson, parse_batch_size
+
+admin_ns = Namespace("admin", description="Admin-only diagnostics and maintenance")
+
+slow_query_model = admin_ns.model("SlowQuery", {
+    "call_site": fields.String(description="Function that issued the command"),
+    "command_name": fields.String(description="MongoDB command name"),
+    "collection": fields.String(description="Target collection"),
+    "count": fields.Integer(description="Number of slow executions"),
+    "avg_ms": fields.Float(description="Average duration (ms)"),
+    "max_ms": fields.Float(description="Slowest duration (ms)"),
+    "command": fields.String(description="Slowest command as Extended JSON"),
+    "collscan": fields.Boolean(description="Winning plan contains a collection scan"),
+    "unindexed_lookups": fields.List(fields.String, description="$lookup targets without an index on foreignField"),
+    "stages": fields.List(fields.String, description="Query plan stages"),
+    "error": fields.String(description="Explain error, if any"),
+})
+
+slow_query_report_model = admin_ns.model("SlowQueryReport", {
+    "threshold_ms": fields.Float(description="Slow query threshold (ms)"),
+    "slow_queries": fields.List(fields.Nested(slow_query_model)),
+})
+
+import_error_model = admin_ns.model("ImportError", {
+    "line": fields.Integer(description="1-based line number in the uploaded NDJSON"),
+    "error": fields.String(description="Why the line was not imported"),
+})
+
+import_report_model = admin_ns.model("ImportReport", {
+    "inserted": fields.Integer(description="Number of imported quests"),
+    "failed": fields.Integer(description="Number of lines that were not imported"),
+    "errors": fields.List(fields.Nested(import_error_model), description="Per-line errors (truncated to the first 1000)"),
+})
+
+
+@admin_ns.route("/profiler")
+class SlowQueryProfilerReport(Resource):
+    @admin_ns.doc(security="JWT", params={"explain": "Run explain for the slowest command of each group (default true)"})
+    @admin_ns.response(200, "Success", slow_query_report_model)
+    @admin_ns.response(403, "Admin access required")
+    @admin_ns.response(404, "Profiler is disabled")
+    @admin_required
+    def get(self):
+        """Slow MongoDB commands recorded by the profiler, grouped by call site"""
+        if profiler is None:
+            return {"error": "Slow query profiler is disabled. Set MONGO_PROFILER_ENABLED=true."}, 404
+
+        explain = request.args.get("explain", "true").lower() != "false"
+        report = build_report(list(profiler.entries), client=get_client() if explain else None)
+
+        return {"threshold_ms": profiler.threshold_ms, "slow_queries": report}, 200
+
+    @admin_ns.doc(security="JWT")
+    @admin_ns.response(204, "Profiler entries cleared")
+    @admin_ns.response(403, "Admin access required")
+    @admin_ns.response(404, "Profiler is disabled")
+    @admin_required
+    def delete(self):
+        """Clear recorded slow commands"""
+        if profiler is None:
+            return {"error": "Slow query profiler is disabled. Set MONGO_PROFILER_ENABLED=true."}, 404
+
+        profiler.reset()
+        return "", 204
+
+
+@admin_ns.route("/quests/import")
+class ImportQuests(Resource):
+    @admin_ns.doc(security="JWT", params={"batch_size": "Quests validated and inserted per batch (default 500)"})
+    @admin_ns.response(200, "Import finished", import_report_model)
+    @admin_ns.response(400, "Bad Request")
+    @admin_ns.response(403, "Admin access required")
+    @admin_ns.response(500, "Internal Server Error")
+    @admin_required
+    def post(self):
+        """Import quests from an NDJSON request body (one quest per line)"""
+        try:
+            batch_size = parse_batch_size(request.args.get("batch_size"))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        try:
+            report = import_quests_ndjson(request.stream, batch_size=batch_size)
+            return report, 200
+        except Exception as e:
+            return {"error": str(e)}, 500
+
+
+@admin_ns.route("/quests/export")
+class ExportQuests(Resource):
+    @admin_ns.doc(security="JWT", params={"batch_size": "Quests fetched per cursor round trip (default 500)"})
+    @admin_ns.response(200, "NDJSON stream of quests in Extended JSON")
+    @admin_ns.response(400, "Bad Request")
+    @admin_ns.response(403, "Admin access required")
+    @admin_required
+    def get(self):
+        """Export all quests as NDJSON"""
+        try:
+            batch_size = parse_batch_size(request.args.get("batch_size"))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        return Response(stream_with_context(export_quests_ndjson(batch_size=batch_size)),
+                        mimetype="application/x-ndjson",
+                        headers={"Content-Disposition": "attachment; filename=quests.ndjson"})
@@ -4,6 +4,8 @@ from flask_restx import Namespace, Resource, fields
 
 from src.utils.exceptions import *
 from src.utils.helpers import format_payload_validation_errors
+from src.utils.admission import admission_controlled
+from src.database.utils.validators import validate_payload
 from src.services.auth import signup_with_email, login_with_email
 
 auth_ns = Namespace("auth", description="User Authentication")
@@ -63,11 +65,13 @@ class SignupWithEmail(Resource):
     @auth_ns.expect(signup_with_email_model)
     @auth_ns.response(201, 'User successfully created', signup_response_model)
     @auth_ns.response(400, 'Bad Request', error_response_model)
+    @auth_ns.response(429, 'Too Many Requests', error_response_model)
     @auth_ns.response(500, 'Internal Server Error', error_response_model)
+    @auth_ns.response(503, 'Service Unavailable - server is busy', error_response_model)
+    @admission_controlled("signup")
     def post(self):
-        data = request.get_json()
         try:
-            SignupWithEmailPayload(**data)
+            data = validate_payload(SignupWithEmailPayload, request.get_json())
         except ValidationError as e:
             return {"error": format_payload_validation_errors(e.errors())}, 400
 
@@ -85,11 +89,13 @@ class LoginWithEmail(Resource):
     @auth_ns.response(200, 'Login successful', login_response_model)
     @auth_ns.response(400, 'Bad Request', error_response_model)
     @auth_ns.response(401, 'Unauthorized - Wrong email or password', error_response_model)
+    @auth_ns.response(429, 'Too Many Requests', error_response_model)
     @auth_ns.response(500, 'Internal Server Error', error_response_model)
+    @auth_ns.response(503, 'Service Unavailable - server is busy', error_response_model)
+    @admission_controlled("login")
     def post(self):
-        data = request.get_json()
         try:
-            LoginWithEmailPayload(**data)
+            data = validate_payload(LoginWithEmailPayload, request.get_json())
         except ValidationError as e:
             return {"error": format_payload_validation_errors(e.errors())}, 400
 
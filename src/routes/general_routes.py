@@ -1,12 +1,19 @@
+import os
+
 from flask import request, jsonify
 from flask_restx import Namespace, Resource, fields
 
 from src.services.general import upload_files
+from src.database.utils.setup import test_connection
+from src.database.utils.service import indexes_ensured
 from src.utils.helpers import format_payload_validation_errors, token_required
+from src.utils.admission import admission_controlled
 
 
 general_ns = Namespace("general", description="General operations")
 
+READINESS_TIMEOUT_MS = int(os.getenv("READINESS_TIMEOUT_MS", 2000))
+
 upload_model = general_ns.model("UploadFile", {
     "files": fields.List(fields.Raw(description="File to upload", required=True))
 })
@@ -30,13 +37,31 @@ class Health(Resource):
         """A simple health endpoint"""
         return "healthy", 200
 
+@general_ns.route("/health/ready")
+class Readiness(Resource):
+    @general_ns.response(200, "Ready to serve requests")
+    @general_ns.response(503, "A dependency is unavailable")
+    def get(self):
+        """Readiness probe: pings MongoDB and checks that the indexes were created (startup does not wait for either)"""
+        # Error details are logged by test_connection and ensure_indexes, not returned to unauthenticated callers.
+        mongodb = test_connection(timeout_ms=READINESS_TIMEOUT_MS)
+        indexes = indexes_ensured()
+        checks = {"mongodb": "ok" if mongodb["success"] else "unavailable",
+                  "indexes": "ok" if indexes else "missing"}
+        if not mongodb["success"] or not indexes:
+            return {"status": "unavailable", "checks": checks}, 503
+        return {"status": "ready", "checks": checks}, 200
+
 @general_ns.route("/upload")
 class Upload(Resource):
     @general_ns.expect(upload_model)
     @general_ns.response(200, "File uploaded successfully", upload_response_model)
     @general_ns.response(400, "No file to upload")
+    @general_ns.response(429, "Too many requests")
     @general_ns.response(500, "Internal server error")
+    @general_ns.response(503, "Server is busy")
     @token_required
+    @admission_controlled("upload")
     def put(self):
         """Upload files endpoint"""
         files = request.files.getlist('files')
@@ -0,0 +1,14 @@
+from flask import Response
+from flask_restx import Namespace, Resource
+
+from src.utils.metrics import registry
+
+metrics_ns = Namespace("metrics", description="Prometheus metrics")
+
+
+@metrics_ns.route("")
+class Metrics(Resource):
+    @metrics_ns.response(200, "Metrics in Prometheus text exposition format")
+    def get(self):
+        """Prometheus scrape endpoint"""
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
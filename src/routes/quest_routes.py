@@ -6,8 +6,16 @@ from pydantic import BaseModel, ValidationError
 from flask_restx import Namespace, Resource, fields
 
 from src.utils.exceptions import *
-from src.utils.helpers import format_payload_validation_errors, token_required
-from src.services.quest import get_quest_by_id, get_all_quests, rate_quest, create_quest, get_quest_ratings
+from src.database.utils.serializers import QUEST_SERIALIZER, JOB_SERIALIZER
+from src.utils.helpers import format_payload_validation_errors, token_required, parse_object_ids, parse_fields, \
+    BATCH_LOOKUP_MAX_IDS
+from src.utils.admission import admission_controlled
+from src.services.jobs import JOB_QUEUE_FULL_RETRY_AFTER_SECONDS
+from src.utils.streaming import stream_json_array
+from src.database.quest.schema import QuestPatch
+from src.database.utils.validators import validate_payload
+from src.services.quest import get_quest_by_id, iter_all_quests_serialized, rate_quest, create_quest, get_quest_ratings, \
+    submit_create_quest, get_quest_job, get_quest_level, update_quest, get_quests_by_ids, quest_detail_projection, QUEST_FIELDS
 
 quest_ns = Namespace("quest", description="Quest Operations.")
 quests_ns = Namespace("quests", description="Quests Operations.")
@@ -46,12 +54,67 @@ quest_response_model = quest_ns.model('Quest', {
     "main_picture": fields.String(required=False, description='URL of the main picture for the quest (optional)'),
     "created_by": fields.String(description="Author's unique identifier (_id) as a string"),
     "levels": fields.List(fields.Nested(quest_level_model), description="A list of levels in the quest (can be input or quiz levels)"),
+    "version": fields.Integer(description="Quest version, to send with updates"),
+})
+
+level_update_model = quest_ns.model('LevelUpdate', {
+    "id": fields.String(required=True, description="ID of the level to change"),
+    "name": fields.String(required=False, description="Name of the level"),
+    "question": fields.String(required=False, description="The question for the level"),
+    "picture_urls": fields.List(fields.String, required=False, description="URLs of pictures for the level"),
+    "options": fields.List(fields.Nested(quest_level_option_model), required=False, description="Quiz levels only"),
+    "correct_option_id": fields.String(required=False, description="Quiz levels only"),
+    "try_limit": fields.Integer(required=False, description="Input levels only"),
+})
+
+level_changes_model = quest_ns.model('LevelChanges', {
+    "update": fields.List(fields.Nested(level_update_model), description="Field changes of existing levels"),
+    "add": fields.List(fields.Nested(quest_level_model), description="New levels, appended at the end"),
+    "remove": fields.List(fields.String, description="IDs of levels to remove"),
+})
+
+update_quest_model = quest_ns.model('UpdateQuest', {
+    "version": fields.Integer(required=True, description="The quest version the changes are based on"),
+    "name": fields.String(required=False, description='Name of the quest'),
+    "title": fields.String(required=False, description='Title of the quest'),
+    "description": fields.String(required=False, description='Description of the quest'),
+    "time_limit": fields.Integer(required=False, description='Time limit for completing the quest'),
+    "difficulty": fields.String(required=False, description='Difficulty level of the quest'),
+    "main_picture": fields.String(required=False, description='URL of the main picture for the quest'),
+    "levels": fields.Nested(level_changes_model, required=False,
+                            description="Only one of update, add and remove per request"),
+})
+
+update_quest_response_model = quest_ns.model('UpdateQuestResponse', {
+    "success": fields.Boolean(description="True if the quest was updated"),
+    "message": fields.String(description="Result message"),
+    "version": fields.Integer(description="New quest version"),
 })
 
 quests_response_model = quest_ns.model("QuestsResponse", {
     "quests": fields.List(fields.Nested(quest_response_model), description="A list of all quests")
 })
 
+quest_card_model = quest_ns.model("QuestCard", {
+    "_id": fields.String(description="Quest's unique identifier (_id) as a string"),
+    "name": fields.String(description='Name of the quest'),
+    "title": fields.String(description='Title of the quest'),
+    "description": fields.String(description='Description of the quest'),
+    "time_limit": fields.Integer(description='Time limit for completing the quest'),
+    "difficulty": fields.String(description='Difficulty level of the quest'),
+    "main_picture": fields.String(description='URL of the main picture for the quest'),
+    "created_by": fields.String(description="Author's unique identifier (_id) as a string"),
+    "created_at": fields.DateTime(description="Creation timestamp"),
+    "times_played": fields.Integer(description="Number of times the quest has been played"),
+    "avg_rating": fields.Float(description="Average rating"),
+    "version": fields.Integer(description="Quest version"),
+})
+
+quests_by_ids_response_model = quest_ns.model("QuestsByIdsResponse", {
+    "quests": fields.List(fields.Nested(quest_card_model), description="Found quests, in the order of the requested ids"),
+    "missing": fields.List(fields.String, description="Requested ids that were not found"),
+})
+
 quest_rating_model = quest_ns.model('QuestRating', {
     "rating": fields.Integer(required=True, description='User rating'),
     "review": fields.String(required=False, description='User review')
@@ -70,14 +133,36 @@ quest_ratings_response_model = quest_ns.model('QuestRatingsResponse', {
 
 })
 
+quest_job_model = quest_ns.model('QuestJob', {
+    "job_id": fields.String(description="Job identifier"),
+    "kind": fields.String(description="Job kind, e.g. 'create_quest'"),
+    "status": fields.String(description="pending, running, succeeded or failed"),
+    "attempts": fields.Integer(description="Number of attempts so far"),
+    "result": fields.Nested(quest_response_model, allow_null=True, description="Created quest, once succeeded"),
+    "error": fields.String(description="Error message, if failed"),
+    "created_at": fields.DateTime(description="Job submission timestamp"),
+    "updated_at": fields.DateTime(description="Last status change timestamp"),
+})
+
+
+def _wants_async() -> bool:
+    return (request.args.get("async", "").lower() in ("1", "true", "yes")
+            or "respond-async" in request.headers.get("Prefer", ""))
+
+
 @quest_ns.route("")
 class CreateQuest(Resource):
-    @quest_ns.doc(security="JWT")
+    @quest_ns.doc(security="JWT", params={"async": "Return 202 with a job id and create the quest in the background "
+                                                   "(same as the `Prefer: respond-async` header)"})
     @quest_ns.expect(create_quest_model)
     @quest_ns.response(201, 'Quest successfully created', quest_response_model)
+    @quest_ns.response(202, 'Quest creation accepted', quest_job_model)
     @quest_ns.response(400, 'Bad Request')
+    @quest_ns.response(429, 'Too Many Requests')
     @quest_ns.response(500, 'Internal Server Error')
+    @quest_ns.response(503, 'Server is busy')
     @token_required
+    @admission_controlled("create_quest")
     def post(self):
         """Create new quest"""
         data = request.form.to_dict()
@@ -89,6 +174,13 @@ class CreateQuest(Resource):
             files[level_id] = request.files.getlist(level_id)
 
         try:
+            if _wants_async():
+                try:
+                    job = submit_create_quest(data=data, files=files)
+                except JobQueueFull as e:
+                    return {"error": str(e)}, 503, {"Retry-After": str(JOB_QUEUE_FULL_RETRY_AFTER_SECONDS)}
+                return JOB_SERIALIZER(job), 202, {"Location": f"/quest/jobs/{job['job_id']}"}
+
             result = create_quest(data=data, files=files)
             return result, 201
         except (ValueError, DocumentValidationError, InvalidId) as e:
@@ -96,28 +188,47 @@ class CreateQuest(Resource):
         except (DatabaseConnectionError, InsertionError, Exception) as e:
             return {"error": str(e)}, 500
 
+@quest_ns.route("/jobs/<string:job_id>")
+@quest_ns.param("job_id", "The job ID returned by an asynchronous POST /quest")
+class QuestJob(Resource):
+    @quest_ns.doc(security="JWT")
+    @quest_ns.response(200, "Success", quest_job_model)
+    @quest_ns.response(404, "Job not found or expired")
+    @quest_ns.response(401, "Unauthorized")
+    @token_required
+    def get(self, job_id):
+        """Get the status of a quest creation job"""
+        try:
+            return JOB_SERIALIZER(get_quest_job(job_id=job_id, user_id=request.user_id)), 200
+        except NotFoundError as e:
+            return {"error": str(e)}, 404
+        except Unauthorized as e:
+            return {"error": str(e)}, 401
+
 @quest_ns.route("/<string:quest_id>")
 @quest_ns.param("quest_id", "The unique ID of the quest")
 class GetUpdateQuest(Resource):
+    @quest_ns.doc(params={"levels": "'full' (default) or 'summary' to return only level ids and types; "
+                                    "fetch level content with GET /quest/<quest_id>/levels/<level_id>",
+                          "fields": f"Comma separated fields to return (default all): {', '.join(QUEST_FIELDS)}"})
     @quest_ns.response(200, "Success", quest_response_model)
+    @quest_ns.response(400, "Invalid levels mode or fields")
     @quest_ns.response(404, "Quest not found")
     @quest_ns.response(401, "Unauthorized")
     @token_required
     def get(self, quest_id):
         """Retrieve quest information by ID"""
-        try:
-            quest = get_quest_by_id(quest_id)
-
-            quest["_id"] = str(quest["_id"])
-            quest["created_by"] = str(quest["created_by"])
-            quest["created_at"] = quest["created_at"].isoformat()
+        levels_mode = request.args.get("levels", "full")
+        if levels_mode not in ("full", "summary"):
+            return {"error": "levels must be 'full' or 'summary'."}, 400
 
-            quest_ratings = get_quest_ratings(quest_id)
-
-            for rating in quest_ratings:
-                rating["user_id"] = str(rating["user_id"])
-
-            quest["ratings"] = quest_ratings
+        try:
+            fields = parse_fields(request.args.get("fields"), QUEST_FIELDS)
+            projection = quest_detail_projection(fields, levels_summary=levels_mode == "summary")
+            quest = QUEST_SERIALIZER(get_quest_by_id(quest_id, projection=projection))
+            # The ratings aggregation (with user info) only runs when ratings are requested.
+            if fields is None or "ratings" in fields:
+                quest["ratings"] = get_quest_ratings(quest_id)
 
             return {"quest": quest}, 200
         except ValueError as e:
@@ -127,7 +238,52 @@ class GetUpdateQuest(Resource):
         except Exception as e:
             return {"error": str(e)}, 500
 
-    #TODO: update quest
+    @quest_ns.doc(security="JWT")
+    @quest_ns.expect(update_quest_model)
+    @quest_ns.response(200, "Quest updated", update_quest_response_model)
+    @quest_ns.response(400, "Invalid changes")
+    @quest_ns.response(401, "Unauthorized")
+    @quest_ns.response(404, "Quest or level not found")
+    @quest_ns.response(409, "Quest was modified since the given version")
+    @token_required
+    def patch(self, quest_id):
+        """Update quest fields and levels (creator only), based on the given quest version"""
+        try:
+            changes = validate_payload(QuestPatch, request.get_json(silent=True), exclude_unset=True)
+        except ValidationError as e:
+            return {"error": format_payload_validation_errors(e.errors())}, 400
+
+        try:
+            return update_quest(quest_id=quest_id, user_id=request.user_id, changes=changes), 200
+        except (ValueError, InvalidId) as e:
+            return {"error": str(e)}, 400
+        except Unauthorized as e:
+            return {"error": str(e)}, 401
+        except NotFoundError as e:
+            return {"error": str(e)}, 404
+        except VersionConflictError as e:
+            return {"error": str(e), "version": e.current_version}, 409
+        except Exception as e:
+            return {"error": str(e)}, 500
+
+@quest_ns.route("/<string:quest_id>/levels/<string:level_id>")
+@quest_ns.param("quest_id", "The unique ID of the quest")
+@quest_ns.param("level_id", "The ID of the level within the quest")
+class QuestLevel(Resource):
+    @quest_ns.response(200, "Success", quest_level_model)
+    @quest_ns.response(404, "Quest or level not found")
+    @quest_ns.response(401, "Unauthorized")
+    @token_required
+    def get(self, quest_id, level_id):
+        """Retrieve a single level of a quest"""
+        try:
+            return {"level": get_quest_level(quest_id=quest_id, level_id=level_id)}, 200
+        except InvalidId as e:
+            return {"error": str(e)}, 400
+        except NotFoundError as e:
+            return {"error": str(e)}, 404
+        except Exception as e:
+            return {"error": str(e)}, 500
 
 @quest_ns.route("/<string:quest_id>/rate")
 @quest_ns.param("quest_id", "The unique ID of the quest")
@@ -156,15 +312,22 @@ class RateQuest(Resource):
 
 @quests_ns.route("")
 class AllQuests(Resource):
+    @quest_ns.doc(params={"ids": f"Comma separated quest ids, at most {BATCH_LOOKUP_MAX_IDS}; returns quest cards "
+                                 f"(without levels and ratings) in the order of the ids instead of all quests",
+                          "fields": f"Comma separated fields to return: {', '.join(QUEST_FIELDS)}"})
     @quest_ns.response(200, "Success", quests_response_model)
     @quest_ns.response(400, 'Bad Request')
     @quest_ns.response(500, 'Internal Server Error')
     @token_required
     def get(self):
-        """Get all quests"""
+        """Get all quests, or the quests with the given ids"""
         try:
-            result = get_all_quests()
-            return result, 200
+            fields = parse_fields(request.args.get("fields"), QUEST_FIELDS)
+            if "ids" in request.args:
+                return get_quests_by_ids(parse_object_ids(request.args["ids"]), fields=fields), 200
+            return stream_json_array(iter_all_quests_serialized(fields=fields))
+        except ValueError as e:
+            return {"error": str(e)}, 400
         except Exception as e:
             return {"error": str(e)}, 500
 
@@ -180,9 +343,6 @@ class GetQuestRatings(Resource):
         try:
             quest_ratings = get_quest_ratings(quest_id)
 
-            for rating in quest_ratings:
-                rating["user_id"] = str(rating["user_id"])
-
             return {"quest_ratings": quest_ratings}, 200
         except ValueError as e:
             return {"error": str(e)}, 400
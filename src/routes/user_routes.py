@@ -7,10 +7,14 @@ from pydantic import BaseModel, ValidationError
 from flask_restx import Namespace, Resource, fields
 
 from src.utils.exceptions import *
-from src.services.user import get_user_by_id, update_user, get_user_quest_history, update_user_quest_history
-from src.utils.helpers import format_payload_validation_errors, token_required
+from src.services.user import get_user_by_id, get_users_by_ids, update_user, get_user_quest_history, update_user_quest_history, \
+    get_user_stats, USER_FIELDS, USERS_BATCH_FIELDS
+from src.utils.helpers import format_payload_validation_errors, token_required, parse_object_ids, parse_fields, \
+    BATCH_LOOKUP_MAX_IDS
+from src.database.utils.validators import validate_payload
 
 user_ns = Namespace("user", description="Endpoints for user profile management, including account details and settings.")
+users_ns = Namespace("users", description="Users Operations.")
 
 user_model = user_ns.model('UserInfo', {
     "_id": fields.String(description="User's unique identifier (_id) as a string"),
@@ -23,6 +27,18 @@ user_model = user_ns.model('UserInfo', {
     "quest_history": fields.List(fields.String, description="List of quest history"),
 })
 
+user_card_model = users_ns.model("UserCard", {
+    "_id": fields.String(description="User's unique identifier (_id) as a string"),
+    "name": fields.String(description="User's name"),
+    "about_me": fields.String(description="About the user"),
+    "profile_picture": fields.String(description="Profile picture S3 URL", default=None),
+})
+
+users_response_model = users_ns.model("UsersResponse", {
+    "users": fields.List(fields.Nested(user_card_model), description="Found users, in the order of the requested ids"),
+    "missing": fields.List(fields.String, description="Requested ids that were not found"),
+})
+
 quest_history_model = user_ns.model("QuestHistory", {
     "quest_id": fields.String(required=True, description="Unique identifier for the quest"),
     "quest_difficulty": fields.String(required=True, description="Quest difficulty"),
@@ -40,6 +56,18 @@ user_quest_history_model = user_ns.model("UserQuestHistory", {
     "quest_history": fields.List(fields.Nested(quest_history_model), description="List of quests attempted by the user"),
 })
 
+user_stats_model = user_ns.model("UserStats", {
+    "_id": fields.String(description="User's unique identifier (_id) as a string"),
+    "quests_attempted": fields.Integer(description="Number of quest attempts"),
+    "quests_completed": fields.Integer(description="Number of completed attempts"),
+    "scored_attempts": fields.Integer(description="Number of attempts with a result"),
+    "total_score": fields.Integer(description="Sum of results"),
+    "average_score": fields.Float(description="Average result of scored attempts, or None"),
+    "total_time_spent": fields.Integer(description="Total time spent on quests (in seconds)"),
+    "quests_created": fields.Integer(description="Number of created quests"),
+    "updated_at": fields.DateTime(description="Timestamp of the last change"),
+})
+
 # Payload model for updating user info
 update_user_model = user_ns.model("UpdateUser", {
     "name": fields.String(description="New user name", required=False),
@@ -68,17 +96,18 @@ class UpdateQuestHistoryPayload(BaseModel):
 @user_ns.route("/<string:user_id>")
 @user_ns.param("user_id", "The unique ID of the user")
 class UserResource(Resource):
-    @user_ns.doc(security="JWT")
+    @user_ns.doc(security="JWT", params={"fields": f"Comma separated fields to return (default all): {', '.join(USER_FIELDS)}"})
     @user_ns.response(200, "Success", user_model)
+    @user_ns.response(400, "Invalid fields")
     @user_ns.response(404, "User not found")
     @user_ns.response(401, "Unauthorized")
     @token_required
     def get(self, user_id):
         """Retrieve user information by ID"""
         try:
-            user = get_user_by_id(user_id)
+            user = get_user_by_id(user_id, fields=parse_fields(request.args.get("fields"), USER_FIELDS))
             if user_id != request.user_id:
-                del user["email"]
+                user.pop("email", None)
 
             return {"user": user}, 200
         except (ValueError, InvalidId) as e:
@@ -133,10 +162,6 @@ class UserQuestHistoryResource(Resource):
         try:
             quest_history = get_user_quest_history(user_id)
 
-            for quest in quest_history:
-                quest["quest_id"] = str(quest["quest_id"])
-                quest["attempted_at"] = quest["attempted_at"].isoformat()
-
             return {"quest_history": quest_history}, 200
         except (ValueError, InvalidId) as e:
             return {"error": str(e)}, 400
@@ -155,10 +180,8 @@ class UserQuestHistoryResource(Resource):
         if user_id != request.user_id:
             return {"error": "Unauthorized access"}, 401
 
-        data = request.get_json()
-
         try:
-            UpdateQuestHistoryPayload(**data)
+            data = validate_payload(UpdateQuestHistoryPayload, request.get_json())
         except ValidationError as e:
             return {"error": format_payload_validation_errors(e.errors())}, 400
 
@@ -172,3 +195,41 @@ class UserQuestHistoryResource(Resource):
             return {"error": str(e)}, 404
         except Exception as e:
             return {"error": str(e)}, 500
+
+
+@user_ns.route("/<string:user_id>/stats")
+@user_ns.param("user_id", "The unique ID of the user")
+class UserStatsResource(Resource):
+    @user_ns.response(200, "Success", user_stats_model)
+    @user_ns.response(404, "User not found")
+    @user_ns.response(401, "Unauthorized")
+    @token_required
+    def get(self, user_id):
+        """Retrieve user statistics (maintained incrementally)"""
+        try:
+            return {"stats": get_user_stats(user_id)}, 200
+        except (ValueError, InvalidId) as e:
+            return {"error": str(e)}, 400
+        except NotFoundError as e:
+            return {"error": str(e)}, 404
+        except Exception as e:
+            return {"error": str(e)}, 500
+
+
+@users_ns.route("")
+class Users(Resource):
+    @users_ns.doc(security="JWT", params={"ids": f"Comma separated user ids, at most {BATCH_LOOKUP_MAX_IDS}",
+                                          "fields": f"Comma separated fields to return: {', '.join(USERS_BATCH_FIELDS)}"})
+    @users_ns.response(200, "Success", users_response_model)
+    @users_ns.response(400, "Invalid ids")
+    @users_ns.response(401, "Unauthorized")
+    @token_required
+    def get(self):
+        """Retrieve several users by ID in one request"""
+        try:
+            fields = parse_fields(request.args.get("fields"), USERS_BATCH_FIELDS)
+            return get_users_by_ids(parse_object_ids(request.args.get("ids")), fields=fields), 200
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            return {"error": str(e)}, 500
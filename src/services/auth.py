@@ -6,16 +6,16 @@ from src.database.utils.service import add_new_records
 from src.database.utils.collections import Collections
 from src.database.user.service import find_user_by_email
 from src.utils.helpers import generate_jwt_token, validate_email
-from src.utils.exceptions import EmailInUse, InvalidEmail, WrongEmailOrPassword
+from src.utils.exceptions import EmailInUse, InvalidEmail, WrongEmailOrPassword, DuplicateRecordError
 
 
 def signup_with_email(data: dict) -> Tuple[str, dict]:
     """
     Registers a new user by signing up with an email, name, and password.
 
-    This function checks if the email is already in use. If the email is not in use,
-    it hashes the user's password and creates a new user record in the database. It then
-    generates and returns a JSON Web Token (JWT) for the newly created user.
+    This function hashes the user's password and creates a new user record in the database
+    with a single insert; the unique index on `email` rejects emails that are already in use.
+    It then generates and returns a JSON Web Token (JWT) for the newly created user.
 
     Args:
         data (dict): A dictionary containing user details with the following keys:
@@ -38,11 +38,6 @@ def signup_with_email(data: dict) -> Tuple[str, dict]:
     if not email_validation_success:
         raise InvalidEmail(message)
 
-    existing_user = find_user_by_email(user_email)
-
-    if existing_user["result"]:
-        raise EmailInUse()
-
     hashed_password = generate_password_hash(user_password)
 
     new_user = {
@@ -55,13 +50,15 @@ def signup_with_email(data: dict) -> Tuple[str, dict]:
         "created_quests": [],
         "quest_history": []
     }
-    result = add_new_records(collection=Collections.USER, documents=new_user)
+    try:
+        result = add_new_records(collection=Collections.USER, documents=new_user)
+    except DuplicateRecordError:
+        raise EmailInUse()
 
-    new_user["_id"] = str(result["inserted_id"])
-    new_user["created_at"] = new_user["created_at"].isoformat()
-    del new_user["password"]
+    new_user["_id"] = result["inserted_id"]
+    user_info = Collections.USER.value.serializer(new_user)
 
-    return generate_jwt_token(new_user["_id"]), new_user
+    return generate_jwt_token(user_info["_id"]), user_info
 
 def login_with_email(data: dict) -> Tuple[str, dict]:
     """
@@ -95,16 +92,6 @@ def login_with_email(data: dict) -> Tuple[str, dict]:
     if not check_password_hash(existing_user["password"], user_password):
         raise WrongEmailOrPassword()
 
-    token = generate_jwt_token(str(existing_user["_id"]))
-
-    existing_user["_id"] = str(existing_user["_id"])
-    existing_user["created_at"] = existing_user["created_at"].isoformat()
-    existing_user["created_quests"] = [str(quest) for quest in existing_user["created_quests"]]
-
-    for quest in existing_user["quest_history"]:
-        quest["quest_id"] = str(quest["quest_id"])
-        quest["attempted_at"] = quest["attempted_at"].isoformat()
-
-    del existing_user["password"]
+    user_info = Collections.USER.value.serializer(existing_user)
 
-    return token, existing_user
+    return generate_jwt_token(user_info["_id"]), user_info
@@ -0,0 +1,159 @@
+import os
+import time
+import uuid
+import logging
+import contextvars
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Type
+
+from dotenv import load_dotenv
+
+from src.utils.log import log_event
+from src.utils.exceptions import JobQueueFull
+from src.utils.metrics import BACKGROUND_JOBS, BACKGROUND_JOB_RETRIES
+
+load_dotenv()
+logger = logging.getLogger('myLog')
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", 3))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 0.5))
+JOB_STORE_MAX_ENTRIES = int(os.getenv("JOB_STORE_MAX_ENTRIES", 1000))
+# Jobs waiting or running at once; each may hold its buffered uploads until it finishes.
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 100))
+# Retry-After sent with the 503 returned when the queue is full.
+JOB_QUEUE_FULL_RETRY_AFTER_SECONDS = 5
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Runs jobs on a thread pool and keeps their status in memory.
+
+    A failing job is retried up to `max_retries` times with exponential backoff, unless it raises one
+    of its `permanent_errors`. At most `max_pending` jobs wait or run at once; beyond that `submit`
+    raises `JobQueueFull`. Statuses of finished jobs are evicted oldest first beyond `max_entries`,
+    unfinished ones are always kept, so the store holds at most `max_entries + max_pending` jobs.
+    Status is per worker process, like the metrics (the app runs a single worker).
+    """
+
+    def __init__(self,
+                 max_workers: int = JOB_WORKERS,
+                 max_retries: int = JOB_MAX_RETRIES,
+                 retry_backoff_seconds: float = JOB_RETRY_BACKOFF_SECONDS,
+                 max_entries: int = JOB_STORE_MAX_ENTRIES,
+                 max_pending: int = JOB_MAX_PENDING):
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_entries = max_entries
+        self.max_pending = max_pending
+        self._unfinished = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Registers `callback(job)`, called after every job finishes (succeeded or failed)."""
+        self._listeners.append(callback)
+
+    def submit(self,
+               kind: str,
+               func: Callable,
+               *args,
+               owner_id: str = None,
+               permanent_errors: Tuple[Type[BaseException], ...] = ()) -> dict:
+        """
+        Queues `func(*args)`; its return value becomes the job result.
+
+        Raises:
+            JobQueueFull: If `max_pending` jobs are already waiting or running.
+
+        Returns:
+            dict: The job status (see `get`).
+        """
+        now = datetime.datetime.now(datetime.UTC)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner_id": owner_id,
+            "status": PENDING,
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            if self._unfinished >= self.max_pending:
+                raise JobQueueFull()
+            self._unfinished += 1
+            self._jobs[job["job_id"]] = job
+            self._evict()
+            snapshot = dict(job)
+
+        # Runs in the submitter's context so the job's log lines keep the request's correlation id.
+        self._executor.submit(contextvars.copy_context().run, self._run, job, func, args, permanent_errors)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Returns a copy of the job status, or None if the job is unknown or was evicted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _evict(self):
+        overflow = len(self._jobs) - self.max_entries
+        if overflow <= 0:
+            return
+        # Unfinished jobs are never evicted: their owners are still waiting for the result.
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (SUCCEEDED, FAILED)]
+        for job_id in finished[:overflow]:
+            del self._jobs[job_id]
+
+    def _update(self, job: dict, **fields) -> dict:
+        with self._lock:
+            job.update(fields, updated_at=datetime.datetime.now(datetime.UTC))
+            return dict(job)
+
+    def _run(self, job: dict, func: Callable, args: tuple, permanent_errors: tuple):
+        for attempt in range(1, self.max_retries + 2):
+            self._update(job, status=RUNNING, attempts=attempt)
+            try:
+                snapshot = self._update(job, status=SUCCEEDED, result=func(*args), error=None)
+                break
+            except permanent_errors as e:
+                snapshot = self._update(job, status=FAILED, error=str(e))
+                break
+            except Exception as e:
+                if attempt > self.max_retries:
+                    logger.error(f"Job {job['job_id']} ({job['kind']}) failed after {attempt} attempts: {e}")
+                    snapshot = self._update(job, status=FAILED, error=str(e))
+                    break
+                BACKGROUND_JOB_RETRIES.inc(job["kind"])
+                logger.warning(f"Job {job['job_id']} ({job['kind']}) attempt {attempt} failed, retrying: {e}")
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+
+        with self._lock:
+            self._unfinished -= 1
+            self._evict()
+
+        BACKGROUND_JOBS.inc(job["kind"], snapshot["status"])
+        log_event(logging.INFO, "job.finished", job_id=job["job_id"], kind=job["kind"],
+                  status=snapshot["status"], attempts=snapshot["attempts"])
+
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Job listener failed for job {job['job_id']}: {e}")
+
+
+job_queue = JobQueue()
@@ -1,29 +1,32 @@
+import io
 import datetime
+from typing import List, Tuple, Union
 from bson import ObjectId
 from bson.errors import InvalidId
+from werkzeug.datastructures import FileStorage
 
-from src.services.user import update_user
+from src.services.user import update_user, refresh_quest_summaries
+from src.services.jobs import job_queue
 from src.services.general import upload_files
+from src.utils.helpers import upload_to_s3, order_by_ids
+from src.utils.cache import DocumentCache, cache_registry
 from src.database.utils.collections import Collections
-from src.database.utils.service import add_new_records
-from src.utils.exceptions import NotFoundError, Unauthorized
-from src.database.quest.service import find_quest_by_id, find_all_quests, add_new_rating, get_quest_ratings_full_info
+from src.database.utils.service import add_new_records, logger
+from src.database.utils.validators import validate_records
+from src.database.user_stats.service import increment_user_stats
+from src.database.utils.serializers import QUEST_RATING_SERIALIZER
+from src.utils.exceptions import NotFoundError, Unauthorized, DocumentValidationError, DuplicateRecordError, VersionConflictError, \
+    JobQueueFull
+from src.database.quest.service import find_quest_by_id, find_quest_level, iter_all_quests, add_new_rating, get_quest_ratings_full_info, \
+    update_quest_document, find_quests_by_ids, QUEST_UPDATE_STATE_PROJECTION
 
+QUESTS_STREAM_BATCH_SIZE = 100
 
-def create_quest(data: dict, files: dict) -> dict:
-
-    uploaded_pictures = {}
-    for key, files in files.items():
-        uploaded_pictures[key] = list(upload_files(files).values())
-
-    if uploaded_pictures.get("main_picture"):
-        data["main_picture"] = uploaded_pictures.get("main_picture")[0]
-    else:
-        data["main_picture"] = None
+# Quest documents by projection; evicted on writes and by the change stream invalidation bus.
+quest_cache = cache_registry.register(DocumentCache("quest", Collections.QUEST.value.name))
 
-    for level in data["levels"]:
-        level["picture_urls"] = uploaded_pictures.get(level["id"], [])
 
+def _prepare_quest(data: dict):
     data["created_at"] = datetime.datetime.now(datetime.UTC)
     data["time_limit"] = int(data["time_limit"])
     data["ratings"] = []
@@ -35,61 +38,374 @@ def create_quest(data: dict, files: dict) -> dict:
     except InvalidId as e:
         raise e
 
+def _attach_pictures(data: dict, uploaded_pictures: dict):
+    if uploaded_pictures.get("main_picture"):
+        data["main_picture"] = uploaded_pictures.get("main_picture")[0]
+    else:
+        data["main_picture"] = None
+
+    for level in data["levels"]:
+        level["picture_urls"] = uploaded_pictures.get(level["id"], [])
+
+def _insert_quest(data: dict) -> dict:
     result = add_new_records(collection=Collections.QUEST, documents=data)
 
+    data["_id"] = result["inserted_id"]
+    increment_user_stats(data["created_by"], {"quests_created": 1})
+
     update_user_with_quest = {"created_quests": data["_id"]}
     update_user(user_id=data["created_by"], data=update_user_with_quest, update_type="$addToSet", safe_mode=False)
 
-    data["_id"] = str(result["inserted_id"])
-    data["created_by"] = str(data["created_by"])
-    data["created_at"] = data["created_at"].isoformat()
+    return Collections.QUEST.value.serializer(data)
+
+def create_quest(data: dict, files: dict) -> dict:
+
+    uploaded_pictures = {}
+    for key, files in files.items():
+        uploaded_pictures[key] = list(upload_files(files).values())
+
+    _attach_pictures(data, uploaded_pictures)
+    _prepare_quest(data)
+
+    return _insert_quest(data)
+
+def _buffer_file(file: FileStorage) -> FileStorage:
+    # Request streams are closed once the response is sent, so the job gets its own in-memory copy.
+    return FileStorage(stream=io.BytesIO(file.read()), filename=file.filename, content_type=file.content_type)
+
+def _run_create_quest_job(data: dict, files: dict, uploaded_pictures: dict, completed_steps: set) -> dict:
+    """
+    Uploads pictures, inserts the quest, counts it in the creator's statistics and adds it to the
+    creator's `created_quests`.
+
+    Safe to retry: pictures uploaded by a previous attempt are kept in `uploaded_pictures`, the quest `_id`
+    is assigned before the first attempt so a repeated insert is detected, the statistics increment is
+    recorded in `completed_steps` once done, and the creator update is `$addToSet`.
+    """
+    for key, key_files in files.items():
+        if key not in uploaded_pictures:
+            urls = []
+            for file in key_files:
+                file.stream.seek(0)
+                urls.append(upload_to_s3(file))
+            uploaded_pictures[key] = urls
+
+    _attach_pictures(data, uploaded_pictures)
+
+    try:
+        add_new_records(collection=Collections.QUEST, documents=data)
+    except DuplicateRecordError:
+        logger.info(f"Quest {data['_id']} was inserted by a previous attempt.")
+
+    # Its own step: an attempt that failed after the insert still gets the quest counted on retry.
+    if "user_stats" not in completed_steps:
+        increment_user_stats(data["created_by"], {"quests_created": 1})
+        completed_steps.add("user_stats")
+
+    update_user(user_id=data["created_by"], data={"created_quests": data["_id"]}, update_type="$addToSet", safe_mode=False)
+
+    return Collections.QUEST.value.serializer(data)
+
+def submit_create_quest(data: dict, files: dict) -> dict:
+    """
+    Checks the quest payload and queues its creation (uploads, insertion, creator update) as a background job.
+
+    Raises:
+        DocumentValidationError: If the quest payload is invalid.
+        ValueError, InvalidId: If `time_limit` or `created_by` cannot be converted.
+        JobQueueFull: If too many background jobs are pending.
+
+    Returns:
+        dict: The job status; poll `GET /quest/jobs/<job_id>` for the created quest.
+    """
+    _prepare_quest(data)
+    _attach_pictures(data, {})
+
+    result = validate_records(Collections.QUEST.value.validation_schema_create, data)
+    if not result["success"]:
+        raise DocumentValidationError(f"Failed validation. Info: {result['failed_records'][0]['error']}")
+
+    data["_id"] = ObjectId()
+
+    buffered_files = {key: [_buffer_file(file) for file in key_files] for key, key_files in files.items()}
+
+    return job_queue.submit("create_quest", _run_create_quest_job, data, buffered_files, {}, set(),
+                            owner_id=str(data["created_by"]),
+                            permanent_errors=(DocumentValidationError, ValueError, InvalidId))
 
-    return data
+def schedule_quest_summary_refresh(quest_id: Union[str, ObjectId]) -> dict:
+    """
+    Queues the fan-out of a quest's new title, difficulty, main picture and level count to the
+    quest history entries that store a copy of them. Call after editing any of these fields.
 
-def get_quest_by_id(quest_id: str):
-    result = find_quest_by_id(quest_id)
-    quest = result["result"]
+    Raises:
+        JobQueueFull: If too many background jobs are pending.
+
+    Returns:
+        dict: The job status.
+    """
+    return job_queue.submit("refresh_quest_summaries", refresh_quest_summaries, quest_id,
+                            permanent_errors=(NotFoundError, InvalidId))
+
+# Quest fields copied to quest history entries; the level count is copied too.
+SUMMARY_FIELDS = ("title", "difficulty", "main_picture")
+QUIZ_LEVEL_FIELDS = frozenset(("options", "correct_option_id"))
+INPUT_LEVEL_FIELDS = frozenset(("try_limit",))
+# Level fields every stored level has a value for.
+REQUIRED_LEVEL_FIELDS = frozenset(("name", "question", "picture_urls"))
+
+def _level_type(level_update: dict) -> Union[str, None]:
+    fields = level_update.keys()
+    if fields & QUIZ_LEVEL_FIELDS and fields & INPUT_LEVEL_FIELDS:
+        raise ValueError(f"Level {level_update['id']} cannot have both quiz and input fields.")
+    if fields & QUIZ_LEVEL_FIELDS:
+        return "quiz"
+    if fields & INPUT_LEVEL_FIELDS:
+        return "input"
+    return None
+
+def _build_quest_update(changes: dict):
+    """
+    Translates a validated `QuestPatch` into targeted update operators, so the write contains only
+    the changed values instead of the whole quest (and its `levels` array).
+
+    Returns:
+        tuple: (update document, conditions on the stored quest, array filters)
+    """
+    update, conditions, array_filters = {}, [], []
+
+    fields = {key: value for key, value in changes.items() if key not in ("version", "levels")}
+    if fields:
+        update["$set"] = fields
+
+    level_changes = {key: value for key, value in (changes.get("levels") or {}).items() if value}
+    if len(level_changes) > 1:
+        # All of them write the `levels` path, and MongoDB rejects conflicting paths in one update.
+        raise ValueError("Level updates, additions and removals must be sent in separate requests.")
+
+    for index, level_update in enumerate(level_changes.get("update", [])):
+        level_id = level_update["id"]
+        level_fields = {key: value for key, value in level_update.items() if key != "id"}
+        if not level_fields:
+            raise ValueError(f"No changes given for level {level_id}.")
+        cleared = sorted(key for key in level_fields.keys() & REQUIRED_LEVEL_FIELDS if level_fields[key] is None)
+        if cleared:
+            raise ValueError(f"Level {level_id} cannot have empty fields: {', '.join(cleared)}.")
+
+        level_condition = {"id": level_id}
+        level_type = _level_type(level_update)
+        if level_type:
+            level_condition["type"] = level_type
+        conditions.append({"levels": {"$elemMatch": level_condition}})
+
+        identifier = f"l{index}"
+        array_filters.append({f"{identifier}.id": level_id})
+        update.setdefault("$set", {}).update({f"levels.$[{identifier}].{key}": value for key, value in level_fields.items()})
+
+    if "add" in level_changes:
+        level_ids = [level["id"] for level in level_changes["add"]]
+        conditions.append({"levels.id": {"$nin": level_ids}})
+        update["$push"] = {"levels": {"$each": level_changes["add"]}}
+
+    if "remove" in level_changes:
+        conditions.append({"levels.id": {"$all": level_changes["remove"]}})
+        update["$pull"] = {"levels": {"id": {"$in": level_changes["remove"]}}}
+
+    for key in ("update", "add", "remove"):
+        level_ids = [level["id"] if isinstance(level, dict) else level for level in level_changes.get(key, [])]
+        if len(level_ids) != len(set(level_ids)):
+            raise ValueError(f"Level ids in levels.{key} must be unique.")
+
+    if not update:
+        raise ValueError("Nothing to update.")
+
+    return update, conditions, array_filters
+
+def _failed_update_error(quest_id: ObjectId, user_id: ObjectId, changes: dict) -> Exception:
+    """Reads the owner, version and level ids of a quest to tell why a conditional update matched nothing."""
+    quest = find_quest_by_id(quest_id, projection=QUEST_UPDATE_STATE_PROJECTION)["result"]
+    if not quest:
+        return NotFoundError("Quest is not found.")
+    if quest.get("created_by") != user_id:
+        return Unauthorized("Unauthorized access")
+
+    current_version = quest.get("version", 0)
+    if current_version != changes["version"]:
+        return VersionConflictError(f"Quest was modified, current version is {current_version}. Reload it and retry.",
+                                    current_version=current_version)
+
+    level_types = {level.get("id"): level.get("type") for level in quest.get("levels", [])}
+    level_changes = changes.get("levels") or {}
+    missing = [level["id"] for level in level_changes.get("update", []) if level["id"] not in level_types]
+    missing += [level_id for level_id in level_changes.get("remove", []) if level_id not in level_types]
+    if missing:
+        return NotFoundError(f"Levels are not found in this quest: {', '.join(missing)}.")
+
+    for level_update in level_changes.get("update", []):
+        level_type = _level_type(level_update)
+        if level_type and level_types[level_update["id"]] != level_type:
+            return ValueError(f"Level {level_update['id']} is not a {level_type} level.")
+
+    existing = [level["id"] for level in level_changes.get("add", []) if level["id"] in level_types]
+    if existing:
+        return ValueError(f"Levels already exist in this quest: {', '.join(existing)}.")
+
+    # The quest changed between the update and this read.
+    return VersionConflictError("Quest was modified by another request. Reload it and retry.",
+                                current_version=current_version)
+
+def update_quest(quest_id: str, user_id: str, changes: dict) -> dict:
+    """
+    Applies a partial update (`QuestPatch`) to a quest of `user_id` in a single conditional write.
+
+    The write succeeds only if the quest is still at `changes["version"]`, so concurrent edits fail
+    instead of overwriting each other. Quest history summaries are refreshed in the background when
+    summarized fields or the level count change.
+
+    Raises:
+        ValueError: If the changes are invalid or do not fit the stored levels.
+        InvalidId: If `quest_id` is not a valid ObjectId.
+        NotFoundError: If the quest or a changed level does not exist.
+        Unauthorized: If the quest was not created by `user_id`.
+        VersionConflictError: If the quest is no longer at `changes["version"]`.
+
+    Returns:
+        dict: {"success": True, "message": <result message>, "version": <new version>}
+    """
+    quest_id, user_id = ObjectId(quest_id), ObjectId(user_id)
+    update, conditions, array_filters = _build_quest_update(changes)
+
+    try:
+        result = update_quest_document(quest_id=quest_id,
+                                       user_id=user_id,
+                                       version=changes["version"],
+                                       update=update,
+                                       conditions=conditions,
+                                       array_filters=array_filters or None)
+    except NotFoundError:
+        raise _failed_update_error(quest_id, user_id, changes) from None
+
+    level_changes = changes.get("levels") or {}
+    if any(field in changes for field in SUMMARY_FIELDS) or level_changes.get("add") or level_changes.get("remove"):
+        try:
+            schedule_quest_summary_refresh(quest_id)
+        except JobQueueFull:
+            # The quest is already updated; `src.cli backfill-quest-summaries` fixes stale history entries.
+            logger.warning(f"Job queue is full, quest summaries of {quest_id} were not refreshed.")
+
+    return {"success": True, "message": result["message"], "version": changes["version"] + 1}
+
+def get_quest_job(job_id: str, user_id: str) -> dict:
+    """
+    Raises:
+        NotFoundError: If the job is unknown or expired.
+        Unauthorized: If the job was submitted by another user.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise NotFoundError("Job is not found or has expired.")
+    if job["owner_id"] != user_id:
+        raise Unauthorized("Unauthorized access")
+
+    return job
+
+def get_quest_by_id(quest_id: str, projection: dict = None):
+    quest_id = ObjectId(quest_id)
+    variant = tuple(sorted(projection.items())) if projection else None
+    quest = quest_cache.get(quest_id, variant)
+    if quest is None:
+        result = find_quest_by_id(quest_id, projection=projection)
+        quest = result["result"]
+
+        if not quest:
+            raise NotFoundError()
+
+        quest_cache.set(quest_id, quest, variant)
+
+    return dict(quest)
+
+# Level content a player only needs once they reach the level; the summary keeps `id` and `type`.
+LEVEL_CONTENT_FIELDS = ("name", "question", "picture_urls", "options", "try_limit", "correct_option_id")
+QUEST_SUMMARY_PROJECTION = {"ratings": 0, **{f"levels.{field}": 0 for field in LEVEL_CONTENT_FIELDS}}
+
+# Fields a client can select with `?fields=`; `_id` is always returned.
+QUEST_FIELDS = ("name", "title", "description", "time_limit", "created_at", "difficulty", "main_picture", "created_by",
+                "levels", "ratings", "times_played", "avg_rating", "version")
+
+def quest_projection(fields: Tuple[str, ...], levels_summary: bool = False) -> dict:
+    """
+    Projection reading only `fields` of a quest. With `levels_summary`, levels are read without their content.
+    """
+    projection = {field: 1 for field in fields if field != "levels"}
+    if "levels" in fields:
+        if levels_summary:
+            projection.update({"levels.id": 1, "levels.type": 1})
+        else:
+            projection["levels"] = 1
+    return projection or {"_id": 1}
+
+def quest_detail_projection(fields: Tuple[str, ...] = None, levels_summary: bool = False) -> dict:
+    """
+    Projection of `GET /quest/<id>`. Ratings are never read here: the endpoint returns them with user info,
+    from the ratings aggregation, when they are requested.
+    """
+    if fields is None:
+        return QUEST_SUMMARY_PROJECTION if levels_summary else {"ratings": 0}
+    return quest_projection(tuple(field for field in fields if field != "ratings"), levels_summary)
+
+def get_quest_level(quest_id: str, level_id: str) -> dict:
+    """
+    Raises:
+        NotFoundError: If the quest or the level does not exist.
+    """
+    quest = find_quest_level(quest_id, level_id)["result"]
 
     if not quest:
         raise NotFoundError()
+    if not quest.get("levels"):
+        raise NotFoundError("Level is not found in this quest.")
 
-    return quest
+    return quest["levels"][0]
 
-def get_all_quests():
-    result = find_all_quests()
-    all_quests = result["result"]
+# Fields of a quest card; levels and ratings are left out.
+QUEST_CARD_PROJECTION = {field: 1 for field in ("name", "title", "description", "time_limit", "difficulty", "main_picture",
+                                                "created_by", "created_at", "times_played", "avg_rating", "version")}
 
-    for doc in all_quests:
-        doc["_id"] = str(doc["_id"])
-        doc["created_by"] = str(doc["created_by"])
-        doc["created_at"] = doc["created_at"].isoformat()
+def get_quests_by_ids(quest_ids: List[ObjectId], fields: Tuple[str, ...] = None) -> dict:
+    """
+    Args:
+        fields: Fields of QUEST_FIELDS to return instead of the quest card.
 
-        doc["ratings"] = [{"user_id": str(rating["user_id"]),
-                             "review": rating["review"],
-                             "rating": rating["rating"]} for rating in doc["ratings"]]
+    Returns:
+        dict: {"quests": <quests in the order of `quest_ids`>, "missing": <ids that were not found>}
+    """
+    projection = quest_projection(fields) if fields is not None else QUEST_CARD_PROJECTION
+    result = find_quests_by_ids(quest_ids, projection=projection)
+    quests, missing = order_by_ids(quest_ids, result["result"])
 
-    return all_quests
+    return {"quests": Collections.QUEST.value.serializer.many(quests), "missing": missing}
 
-def rate_quest(quest_id: str, rating: dict):
-    quest = get_quest_by_id(quest_id=quest_id)
+def iter_all_quests_serialized(fields: Tuple[str, ...] = None):
+    """Yields all quests (only `fields` if given), JSON-serializable, as they are read from the cursor."""
+    serializer = Collections.QUEST.value.serializer
+    projection = quest_projection(fields) if fields is not None else None
+    for quest in iter_all_quests(batch_size=QUESTS_STREAM_BATCH_SIZE, projection=projection):
+        yield serializer(quest)
 
-    if quest["ratings"]:
-        old_ratings = quest["ratings"]
-        old_ratings.append(rating)
-        avg_rating = round(sum(old_rating["rating"] for old_rating in old_ratings)/len(old_ratings), 1)
-    else:
-        avg_rating = rating["rating"]
+def rate_quest(quest_id: str, rating: dict):
+    try:
+        quest_id_obj = ObjectId(quest_id)
+    except InvalidId:
+        raise ValueError("Invalid quest id.")
 
     rating["user_id"] = ObjectId(rating["user_id"])
 
-    result = add_new_rating(_id=quest["_id"],
-                            rating=rating,
-                            avg_rating=avg_rating)
+    result = add_new_rating(_id=quest_id_obj, rating=rating)
 
-    return result
+    return {"success": True, "message": result["message"], "avg_rating": result["result"].get("avg_rating")}
 
 def get_quest_ratings(quest_id: str):
 
     quest_ratings = get_quest_ratings_full_info(quest_id=quest_id)
 
-    return quest_ratings
+    return QUEST_RATING_SERIALIZER.many(quest_ratings)
@@ -0,0 +1,97 @@
+from typing import Iterable, Iterator, Union
+
+from bson import ObjectId, json_util
+
+from src.database.utils.collections import Collections
+from src.database.utils.service import import_records
+from src.database.quest.service import iter_all_quests
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 10_000
+MAX_REPORTED_ERRORS = 1000
+
+
+def _to_object_id(document: dict, key: str):
+    if isinstance(document.get(key), str) and ObjectId.is_valid(document[key]):
+        document[key] = ObjectId(document[key])
+
+def _normalize_ids(quest: dict) -> dict:
+    # Plain JSON catalogs carry ids as strings; Extended JSON ({"$oid": ...}) is already decoded by json_util.
+    for key in ("_id", "created_by"):
+        _to_object_id(quest, key)
+    ratings = quest.get("ratings")
+    if isinstance(ratings, list):
+        for rating in ratings:
+            if isinstance(rating, dict):
+                _to_object_id(rating, "user_id")
+    return quest
+
+
+def import_quests_ndjson(lines: Iterable[Union[str, bytes]], batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Imports quests from NDJSON (one quest per line, plain or Extended JSON).
+
+    Lines are consumed lazily, validated and inserted in batches of `batch_size`, so memory
+    usage does not depend on the catalog size. Invalid lines are reported and skipped.
+
+    Returns:
+        dict: A dictionary containing:
+            - "inserted" (int): Number of inserted quests.
+            - "failed" (int): Number of lines that were not imported.
+            - "errors" (List[dict]): {"line": <1-based line number>, "error": <message>}, at most MAX_REPORTED_ERRORS.
+    """
+    report = {"inserted": 0, "failed": 0, "errors": []}
+
+    def add_error(line_number: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "error": error})
+
+    def flush(batch: list):
+        result = import_records(Collections.QUEST, [quest for _, quest in batch])
+        report["inserted"] += result["inserted"]
+        for failed in result["failed_records"]:
+            add_error(batch[failed["index"]][0], failed["error"])
+        batch.clear()
+
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+
+        try:
+            quest = json_util.loads(line)
+        except ValueError as e:
+            add_error(line_number, f"Invalid JSON: {e}")
+            continue
+        if not isinstance(quest, dict):
+            add_error(line_number, "Each line must be a JSON object.")
+            continue
+
+        batch.append((line_number, _normalize_ids(quest)))
+        if len(batch) >= batch_size:
+            flush(batch)
+
+    if batch:
+        flush(batch)
+
+    return report
+
+
+def export_quests_ndjson(batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """Yields every quest as a line of Extended JSON, read from a server-side cursor."""
+    for quest in iter_all_quests(batch_size=batch_size):
+        yield json_util.dumps(quest) + "\n"
+
+
+def parse_batch_size(value) -> int:
+    """
+    Raises:
+        ValueError: If the batch size is not an integer between 1 and MAX_BATCH_SIZE.
+    """
+    batch_size = int(value) if value is not None else DEFAULT_BATCH_SIZE
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}.")
+    return batch_size
@@ -1,23 +1,66 @@
+from typing import List, Tuple, Union
+from bson import ObjectId
+from pymongo.read_preferences import Primary
+
 from src.utils.exceptions import NotFoundError
-from src.database.user.service import find_user_by_id, update_user_info, get_user_quest_history_full_info, add_new_user_quest_history
+from src.utils.cache import DocumentCache, cache_registry
+from src.utils.helpers import order_by_ids
+from src.database.utils.collections import Collections
+from src.database.utils.serializers import QUEST_HISTORY_SERIALIZER
+from src.database.utils.service import iter_read
+from src.database.user_stats.service import find_user_stats, replace_user_stats, history_entry_increments, STATS_FIELDS
+from src.database.quest.service import find_quest_summary, iter_all_quests, build_quest_summary, QUEST_SUMMARY_SOURCE_PROJECTION
+from src.database.user.service import find_user_by_id, find_users_by_ids, update_user_info, get_user_quest_history_full_info, add_new_user_quest_history, \
+    refresh_quest_history_summaries, user_exists, MONGO_DB_NAME
+
+# Serialized user profiles; evicted on writes and by the change stream invalidation bus.
+user_cache = cache_registry.register(DocumentCache("user", Collections.USER.value.name))
+
+# Fields a client can select with `?fields=`; `_id` is always returned.
+USER_FIELDS = ("name", "email", "about_me", "created_at", "profile_picture", "created_quests", "quest_history")
+
+def _fields_projection(fields: Tuple[str, ...]) -> dict:
+    return {field: 1 for field in fields} or {"_id": 1}
+
+def get_user_by_id(user_id: str, fields: Tuple[str, ...] = None):
+    """
+    Args:
+        fields: Fields of USER_FIELDS to read and return (all but the password if None).
+    """
+    user_id = ObjectId(user_id)
+    user = user_cache.get(user_id, fields)
+    if user is None:
+        serializer = Collections.USER.value.serializer
+        projection = _fields_projection(fields) if fields is not None else serializer.projection
+        result = find_user_by_id(user_id, projection=projection)
+
+        if not result["result"]:
+            raise NotFoundError()
 
-def get_user_by_id(user_id: str):
-    result = find_user_by_id(user_id)
-    user = result["result"]
+        user = serializer(result["result"])
+        user_cache.set(user_id, user, fields)
 
-    if not user:
-        raise NotFoundError()
+    return dict(user)
 
-    user["_id"] = str(user["_id"])
-    user["created_at"] = user["created_at"].isoformat()
-    user["created_quests"] = [str(quest) for quest in user["created_quests"]]
+# Batch lookups return other users, whose email is private.
+USERS_BATCH_FIELDS = tuple(field for field in USER_FIELDS if field != "email")
 
-    for quest in user["quest_history"]:
-        quest["quest_id"] = str(quest["quest_id"])
-        quest["attempted_at"] = quest["attempted_at"].isoformat()
-    del user["password"]
+# Public fields shown next to a user's content, e.g. quest creator bylines.
+USER_CARD_PROJECTION = {"name": 1, "profile_picture": 1, "about_me": 1}
 
-    return user
+def get_users_by_ids(user_ids: List[ObjectId], fields: Tuple[str, ...] = None) -> dict:
+    """
+    Args:
+        fields: Fields of USERS_BATCH_FIELDS to return instead of the user card (name, about me, profile picture).
+
+    Returns:
+        dict: {"users": <users in the order of `user_ids`>, "missing": <ids that were not found>}
+    """
+    projection = _fields_projection(fields) if fields is not None else USER_CARD_PROJECTION
+    result = find_users_by_ids(user_ids, projection=projection)
+    users, missing = order_by_ids(user_ids, result["result"])
+
+    return {"users": Collections.USER.value.serializer.many(users), "missing": missing}
 
 def update_user(user_id: str, data: dict, update_type: str = "$set", safe_mode: bool = True):
     result = update_user_info(user_id=user_id,
@@ -31,12 +74,106 @@ def get_user_quest_history(user_id: str):
 
     quest_history = get_user_quest_history_full_info(user_id=user_id)
 
-    return quest_history
+    return QUEST_HISTORY_SERIALIZER.many(quest_history)
 
 def update_user_quest_history(user_id: str,
                               new_quest_history: dict):
+    """
+    Raises:
+        NotFoundError: If the quest or the user does not exist.
+    """
+    # Stored on the entry so reading the history needs no join; kept fresh by refresh_quest_summaries.
+    quest_summary = find_quest_summary(new_quest_history["quest_id"])
+    if quest_summary is None:
+        raise NotFoundError("Quest is not found.")
 
     result = add_new_user_quest_history(user_id=user_id,
-                                        data=new_quest_history)
+                                        data=new_quest_history,
+                                        quest_summary=quest_summary)
+
+    return result
+
+def refresh_quest_summaries(quest_id: Union[str, ObjectId]) -> dict:
+    """
+    Copies the current summary of a quest to all quest history entries referencing it.
+
+    Raises:
+        NotFoundError: If the quest does not exist.
+    """
+    quest_id = ObjectId(quest_id)
+    quest_summary = find_quest_summary(quest_id)
+    if quest_summary is None:
+        raise NotFoundError("Quest is not found.")
+
+    result = refresh_quest_history_summaries(quest_id=quest_id, quest_summary=quest_summary)
+
+    return {"quest_id": str(quest_id), "matched": result["matched"], "modified": result["modified"]}
+
+
+def backfill_quest_summaries(batch_size: int = 500) -> dict:
+    """
+    Writes the current quest summary to all quest history entries, e.g. for entries created before
+    summaries were stored. Quests are read from the primary so no stale summary is written.
+    """
+    report = {"quests": 0, "matched": 0, "modified": 0}
+    for quest in iter_all_quests(batch_size=batch_size, projection=QUEST_SUMMARY_SOURCE_PROJECTION, read_preference=Primary()):
+        result = refresh_quest_history_summaries(quest_id=quest["_id"], quest_summary=build_quest_summary(quest))
+        report["quests"] += 1
+        report["matched"] += result["matched"]
+        report["modified"] += result["modified"]
+
+    return report
+
+def get_user_stats(user_id: str) -> dict:
+    """
+    Raises:
+        InvalidId: If `user_id` is not a valid ObjectId.
+        NotFoundError: If the user does not exist.
+    """
+    user_id_obj = ObjectId(user_id)
+    stats = find_user_stats(user_id_obj)["result"]
+
+    if stats is None:
+        # No activity yet; only then is the user itself looked up.
+        if not user_exists(user_id_obj):
+            raise NotFoundError()
+        stats = {"_id": user_id_obj, "updated_at": None}
+
+    # `$inc` upserts only create the counters they touch.
+    stats = Collections.USER_STATS.value.serializer({**{field: 0 for field in STATS_FIELDS}, **stats})
+    stats["average_score"] = round(stats["total_score"] / stats["scored_attempts"], 2) if stats["scored_attempts"] else None
+
+    return stats
+
+def rebuild_user_stats(batch_size: int = 500) -> dict:
+    """
+    Recomputes every user's stats from their quest history and created quests (read from the primary)
+    and replaces the stored stats in batches of `batch_size`.
+    """
+    report = {"users": 0}
+    batch = []
+    users = iter_read(db_name=MONGO_DB_NAME,
+                      collection_name=Collections.USER.value.name,
+                      exclude_id=False,
+                      batch_size=batch_size,
+                      projection={"quest_history.completed": 1, "quest_history.result": 1,
+                                  "quest_history.time_spent": 1, "created_quests": 1},
+                      read_preference=Primary())
+    for user in users:
+        stats = {"_id": user["_id"], **{field: 0 for field in STATS_FIELDS}}
+        for entry in user.get("quest_history", []):
+            for field, increment in history_entry_increments(entry).items():
+                stats[field] += increment
+        stats["quests_created"] = len(user.get("created_quests", []))
+        batch.append(stats)
+
+        if len(batch) >= batch_size:
+            replace_user_stats(batch)
+            report["users"] += len(batch)
+            batch = []
+
+    if batch:
+        replace_user_stats(batch)
+        report["users"] += len(batch)
 
-    return result
\ No newline at end of file
+    return report
@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+from contextlib import nullcontext
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from dotenv import load_dotenv
+
+from src.sockets.codec import CodecManager
+from src.utils.metrics import SOCKETIO_OUTBOUND_QUEUE_DEPTH, SOCKETIO_OUTBOUND_QUEUED_PACKETS, \
+    SOCKETIO_OUTBOUND_DROPPED, SOCKETIO_SLOW_CLIENT_DISCONNECTS
+
+load_dotenv()
+logger = logging.getLogger('myLog')
+
+# Packets waiting to be written to one client before progress events are coalesced or dropped, the depth
+# at which the client is disconnected at once, and how long it may stay over the limit before that.
+SOCKETIO_OUTBOUND_QUEUE_MAX = int(os.getenv("SOCKETIO_OUTBOUND_QUEUE_MAX", 100))
+SOCKETIO_OUTBOUND_QUEUE_HARD_MAX = int(os.getenv("SOCKETIO_OUTBOUND_QUEUE_HARD_MAX", 4 * SOCKETIO_OUTBOUND_QUEUE_MAX))
+SOCKETIO_SLOW_CLIENT_GRACE_SECONDS = float(os.getenv("SOCKETIO_SLOW_CLIENT_GRACE_SECONDS", 10))
+SOCKETIO_OUTBOUND_QUEUE_SAMPLE_SECONDS = float(os.getenv("SOCKETIO_OUTBOUND_QUEUE_SAMPLE_SECONDS", 5))
+
+PROGRESS_DELTA_FIELDS = ("score_delta", "time_delta")
+
+
+def merge_progress(queued: dict, update: dict) -> dict:
+    """Folds a progress update into the queued one for the same player and quest: deltas add up, other fields are replaced."""
+    merged = {**queued, **update}
+    for field in PROGRESS_DELTA_FIELDS:
+        if field in queued and field in update:
+            merged[field] = queued[field] + update[field]
+    return merged
+
+
+# Events coalesced in a full queue, by the fields identifying what they describe, and how a newer event is
+# folded into the queued one for the same key. Events without a merge function carry the whole latest state:
+# a newer one replaces the queued one, and they are the first to go when a queue is full. The others carry
+# increments, so they are merged and never dropped.
+COALESCED_EVENTS: Dict[str, tuple] = {
+    "userProgressUpdate": (("user_id", "quest_id"), merge_progress),
+    "questPresence": (("quest_id",), None),
+}
+
+
+def coalesce_key(event: str, data: list) -> Optional[Hashable]:
+    """Returns the key under which `event` is coalesced with older queued events, or None if it must be delivered."""
+    fields, _ = COALESCED_EVENTS.get(event, (None, None))
+    if fields is None or len(data) != 1 or not isinstance(data[0], dict):
+        return None
+    if "seq" in data[0]:
+        # Events logged for resuming (see `src.sockets.resume`) must arrive without gaps in their sequence.
+        return None
+    return (event,) + tuple(data[0].get(field) for field in fields)
+
+
+class BackpressureManager(CodecManager):
+    """
+    Client manager that bounds the outbound queue of every connection.
+
+    Engine.IO queues packets per connection until its writer sends them, so a stalled client buffers
+    every broadcast. Once a queue holds SOCKETIO_OUTBOUND_QUEUE_MAX packets, a new progress event is merged
+    into the queued one with the same key and a new presence event replaces it; otherwise the oldest queued
+    presence event makes room. Other events are always queued. Clients over SOCKETIO_OUTBOUND_QUEUE_HARD_MAX,
+    or over the limit for longer than SOCKETIO_SLOW_CLIENT_GRACE_SECONDS, are disconnected and their queue is
+    discarded. The queues and the disconnect are Engine.IO internals, hence the pinned versions in requirements.txt.
+    """
+
+    def __init__(self, max_depth: int = SOCKETIO_OUTBOUND_QUEUE_MAX, hard_max_depth: int = SOCKETIO_OUTBOUND_QUEUE_HARD_MAX,
+                 grace_seconds: float = SOCKETIO_SLOW_CLIENT_GRACE_SECONDS):
+        super().__init__()
+        self.max_depth = max_depth
+        self.hard_max_depth = hard_max_depth
+        self.grace_seconds = grace_seconds
+        self._over_limit_since: Dict[str, float] = {}
+        self._slow: Set[str] = set()
+
+    def encode(self, codec: str, event: str, data: list, namespace: str) -> list:
+        packets = super().encode(codec, event, data, namespace)
+        if len(packets) == 1:
+            key = coalesce_key(event, data)
+            packets[0].coalesce_key = key
+            if key is not None:
+                # Kept to merge a later event into this one while it is queued.
+                packets[0].coalesce_event = (codec, data[0], namespace)
+        return packets
+
+    def deliver(self, eio_sid, packets: list):
+        socket = self.server.eio.sockets.get(eio_sid)
+        queue = socket.queue if socket is not None else None
+        if queue is None or queue.qsize() < self.max_depth:
+            for eio_pkt in packets:
+                self.server._send_eio_packet(eio_sid, eio_pkt)
+            return
+
+        key = getattr(packets[0], "coalesce_key", None)
+        if key is not None and self._make_room(queue, packets[0], key):
+            return
+        super().deliver(eio_sid, packets)
+        if queue.qsize() >= self.hard_max_depth:
+            self._slow.add(eio_sid)
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs)
+        self._disconnect_slow_clients()
+
+    def check_queues(self):
+        """Records queue depths and disconnects clients that stayed over the limit for the grace period."""
+        now = time.monotonic()
+        depths = {eio_sid: socket.queue.qsize() for eio_sid, socket in list(self.server.eio.sockets.items())}
+        for eio_sid in list(self._over_limit_since):
+            if depths.get(eio_sid, 0) < self.max_depth:
+                del self._over_limit_since[eio_sid]
+        for eio_sid, depth in depths.items():
+            if depth >= self.max_depth:
+                since = self._over_limit_since.setdefault(eio_sid, now)
+                if depth >= self.hard_max_depth or now - since >= self.grace_seconds:
+                    self._slow.add(eio_sid)
+
+        SOCKETIO_OUTBOUND_QUEUE_DEPTH.set(value=max(depths.values(), default=0))
+        SOCKETIO_OUTBOUND_QUEUED_PACKETS.set(value=sum(depths.values()))
+        self._disconnect_slow_clients()
+
+    def monitor(self):
+        """Runs `check_queues` every SOCKETIO_OUTBOUND_QUEUE_SAMPLE_SECONDS, for clients that get no new events."""
+        while True:
+            self.server.sleep(SOCKETIO_OUTBOUND_QUEUE_SAMPLE_SECONDS)
+            try:
+                self.check_queues()
+            except Exception as e:
+                logger.error(f"Failed to check Socket.IO outbound queues: {e}")
+
+    def _make_room(self, queue, eio_pkt, key: Hashable) -> bool:
+        """
+        Merges `eio_pkt` into the last queued packet with the same key, or else drops the oldest queued packet
+        of an event that carries the whole latest state.
+
+        Returns:
+            bool: True if `eio_pkt` took the place of a queued packet.
+        """
+        merge = COALESCED_EVENTS[key[0]][1]
+        dropped = False
+        with getattr(queue, "mutex", None) or nullcontext():
+            items = queue.queue
+            oldest = latest = None
+            for index, item in enumerate(items):
+                item_key = getattr(item, "coalesce_key", None)
+                if item_key == key:
+                    latest = index
+                if oldest is None and item_key is not None and COALESCED_EVENTS[item_key[0]][1] is None:
+                    oldest = index
+            if latest is not None:
+                # The last one, so that older events for the key that are still queued go out before it.
+                items[latest] = self._merged(merge, items[latest], eio_pkt) if merge is not None else eio_pkt
+                SOCKETIO_OUTBOUND_DROPPED.inc(key[0], "coalesced")
+                return True
+            if oldest is not None:
+                SOCKETIO_OUTBOUND_DROPPED.inc(items[oldest].coalesce_key[0], "dropped")
+                del items[oldest]
+                dropped = True
+        if dropped:
+            # Keeps the count of unfinished tasks in step, or closing the socket would wait for the packet forever.
+            queue.task_done()
+        return False
+
+    def _merged(self, merge: Callable[[dict, dict], dict], queued_pkt, eio_pkt):
+        """Encodes the event that `merge` makes of a queued packet and a newer one with the same key."""
+        codec, queued, namespace = queued_pkt.coalesce_event
+        _, update, _ = eio_pkt.coalesce_event
+        return self.encode(codec, queued_pkt.coalesce_key[0], [merge(queued, update)], namespace)[0]
+
+    def _discard(self, queue):
+        queue_empty = self.server.eio.get_queue_empty_exception()
+        while True:
+            try:
+                queue.get(block=False)
+            except queue_empty:
+                return
+            queue.task_done()
+
+    def _disconnect_slow_clients(self):
+        while self._slow:
+            eio_sid = self._slow.pop()
+            self._over_limit_since.pop(eio_sid, None)
+            socket = self.server.eio.sockets.get(eio_sid)
+            if socket is None or socket.closed:
+                continue
+            logger.warning(f"Disconnecting Socket.IO client {eio_sid}: {socket.queue.qsize()} packets queued.")
+            SOCKETIO_SLOW_CLIENT_DISCONNECTS.inc()
+            self._discard(socket.queue)
+            # Without waiting: the writer of a stalled client may never drain the queue.
+            socket.close(wait=False, abort=True, reason=self.server.eio.reason.SERVER_DISCONNECT)
+            self.server.eio.sockets.pop(eio_sid, None)
@@ -0,0 +1,144 @@
+import os
+import logging
+from urllib.parse import parse_qs
+
+import socketio
+from dotenv import load_dotenv
+from engineio import packet as eio_packet
+from socketio import packet
+
+load_dotenv()
+logger = logging.getLogger('myLog')
+
+# Clients opt in with `?codec=msgpack` on the connection URL and a MessagePack parser on their side
+# (socket.io-msgpack-parser); all others keep the default JSON encoding.
+SOCKETIO_MSGPACK_ENABLED = os.getenv("SOCKETIO_MSGPACK_ENABLED", "true").lower() in ("1", "true", "yes")
+CODEC_QUERY_PARAM = "codec"
+JSON = "json"
+MSGPACK = "msgpack"
+
+try:
+    from socketio.msgpack_packet import MsgPackPacket
+except ImportError:
+    MsgPackPacket = None
+
+# MessagePack carries bytes natively, so it has no separate attachment packets.
+_NON_BINARY_TYPES = {packet.BINARY_EVENT: packet.EVENT, packet.BINARY_ACK: packet.ACK}
+
+
+def requested_codec(environ: dict) -> str:
+    """Returns the codec asked for in the query string of the Engine.IO handshake, JSON by default."""
+    query = parse_qs((environ or {}).get("QUERY_STRING", ""))
+    codec = (query.get(CODEC_QUERY_PARAM) or [JSON])[0].lower()
+    return MSGPACK if codec == MSGPACK and SOCKETIO_MSGPACK_ENABLED and MsgPackPacket is not None else JSON
+
+
+class NegotiatedPacket(packet.Packet):
+    """
+    Socket.IO packet that encodes as JSON and decodes both encodings.
+
+    MessagePack clients only send binary frames, while JSON clients send text frames (binary frames are
+    attachments, which the server routes to the pending packet before decoding), so the frame type tells
+    the encodings apart. Encoding for MessagePack clients is done by `CodecManager`.
+    """
+
+    def decode(self, encoded_packet):
+        if isinstance(encoded_packet, bytes) and MsgPackPacket is not None:
+            decoded = MsgPackPacket(encoded_packet=encoded_packet)
+            self.packet_type = _NON_BINARY_TYPES.get(decoded.packet_type, decoded.packet_type)
+            self.data, self.id, self.namespace = decoded.data, decoded.id, decoded.namespace
+            return 0
+        return super().decode(encoded_packet)
+
+
+class CodecManager(socketio.Manager):
+    """
+    Client manager that sends every client packets in the codec it negotiated.
+
+    Broadcasts are encoded once per codec in use rather than once per client, and the server's packet
+    sender is wrapped so that acks and connection packets follow the client's codec as well. Both go
+    through private methods of `socketio.Server` (`_send_packet`, `_send_eio_packet`), which is why
+    python-socketio and python-engineio are pinned in requirements.txt.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.codecs = {}  # eio_sid -> codec, for clients that did not keep JSON
+
+    def set_server(self, server):
+        super().set_server(server)
+        self._send_server_packet = server._send_packet
+        server._send_packet = self._send_packet
+
+    def connect(self, eio_sid, namespace):
+        sid = super().connect(eio_sid, namespace)
+        if sid is not None and requested_codec(self.server.environ.get(eio_sid)) != JSON:
+            self.codecs[eio_sid] = MSGPACK
+        return sid
+
+    def disconnect(self, sid, namespace, **kwargs):
+        eio_sid = self.eio_sid_from_sid(sid, namespace)
+        result = super().disconnect(sid, namespace, **kwargs)
+        if eio_sid is not None and not any(self.sid_from_eio_sid(eio_sid, ns) for ns in self.get_namespaces()):
+            self.codecs.pop(eio_sid, None)
+        return result
+
+    def codec(self, eio_sid) -> str:
+        return self.codecs.get(eio_sid, JSON)
+
+    def encode(self, codec: str, event: str, data: list, namespace: str) -> list:
+        """Encodes an event into the Engine.IO packets sent to every client of `codec`."""
+        packet_class = MsgPackPacket if codec == MSGPACK else self.server.packet_class
+        encoded = packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        return [eio_packet.Packet(eio_packet.MESSAGE, item) for item in encoded]
+
+    def deliver(self, eio_sid, packets: list):
+        """Queues the packets of one event for one client."""
+        for eio_pkt in packets:
+            self.server._send_eio_packet(eio_sid, eio_pkt)
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if callback:
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback,
+                                to=to, **kwargs)
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        encoded = {}
+        codec_of = self.codecs.get
+        deliver = self.deliver
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            codec = codec_of(eio_sid, JSON)
+            packets = encoded.get(codec)
+            if packets is None:
+                packets = encoded[codec] = self.encode(codec, event, data, namespace)
+            deliver(eio_sid, packets)
+
+    def _send_packet(self, eio_sid, pkt):
+        if self.codec(eio_sid) == MSGPACK:
+            pkt = MsgPackPacket(_NON_BINARY_TYPES.get(pkt.packet_type, pkt.packet_type),
+                                data=pkt.data, namespace=pkt.namespace, id=pkt.id)
+        self._send_server_packet(eio_sid, pkt)
+
+
+def codec_options() -> dict:
+    """Returns the `SocketIO` options for decoding MessagePack clients, or none if it is disabled or unavailable."""
+    if not SOCKETIO_MSGPACK_ENABLED:
+        return {}
+    if MsgPackPacket is None:
+        logger.warning("SOCKETIO_MSGPACK_ENABLED is set but msgpack is not installed; Socket.IO stays JSON only.")
+        return {}
+    return {"serializer": NegotiatedPacket}
@@ -0,0 +1,274 @@
+import jwt
+import logging
+from typing import List, Optional, Union
+from bson import ObjectId
+from flask import request
+from flask_socketio import SocketIO, join_room, leave_room, ConnectionRefusedError
+from pydantic import BaseModel, Field, ValidationError
+
+from src.database.utils.serializers import JOB_SERIALIZER
+from src.database.utils.validators import validate_payload
+from src.services.jobs import job_queue
+from src.sockets.backpressure import BackpressureManager
+from src.sockets.codec import codec_options
+from src.sockets.presence import quest_presence, quest_room, PRESENCE_TICK_SECONDS
+from src.sockets.resume import user_event_log, user_room
+from src.utils.helpers import format_payload_validation_errors, get_user_id_from_token
+from src.utils.metrics import SOCKETIO_CONNECTED_CLIENTS, SOCKETIO_EMITS, SOCKETIO_RESUMES
+
+logger = logging.getLogger('myLog')
+
+# Bound to the Flask app in `app.py` with `socketio.init_app(app)`.
+socketio = SocketIO(cors_allowed_origins="*", client_manager=BackpressureManager(), **codec_options())
+
+# Users of the connections authenticated with a JWT token, by sid.
+_session_users = {}
+
+
+class ProgressUpdate(BaseModel):
+    """
+    Progress of a player, broadcast as `userProgressUpdate`. Only ids and what changed are sent on.
+
+    Attributes:
+    - user_id, quest_id: The player and the quest.
+    - level: ID or index of the level the player is on.
+    - score_delta: Points gained since the previous update.
+    - time_delta: Seconds spent since the previous update.
+    - completed: Set once the quest is finished.
+    """
+    user_id: str
+    quest_id: str
+    level: Union[int, str, None] = None
+    score_delta: Optional[int] = None
+    time_delta: Optional[int] = None
+    completed: Optional[bool] = None
+
+    class Config:
+        extra = 'ignore'
+
+
+class ResumeRequest(BaseModel):
+    """
+    Position of a reconnecting client in the events of its user.
+
+    Attributes:
+    - epoch: The epoch returned by the previous resume, None on the first connection.
+    - last_seq: Sequence number of the last event the client applied.
+    """
+    epoch: Optional[str] = None
+    last_seq: int = Field(0, ge=0)
+
+    class Config:
+        extra = 'forbid'
+
+
+def emit_event(event: str, data: dict, **kwargs):
+    """Emits a Socket.IO event and counts it."""
+    SOCKETIO_EMITS.inc(event)
+    socketio.emit(event, data, **kwargs)
+
+def _user_sids(user_id: str) -> List[str]:
+    return [sid for sid, _ in socketio.server.manager.get_participants("/", user_room(user_id))]
+
+def emit_to_user(user_id: str, event: str, data: dict):
+    """Sends an event to the connections of a user with the next sequence number of the user, and logs it for resuming."""
+    seq = user_event_log.append(user_id, event, data)
+    emit_event(event, {**data, "seq": seq}, to=user_room(user_id))
+
+def notify_job_finished(job: dict):
+    """Pushes the final status of a background job to its owner and to clients subscribed to it."""
+    job_status = JOB_SERIALIZER(job)
+    skip_sid = None
+    if job.get("owner_id"):
+        owner_id = str(job["owner_id"])
+        emit_to_user(owner_id, "jobUpdate", job_status)
+        skip_sid = _user_sids(owner_id)
+    emit_event("jobUpdate", job_status, to=f"job:{job['job_id']}", skip_sid=skip_sid)
+
+job_queue.add_listener(notify_job_finished)
+
+def _quest_id(data) -> str:
+    """
+    Raises:
+        ValueError: If `data` has no valid quest_id.
+    """
+    quest_id = data.get("quest_id") if isinstance(data, dict) else None
+    if not isinstance(quest_id, str) or not ObjectId.is_valid(quest_id):
+        raise ValueError("A valid quest_id is required.")
+    return quest_id
+
+def _join_quest(quest_id: str) -> int:
+    players = quest_presence.join(request.sid, quest_id)
+    join_room(quest_room(quest_id))
+    return players
+
+def broadcast_presence():
+    """Every PRESENCE_TICK_SECONDS, sends the new player count of each changed quest to the room of that quest."""
+    while True:
+        socketio.sleep(PRESENCE_TICK_SECONDS)
+        try:
+            for quest_id, players in quest_presence.drain_changes().items():
+                emit_event("questPresence", {"quest_id": quest_id, "players": players}, to=quest_room(quest_id))
+        except Exception as e:
+            logger.error(f"Failed to broadcast quest presence: {e}")
+
+def start_presence_broadcast():
+    socketio.start_background_task(broadcast_presence)
+
+def start_outbound_queue_monitor():
+    """Samples outbound queue depths and disconnects clients that stay over the limit."""
+    socketio.start_background_task(socketio.server.manager.monitor)
+
+@socketio.on("connect")
+def handle_connect(auth=None):
+    """
+    Accepts the connection. With a JWT token the connection receives the events of its user and can
+    resume them; with a quest id it counts as a player of the quest.
+
+    :param auth: Optional {"token": <JWT token>, "quest_id": <quest id>}
+    """
+    auth = auth if isinstance(auth, dict) else {}
+    user_id = None
+    try:
+        if auth.get("token"):
+            user_id = get_user_id_from_token(auth["token"])
+        if auth.get("quest_id") is not None:
+            _join_quest(_quest_id(auth))
+    except jwt.ExpiredSignatureError:
+        raise ConnectionRefusedError("Token has expired")
+    except jwt.InvalidTokenError:
+        raise ConnectionRefusedError("Invalid token")
+    except ValueError as e:
+        raise ConnectionRefusedError(str(e))
+
+    if user_id is not None:
+        _session_users[request.sid] = user_id
+        join_room(user_room(user_id))
+    SOCKETIO_CONNECTED_CLIENTS.inc()
+
+@socketio.on("disconnect")
+def handle_disconnect(*args):
+    quest_presence.disconnect(request.sid)
+    _session_users.pop(request.sid, None)
+    SOCKETIO_CONNECTED_CLIENTS.dec()
+
+@socketio.on("joinQuest")
+def handle_join_quest(data):
+    """
+    Counts the client as a player of a quest and subscribes it to the questPresence events of the quest.
+
+    :param data: {"quest_id": <quest id>}
+    """
+    try:
+        quest_id = _quest_id(data)
+        players = _join_quest(quest_id)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "quest_id": quest_id, "players": players}
+
+@socketio.on("leaveQuest")
+def handle_leave_quest(data):
+    """
+    Stops counting the client as a player or watcher of a quest and unsubscribes it from the quest.
+
+    :param data: {"quest_id": <quest id>}
+    """
+    try:
+        quest_id = _quest_id(data)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    players = quest_presence.leave(request.sid, quest_id)
+    leave_room(quest_room(quest_id))
+    return {"status": "success", "quest_id": quest_id, "players": players}
+
+@socketio.on("watchQuest")
+def handle_watch_quest(data):
+    """
+    Subscribes the client to the questPresence events of a quest without counting it as a player.
+    Watched quests count towards PRESENCE_MAX_QUESTS_PER_CLIENT; leaveQuest stops watching.
+
+    :param data: {"quest_id": <quest id>}
+    """
+    try:
+        quest_id = _quest_id(data)
+        players = quest_presence.watch(request.sid, quest_id)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    join_room(quest_room(quest_id))
+    return {"status": "success", "quest_id": quest_id, "players": players}
+
+@socketio.on("subscribeJob")
+def handle_subscribe_job(data):
+    """
+    Subscribes the client to the jobUpdate event of a background job (e.g. asynchronous quest creation).
+    Only a client connected with the token of the user who submitted the job can subscribe.
+
+    :param data: {"job_id": <job id returned with the 202 response>}
+    """
+    user_id = _session_users.get(request.sid)
+    if user_id is None:
+        return {"status": "error", "message": "Connect with a token to subscribe to jobs."}
+
+    job_id = data.get("job_id") if isinstance(data, dict) else None
+    if not job_id:
+        return {"status": "error", "message": "job_id is required."}
+
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "Job is not found or has expired."}
+    if job["owner_id"] != user_id:
+        return {"status": "error", "message": "Unauthorized access"}
+
+    join_room(f"job:{job_id}")
+    return {"status": "success", "job": JOB_SERIALIZER(job)}
+
+@socketio.on("progressUpdate")
+def handle_progress_update(data):
+    """
+    Broadcasts the progress of a player as a userProgressUpdate event with the fields that were set.
+    The payload is not echoed back; the sender gets the result as the acknowledgement.
+
+    :param data: {"user_id", "quest_id", "level"?, "score_delta"?, "time_delta"?, "completed"?}
+    """
+    try:
+        update = validate_payload(ProgressUpdate, data)
+    except ValidationError as e:
+        return {"status": "error", "message": format_payload_validation_errors(e.errors())}
+
+    update = {field: value for field, value in update.items() if value is not None}
+    user_id = _session_users.get(request.sid)
+    if user_id is None:
+        emit_event("userProgressUpdate", update)
+        return {"status": "success"}
+    if update["user_id"] != user_id:
+        return {"status": "error", "message": "user_id does not match the token of the connection."}
+
+    emit_to_user(user_id, "userProgressUpdate", update)
+    emit_event("userProgressUpdate", update, skip_sid=_user_sids(user_id))
+    return {"status": "success"}
+
+@socketio.on("resume")
+def handle_resume(data=None):
+    """
+    Replays the events of the user sent after `last_seq`, or tells the client to reload its state from the
+    API when they are no longer kept. Events are returned in the acknowledgement; live events may repeat
+    some of them, so clients skip events with a sequence number they already applied.
+
+    :param data: {"epoch": <epoch of the previous resume>, "last_seq": <last applied sequence number>}
+    """
+    user_id = _session_users.get(request.sid)
+    if user_id is None:
+        return {"status": "error", "message": "Connect with a token to resume events."}
+    try:
+        position = validate_payload(ResumeRequest, data or {})
+    except ValidationError as e:
+        return {"status": "error", "message": format_payload_validation_errors(e.errors())}
+
+    epoch, seq, events = user_event_log.resume(user_id, position["epoch"], position["last_seq"])
+    response = {"epoch": epoch, "seq": seq}
+    if events is None:
+        SOCKETIO_RESUMES.inc("reload")
+        return {"status": "reload", **response}
+    SOCKETIO_RESUMES.inc("replayed")
+    return {"status": "success", **response,
+            "events": [{"event": event, "data": {**event_data, "seq": seq}} for seq, event, event_data in events]}
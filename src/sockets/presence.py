@@ -0,0 +1,126 @@
+import os
+import threading
+from typing import Dict, Set
+
+from dotenv import load_dotenv
+
+from src.utils.metrics import PRESENCE_ACTIVE_QUESTS
+
+load_dotenv()
+
+# How often changed player counts are broadcast, and how many quests one connection can play or watch.
+PRESENCE_TICK_SECONDS = float(os.getenv("PRESENCE_TICK_SECONDS", 2))
+PRESENCE_MAX_QUESTS_PER_CLIENT = int(os.getenv("PRESENCE_MAX_QUESTS_PER_CLIENT", 5))
+
+
+def quest_room(quest_id: str) -> str:
+    """Room of the clients playing or watching a quest, which receive its questPresence events."""
+    return f"quest:{quest_id}"
+
+
+class QuestPresence:
+    """
+    Number of connected players per quest, in this process.
+
+    Joins, leaves and disconnects are O(1) updates of a counter. Quests whose count changed since the
+    last `drain_changes` are collected so that counts are broadcast once per tick, whatever the number
+    of joins in between. Counters that drop to zero are removed after their last broadcast, so memory is
+    bounded by the number of quests with players. Watched quests are tracked too, so that a connection is
+    in at most PRESENCE_MAX_QUESTS_PER_CLIENT quest rooms, played or watched.
+    """
+
+    def __init__(self, max_quests_per_client: int = PRESENCE_MAX_QUESTS_PER_CLIENT):
+        self.max_quests_per_client = max_quests_per_client
+        self._counts: Dict[str, int] = {}
+        self._sessions: Dict[str, Set[str]] = {}  # sid -> quests the connection plays
+        self._watched: Dict[str, Set[str]] = {}  # sid -> quests the connection watches without playing
+        self._changed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def join(self, sid: str, quest_id: str) -> int:
+        """
+        Counts the connection as a player of the quest; joining again is a no-op.
+
+        Raises:
+            ValueError: If the connection already plays or watches PRESENCE_MAX_QUESTS_PER_CLIENT other quests.
+
+        Returns:
+            int: The number of players of the quest.
+        """
+        with self._lock:
+            self._check_limit(sid, quest_id)
+            quests = self._sessions.setdefault(sid, set())
+            if quest_id not in quests:
+                self._discard(self._watched, sid, quest_id)
+                quests.add(quest_id)
+                self._counts[quest_id] = self._counts.get(quest_id, 0) + 1
+                self._changed.add(quest_id)
+            return self._counts[quest_id]
+
+    def watch(self, sid: str, quest_id: str) -> int:
+        """
+        Records that the connection watches the quest without playing it; a no-op if it plays or watches it already.
+
+        Raises:
+            ValueError: If the connection already plays or watches PRESENCE_MAX_QUESTS_PER_CLIENT other quests.
+
+        Returns:
+            int: The number of players of the quest.
+        """
+        with self._lock:
+            self._check_limit(sid, quest_id)
+            if quest_id not in self._sessions.get(sid, ()):
+                self._watched.setdefault(sid, set()).add(quest_id)
+            return self._counts.get(quest_id, 0)
+
+    def leave(self, sid: str, quest_id: str) -> int:
+        """Stops counting the connection as a player or watcher of the quest. Returns the number of players left."""
+        with self._lock:
+            self._discard(self._watched, sid, quest_id)
+            if self._discard(self._sessions, sid, quest_id):
+                self._decrement(quest_id)
+            return self._counts.get(quest_id, 0)
+
+    def disconnect(self, sid: str):
+        """Removes the connection from every quest it played or watched."""
+        with self._lock:
+            self._watched.pop(sid, None)
+            for quest_id in self._sessions.pop(sid, ()):
+                self._decrement(quest_id)
+
+    def count(self, quest_id: str) -> int:
+        return self._counts.get(quest_id, 0)
+
+    def drain_changes(self) -> Dict[str, int]:
+        """Returns the current count of every quest that changed since the previous call, and forgets empty quests."""
+        with self._lock:
+            changes = {quest_id: self._counts.get(quest_id, 0) for quest_id in self._changed}
+            self._changed.clear()
+            for quest_id, players in changes.items():
+                if players == 0:
+                    self._counts.pop(quest_id, None)
+            PRESENCE_ACTIVE_QUESTS.set(value=len(self._counts))
+        return changes
+
+    def _check_limit(self, sid: str, quest_id: str):
+        played, watched = self._sessions.get(sid, ()), self._watched.get(sid, ())
+        if quest_id not in played and quest_id not in watched and len(played) + len(watched) >= self.max_quests_per_client:
+            raise ValueError(f"A connection can join or watch at most {self.max_quests_per_client} quests.")
+
+    @staticmethod
+    def _discard(sessions: Dict[str, Set[str]], sid: str, quest_id: str) -> bool:
+        quests = sessions.get(sid)
+        if quests is None or quest_id not in quests:
+            return False
+        quests.discard(quest_id)
+        if not quests:
+            del sessions[sid]
+        return True
+
+    def _decrement(self, quest_id: str):
+        # The zero stays until the next tick has broadcast it.
+        self._counts[quest_id] -= 1
+        self._changed.add(quest_id)
+
+
+quest_presence = QuestPresence()
@@ -0,0 +1,89 @@
+import os
+import uuid
+import threading
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Recent events kept per user for resuming, and the number of users whose events are kept.
+RESUME_BUFFER_SIZE = int(os.getenv("RESUME_BUFFER_SIZE", 50))
+RESUME_MAX_USERS = int(os.getenv("RESUME_MAX_USERS", 10_000))
+
+
+def user_room(user_id: str) -> str:
+    """Room of the authenticated connections of a user, which receive the events logged for the user."""
+    return f"user:{user_id}"
+
+
+class _UserLog:
+    __slots__ = ("epoch", "seq", "events")
+
+    def __init__(self, size: int):
+        # Sequences start over in every log, so a log recreated after eviction is told apart by its epoch.
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.events = deque(maxlen=size)
+
+
+class UserEventLog:
+    """
+    Ring buffer of the latest events sent to each user, numbered by a per-user sequence.
+
+    A reconnecting client passes the last sequence number it applied and gets the events after it, so it
+    only has to reload its state from the API when events it missed were already overwritten. Logs of the
+    least recently active users are dropped beyond `max_users`, which bounds memory to
+    `max_users * size` events.
+
+    Sequences only mean something within one log, so every log has its own epoch: clients resuming
+    against another worker, after a restart or after their user's log was dropped and created again
+    are told to reload.
+    """
+
+    def __init__(self, size: int = RESUME_BUFFER_SIZE, max_users: int = RESUME_MAX_USERS):
+        self.size = size
+        self.max_users = max_users
+        self._logs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log(self, user_id: str) -> _UserLog:
+        """Returns the log of the user, created if needed, as the most recently active. Call with the lock held."""
+        log = self._logs.get(user_id)
+        if log is None:
+            log = self._logs[user_id] = _UserLog(self.size)
+            while len(self._logs) > self.max_users:
+                self._logs.popitem(last=False)
+        else:
+            self._logs.move_to_end(user_id)
+        return log
+
+    def append(self, user_id: str, event: str, data: dict) -> int:
+        """Logs an event sent to the user. Returns its sequence number."""
+        with self._lock:
+            log = self._log(user_id)
+            log.seq += 1
+            log.events.append((log.seq, event, data))
+            return log.seq
+
+    def resume(self, user_id: str, epoch: Optional[str], last_seq: int) -> Tuple[str, int, Optional[List[tuple]]]:
+        """
+        Returns the epoch and last sequence number of the user's log, and the (seq, event, data) entries
+        logged after `last_seq`, oldest first.
+
+        The entries are None if they cannot be replayed (other epoch, or events after `last_seq` were
+        overwritten); the client has to reload its state, then resume from the returned position.
+        """
+        with self._lock:
+            log = self._log(user_id)
+            position = (log.epoch, log.seq)
+            if epoch != log.epoch or last_seq > log.seq:
+                return position + (None,)
+            events = list(log.events)
+        if events and events[0][0] > last_seq + 1:
+            return position + (None,)
+        return position + ([entry for entry in events if entry[0] > last_seq],)
+
+
+user_event_log = UserEventLog()
@@ -0,0 +1,147 @@
+import os
+import math
+import time
+import threading
+from functools import wraps
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from flask import request
+
+from src.utils.metrics import ADMISSION_REJECTIONS, ADMISSION_IN_FLIGHT
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", 10_000))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key: `burst` requests at once, refilled at `rate_per_minute`.
+
+    Only the `max_keys` most recently seen keys are tracked; evicting a key just gives it a full bucket again.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = ADMISSION_MAX_KEYS):
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Takes a token for `key`. Returns 0 if allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / self.rate_per_second if self.rate_per_second else 60.0
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps the number of requests handled at the same time, across all clients."""
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_concurrent:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class RouteBudget:
+    """
+    Admission budget of one route, configurable through the environment:
+    ADMISSION_<NAME>_RATE_PER_MINUTE, ADMISSION_<NAME>_BURST and ADMISSION_<NAME>_CONCURRENCY.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, concurrency: int, retry_after_busy: int = 1):
+        prefix = f"ADMISSION_{name.upper()}"
+        self.name = name
+        self.retry_after_busy = retry_after_busy
+        self.limiter = TokenBucketLimiter(float(os.getenv(f"{prefix}_RATE_PER_MINUTE", rate_per_minute)),
+                                          int(os.getenv(f"{prefix}_BURST", burst)))
+        self.concurrency = ConcurrencyLimiter(int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)))
+
+
+# Password hashing (login, signup) and S3 uploads (upload, quest creation) are the expensive paths.
+ROUTE_BUDGETS = {
+    "login": RouteBudget("login", rate_per_minute=10, burst=5, concurrency=4),
+    "signup": RouteBudget("signup", rate_per_minute=3, burst=3, concurrency=2),
+    "upload": RouteBudget("upload", rate_per_minute=30, burst=10, concurrency=4),
+    "create_quest": RouteBudget("create_quest", rate_per_minute=10, burst=5, concurrency=2),
+}
+
+
+def client_key() -> str:
+    """
+    The authenticated user if known (set by `token_required`), otherwise the client address.
+
+    Behind the proxy, `remote_addr` is the address the proxy appended to X-Forwarded-For (see
+    TRUSTED_PROXY_HOPS in `app.py`), never one the client sent itself.
+    """
+    user_id = getattr(request, "user_id", None)
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def _reject(budget: RouteBudget, reason: str, status_code: int, retry_after: float, message: str):
+    ADMISSION_REJECTIONS.inc(budget.name, reason)
+    return {"error": message}, status_code, {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+def admission_controlled(route: str):
+    """
+    Sheds load on an expensive route before any work is done.
+
+    Returns `429` when the client exceeds the route's rate budget and `503` when the route already
+    handles its maximum number of concurrent requests, both with a `Retry-After` header.
+    Apply below `token_required` so authenticated requests are limited per user.
+    """
+    budget = ROUTE_BUDGETS[route]
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return f(*args, **kwargs)
+
+            # Concurrency first: a request turned away as busy does not use up the client's rate budget.
+            if not budget.concurrency.try_acquire():
+                return _reject(budget, "overloaded", 503, budget.retry_after_busy, "Server is busy, try again later.")
+
+            retry_after = budget.limiter.acquire(client_key())
+            if retry_after:
+                budget.concurrency.release()
+                return _reject(budget, "rate_limited", 429, retry_after, "Too many requests, try again later.")
+
+            ADMISSION_IN_FLIGHT.set(budget.name, value=budget.concurrency.in_flight)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                budget.concurrency.release()
+                ADMISSION_IN_FLIGHT.set(budget.name, value=budget.concurrency.in_flight)
+
+        return decorated_function
+
+    return decorator
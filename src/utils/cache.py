@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List
+
+from dotenv import load_dotenv
+
+from src.utils.metrics import CACHE_REQUESTS, CACHE_INVALIDATIONS
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Entry lifetime while the change stream invalidation bus is running, and without it.
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 300))
+CACHE_FALLBACK_TTL_SECONDS = float(os.getenv("CACHE_FALLBACK_TTL_SECONDS", 30))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10_000))
+
+_MISSING = object()
+
+
+class DocumentCache:
+    """
+    In-process LRU cache of values derived from one MongoDB document, with a TTL.
+
+    Entries are keyed by (document id, variant), e.g. a quest id and the projection used to read it,
+    so every cached variant of a document is evicted when the document changes. Values are returned
+    as stored: cache immutable results or copy them on read.
+    """
+
+    def __init__(self, name: str, collection_name: str,
+                 max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_FALLBACK_TTL_SECONDS):
+        self.name = name
+        self.collection_name = collection_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._variants: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, document_id, variant: Hashable = None, default=None) -> Any:
+        key = (str(document_id), variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(self.name, "hit")
+                return entry[0]
+            if entry is not _MISSING:
+                self._remove(key)
+        CACHE_REQUESTS.inc(self.name, "miss")
+        return default
+
+    def set(self, document_id, value: Any, variant: Hashable = None):
+        if not CACHE_ENABLED:
+            return
+        key = (str(document_id), variant)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            self._variants.setdefault(key[0], set()).add(variant)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, document_id, source: str = "local"):
+        document_id = str(document_id)
+        with self._lock:
+            variants = self._variants.pop(document_id, ())
+            for variant in variants:
+                self._entries.pop((document_id, variant), None)
+        if variants:
+            CACHE_INVALIDATIONS.inc(self.name, source)
+
+    def clear(self, source: str = "local"):
+        with self._lock:
+            self._entries.clear()
+            self._variants.clear()
+        CACHE_INVALIDATIONS.inc(self.name, source)
+
+    def _remove(self, key: tuple):
+        self._entries.pop(key, None)
+        variants = self._variants.get(key[0])
+        if variants is not None:
+            variants.discard(key[1])
+            if not variants:
+                del self._variants[key[0]]
+
+
+class CacheRegistry:
+    """Caches by collection, so writes and change events can evict every cache derived from a document."""
+
+    def __init__(self):
+        self._caches: Dict[str, List[DocumentCache]] = {}
+
+    def register(self, cache: DocumentCache) -> DocumentCache:
+        self._caches.setdefault(cache.collection_name, []).append(cache)
+        return cache
+
+    def invalidate(self, collection_name: str, document_id, source: str = "local"):
+        for cache in self._caches.get(collection_name, ()):
+            cache.invalidate(document_id, source=source)
+
+    def clear(self, collection_name: str = None, source: str = "local"):
+        collections = [collection_name] if collection_name else list(self._caches)
+        for name in collections:
+            for cache in self._caches.get(name, ()):
+                cache.clear(source=source)
+
+    def set_ttl(self, ttl_seconds: float):
+        for caches in self._caches.values():
+            for cache in caches:
+                cache.ttl_seconds = ttl_seconds
+
+    @property
+    def collection_names(self) -> List[str]:
+        return list(self._caches)
+
+
+cache_registry = CacheRegistry()
@@ -15,6 +15,9 @@ class DocumentValidationError(Exception):
 class InsertionError(Exception):
     """Raised when document insertion fails."""
 
+class DuplicateRecordError(InsertionError):
+    """Raised when an inserted document violates a unique index."""
+
 class InvalidEmail(Exception):
     """Raised when email validation fails."""
 
@@ -31,5 +34,16 @@ class NotFoundError(Exception):
 class UpdateError(Exception):
     """Raised when an error occurred when trying to update document(s) in DB."""
 
+class VersionConflictError(UpdateError):
+    """Raised when a document was modified after the version an update is based on."""
+    def __init__(self, message="Document was modified by another request.", current_version: int = None):
+        super().__init__(message)
+        self.current_version = current_version
+
 class Unauthorized(Exception):
     """Raised when user attempts to request resource they are not allowed to request."""
+
+class JobQueueFull(Exception):
+    """Raised when a background job is submitted while too many jobs are waiting or running."""
+    def __init__(self, message="Too many background jobs are pending, try again later."):
+        super().__init__(message)
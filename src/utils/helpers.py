@@ -2,14 +2,18 @@ import os
 import re
 import jwt
 import uuid
-import boto3
 import datetime
+import threading
 import mimetypes
 from functools import wraps
+from typing import Iterable, List, Tuple, Union
+from bson import ObjectId
 from dotenv import load_dotenv
 from flask import request, abort
 from flask import Flask, request, jsonify
 
+from src.utils.metrics import S3_UPLOAD_DURATION, S3_UPLOAD_FAILURES
+
 load_dotenv()
 
 S3_BUCKET_RESOURCES = os.getenv("S3_BUCKET_RESOURCES")
@@ -18,14 +22,67 @@ S3_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
 S3_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 CLOUDFRONT_DISTRIBUTION = os.getenv("CLOUDFRONT_DISTRIBUTION")
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=S3_ACCESS_KEY,
-    aws_secret_access_key=S3_SECRET_KEY,
-    region_name=S3_REGION,
-)
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """Returns the shared S3 client, creating it on first upload (importing boto3 takes a noticeable part of startup)."""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client(
+                    "s3",
+                    aws_access_key_id=S3_ACCESS_KEY,
+                    aws_secret_access_key=S3_SECRET_KEY,
+                    region_name=S3_REGION,
+                )
+    return _s3_client
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+ADMIN_USER_IDS = frozenset(filter(None, (user_id.strip() for user_id in os.getenv("ADMIN_USER_IDS", "").split(","))))
+
+# Upper bound of ids resolved by one batch lookup (`GET /users?ids=`, `GET /quests?ids=`).
+BATCH_LOOKUP_MAX_IDS = int(os.getenv("BATCH_LOOKUP_MAX_IDS", 100))
+
+def parse_object_ids(value: str, max_ids: int = BATCH_LOOKUP_MAX_IDS) -> List[ObjectId]:
+    """
+    Parses a comma separated list of ObjectIds, keeping the first occurrence of each id, in order.
+
+    Raises:
+        ValueError: If the list is empty, has more than `max_ids` ids or contains an invalid id.
+    """
+    ids = list(dict.fromkeys(item.strip() for item in (value or "").split(",") if item.strip()))
+    if not ids:
+        raise ValueError("ids must be a comma separated list of ids.")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once.")
+
+    invalid = [item for item in ids if not ObjectId.is_valid(item)]
+    if invalid:
+        raise ValueError(f"Invalid ids: {', '.join(invalid[:5])}.")
+    return list(dict.fromkeys(ObjectId(item) for item in ids))
+
+def parse_fields(value: str, allowed: Iterable[str]) -> Union[Tuple[str, ...], None]:
+    """
+    Parses a comma separated `fields` parameter. Returns None if it was not given (all fields).
+
+    Raises:
+        ValueError: If a field is not in `allowed`.
+    """
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed fields: {', '.join(allowed)}.")
+    return fields
+
+def order_by_ids(ids: List[ObjectId], documents: Iterable[dict]) -> Tuple[List[dict], List[str]]:
+    """Puts documents read with an `$in` query in the order of `ids`. Returns them and the ids that were not found."""
+    by_id = {document["_id"]: document for document in documents}
+    return [by_id[_id] for _id in ids if _id in by_id], [str(_id) for _id in ids if _id not in by_id]
 
 def generate_unique_filename(filename):
     """Generate a unique filename using UUID and keep the original extension."""
@@ -38,9 +95,14 @@ def upload_to_s3(file):
     content_type, _ = mimetypes.guess_type(file.filename)
     content_type = content_type or 'application/octet-stream'
 
-    s3_client.upload_fileobj(
-        file, S3_BUCKET_RESOURCES, unique_filename, ExtraArgs={"ContentType": content_type}
-    )
+    try:
+        with S3_UPLOAD_DURATION.time():
+            get_s3_client().upload_fileobj(
+                file, S3_BUCKET_RESOURCES, unique_filename, ExtraArgs={"ContentType": content_type}
+            )
+    except Exception:
+        S3_UPLOAD_FAILURES.inc()
+        raise
     return f"{CLOUDFRONT_DISTRIBUTION}/{unique_filename}"
 
 
@@ -54,11 +116,21 @@ def generate_jwt_token(user_id: str) -> str:
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm="HS256")
     return token
 
+def get_user_id_from_token(token: str) -> str:
+    """
+    Returns the user id of a JWT token created by `generate_jwt_token`.
+
+    Raises:
+        jwt.ExpiredSignatureError: If the token has expired.
+        jwt.InvalidTokenError: If the token is invalid.
+    """
+    return jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])['sub']
+
 def format_payload_validation_errors(errors):
     error_messages = []
 
     for error in errors:
-        field = ".".join(error["loc"])
+        field = ".".join(map(str, error["loc"]))
         error_type = error["type"]
         message = error["msg"]
 
@@ -115,8 +187,7 @@ def token_required(f):
             abort(401, "Token is missing")
 
         try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
-            request.user_id = payload['sub']
+            request.user_id = get_user_id_from_token(token)
         except jwt.ExpiredSignatureError:
             abort(401, "Token has expired")
         except jwt.InvalidTokenError:
@@ -125,3 +196,15 @@ def token_required(f):
         return f(*args, **kwargs)
 
     return decorated_function
+
+def admin_required(f):
+    """Allows only users listed in ADMIN_USER_IDS (comma separated user ids)."""
+    @wraps(f)
+    @token_required
+    def decorated_function(*args, **kwargs):
+        if request.user_id not in ADMIN_USER_IDS:
+            abort(403, "Admin access required")
+
+        return f(*args, **kwargs)
+
+    return decorated_function
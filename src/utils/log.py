@@ -0,0 +1,147 @@
+import os
+import uuid
+import logging
+import itertools
+import contextvars
+from typing import Any, Dict
+
+from flask import request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger('myLog')
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SUMMARY_MAX_IDS = int(os.getenv("LOG_SUMMARY_MAX_IDS", 5))
+LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_DEFAULT_SAMPLE_RATE", 1.0))
+CORRELATION_ID_HEADER = "X-Request-ID"
+
+correlation_id_var = contextvars.ContextVar("correlation_id", default="-")
+
+
+def _parse_sample_rates(raw: str) -> Dict[str, float]:
+    """
+    Parses per-call-site sampling rates from a string like "db.read=0.01,db.create=1".
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        call_site, _, rate = item.partition("=")
+        try:
+            rates[call_site.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            logger.warning(f"Ignoring invalid log sample rate: {item}")
+    return rates
+
+LOG_SAMPLE_RATES = _parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+
+
+class DocumentSummary:
+    """
+    Lazily renders a short summary (count and first ids) of a query result.
+
+    Nothing is computed unless the log record is actually formatted.
+    """
+    __slots__ = ("documents",)
+
+    def __init__(self, documents: Any):
+        self.documents = documents
+
+    def __str__(self) -> str:
+        documents = self.documents
+        if documents is None:
+            return "0 documents"
+        if isinstance(documents, dict):
+            return f"1 document (id={documents.get('_id')})"
+        if not isinstance(documents, (list, tuple)):
+            return type(documents).__name__
+
+        ids = [str(document.get("_id")) if isinstance(document, dict) else str(document)
+               for document in documents[:LOG_SUMMARY_MAX_IDS]]
+        more = ", ..." if len(documents) > LOG_SUMMARY_MAX_IDS else ""
+        return f"{len(documents)} documents (ids=[{', '.join(ids)}{more}])"
+
+
+class _Fields:
+    """Lazily renders structured fields as `key=value` pairs."""
+    __slots__ = ("call_site", "fields")
+
+    def __init__(self, call_site: str, fields: dict):
+        self.call_site = call_site
+        self.fields = fields
+
+    def __str__(self) -> str:
+        rendered = " ".join(f"{key}={value}" for key, value in self.fields.items())
+        return f"event={self.call_site} {rendered}" if rendered else f"event={self.call_site}"
+
+
+class _Sampler:
+    """Deterministic 1-in-N sampler, cheap enough to call on every hot read."""
+    __slots__ = ("every", "counter")
+
+    def __init__(self, rate: float):
+        self.every = round(1 / rate) if rate > 0 else 0
+        self.counter = itertools.count()
+
+    def __call__(self) -> bool:
+        if self.every == 0:
+            return False
+        return self.every == 1 or next(self.counter) % self.every == 0
+
+_samplers: Dict[str, _Sampler] = {}
+
+def _sampled(call_site: str) -> bool:
+    sampler = _samplers.get(call_site)
+    if sampler is None:
+        sampler = _samplers.setdefault(call_site, _Sampler(LOG_SAMPLE_RATES.get(call_site, LOG_DEFAULT_SAMPLE_RATE)))
+    return sampler()
+
+
+def log_event(level: int, call_site: str, **fields):
+    """
+    Logs a structured event for `call_site` with lazy formatting and per-call-site sampling.
+
+    Args:
+        level: Logging level (e.g. logging.DEBUG).
+        call_site: Stable event name, used as the sampling key (e.g. "db.read").
+        **fields: Event fields. Values are only converted to strings if the record is emitted,
+                  so pass DocumentSummary(...) instead of raw documents.
+    """
+    if not logger.isEnabledFor(level) or not _sampled(call_site):
+        return
+    logger.log(level, "%s", _Fields(call_site, fields), extra={"fields": fields}, stacklevel=2)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Adds the current request correlation id to every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id_var.get()
+        return True
+
+
+def configure_logging():
+    """Attaches a handler including the correlation id to the app logger, once."""
+    if logger.handlers:
+        return
+
+    handler = logging.StreamHandler()
+    handler.addFilter(CorrelationIdFilter())
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s [%(correlation_id)s] %(name)s: %(message)s"
+    ))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+
+
+def init_request_logging(app):
+    """Assigns a correlation id to every request, reusing the client's X-Request-ID if sent."""
+
+    @app.before_request
+    def set_correlation_id():
+        correlation_id_var.set(request.headers.get(CORRELATION_ID_HEADER) or uuid.uuid4().hex)
+
+    @app.after_request
+    def add_correlation_id_header(response):
+        response.headers[CORRELATION_ID_HEADER] = correlation_id_var.get()
+        return response
@@ -0,0 +1,215 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+from flask import request, g
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+    Base class for in-process metrics.
+
+    Values are kept in plain dicts keyed by label values and guarded by a lock. Under the
+    eventlet worker the lock is green (monkey patched), and the critical sections never
+    yield, so updates stay cheap and consistent.
+    """
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            lines.extend(self._render_value(label_values, value))
+        return lines
+
+    def _render_value(self, label_values: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {value}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *label_values, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count.
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*label_values, value=time.perf_counter() - start)
+
+    def _render_value(self, label_values: Tuple, value) -> List[str]:
+        bucket_counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, f'le="{le}"')} {cumulative}")
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram("http_request_duration_seconds",
+                                           "HTTP request latency by flask-restx namespace and route.",
+                                           labels=("namespace", "route", "method"))
+HTTP_REQUESTS = registry.counter("http_requests_total",
+                                 "HTTP requests by namespace, route, method and status code.",
+                                 labels=("namespace", "route", "method", "status"))
+MONGO_COMMAND_DURATION = registry.histogram("mongodb_command_duration_seconds",
+                                            "MongoDB command latency by command and collection.",
+                                            labels=("command", "collection"),
+                                            buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+MONGO_COMMAND_FAILURES = registry.counter("mongodb_command_failures_total",
+                                          "Failed MongoDB commands by command and collection.",
+                                          labels=("command", "collection"))
+MONGO_POOL_CONNECTIONS = registry.gauge("mongodb_pool_connections",
+                                        "MongoDB connections per server address and state (open, checked_out).",
+                                        labels=("address", "state"))
+MONGO_POOL_CHECKOUT_FAILURES = registry.counter("mongodb_pool_checkout_failures_total",
+                                                "Failed MongoDB connection checkouts by server address and reason.",
+                                                labels=("address", "reason"))
+S3_UPLOAD_DURATION = registry.histogram("s3_upload_duration_seconds", "S3 upload latency.")
+S3_UPLOAD_FAILURES = registry.counter("s3_upload_failures_total", "Failed S3 uploads.")
+ADMISSION_REJECTIONS = registry.counter("admission_rejections_total",
+                                       "Requests shed by admission control by route and reason (rate_limited, overloaded).",
+                                       labels=("route", "reason"))
+ADMISSION_IN_FLIGHT = registry.gauge("admission_in_flight_requests", "Requests in flight on admission-controlled routes.",
+                                     labels=("route",))
+BACKGROUND_JOBS = registry.counter("background_jobs_total", "Finished background jobs by kind and status.",
+                                   labels=("kind", "status"))
+BACKGROUND_JOB_RETRIES = registry.counter("background_job_retries_total", "Retried background job attempts by kind.",
+                                          labels=("kind",))
+CACHE_REQUESTS = registry.counter("cache_requests_total", "In-process cache lookups by cache and result (hit, miss).",
+                                  labels=("cache", "result"))
+CACHE_INVALIDATIONS = registry.counter("cache_invalidations_total",
+                                       "In-process cache evictions by cache and source (local, change_stream, resync).",
+                                       labels=("cache", "source"))
+CHANGE_STREAM_UP = registry.gauge("cache_change_stream_up",
+                                  "1 while the cache invalidation bus is tailing change streams, 0 on TTL fallback.")
+SOCKETIO_CONNECTED_CLIENTS = registry.gauge("socketio_connected_clients", "Currently connected Socket.IO clients.")
+SOCKETIO_EMITS = registry.counter("socketio_emits_total", "Socket.IO events emitted by event name.", labels=("event",))
+SOCKETIO_OUTBOUND_QUEUE_DEPTH = registry.gauge("socketio_outbound_queue_depth_max",
+                                               "Deepest outbound packet queue of a Socket.IO client at the last sample.")
+SOCKETIO_OUTBOUND_QUEUED_PACKETS = registry.gauge("socketio_outbound_queued_packets",
+                                                  "Outbound packets queued for all Socket.IO clients at the last sample.")
+SOCKETIO_OUTBOUND_DROPPED = registry.counter("socketio_outbound_dropped_total",
+                                             "Queued Socket.IO events replaced by or merged with a newer one (coalesced) or dropped "
+                                             "from full client queues, by event.", labels=("event", "reason"))
+SOCKETIO_SLOW_CLIENT_DISCONNECTS = registry.counter("socketio_slow_client_disconnects_total",
+                                                    "Socket.IO clients disconnected for staying over the outbound queue limit.")
+PRESENCE_ACTIVE_QUESTS = registry.gauge("presence_active_quests", "Quests with at least one connected player.")
+SOCKETIO_RESUMES = registry.counter("socketio_resumes_total",
+                                   "Socket.IO resume requests by result (replayed, reload).", labels=("result",))
+
+
+def _route_labels() -> Tuple[str, str]:
+    rule = request.url_rule
+    if rule is None:
+        return "unmatched", "unmatched"
+    route = rule.rule
+    namespace = route.strip("/").split("/", 1)[0] or "root"
+    return namespace, route
+
+
+def init_request_metrics(app):
+    """Records latency and status of every request handled by `app`."""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started_at = g.pop("request_started_at", None)
+        if started_at is not None:
+            namespace, route = _route_labels()
+            HTTP_REQUEST_DURATION.observe(namespace, route, request.method, value=time.perf_counter() - started_at)
+            HTTP_REQUESTS.inc(namespace, route, request.method, str(response.status_code))
+        return response
@@ -0,0 +1,31 @@
+import json
+import itertools
+from typing import Callable, Iterable, Optional
+
+from flask import Response, stream_with_context
+
+
+def stream_json_array(documents: Iterable, serializer: Optional[Callable[[dict], dict]] = None, key: str = None) -> Response:
+    """
+    Streams `documents` as a JSON array (or as `{key: [...]}`) while they are read from the database.
+
+    The first document is fetched before the response starts, so query errors still surface as a
+    regular error response instead of a truncated 200.
+
+    Args:
+        documents: Iterable of documents, typically from `iter_read`/`iter_aggregate`.
+        serializer: Converts each document to a JSON-serializable dict (e.g. a DocumentSerializer).
+        key: Wrap the array in an object under this key.
+    """
+    documents = iter(documents)
+    first = list(itertools.islice(documents, 1))
+
+    def generate():
+        yield f'{{"{key}": [' if key else "["
+        for index, document in enumerate(itertools.chain(first, documents)):
+            if serializer is not None:
+                document = serializer(document)
+            yield ("," if index else "") + json.dumps(document)
+        yield "]}" if key else "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,28 @@
+"""
+Runs the tests against the in-memory MongoDB stand-in of the benchmarks (see `benchmarks/memory_backend.py`).
+
+The environment is set before any `src` module is imported, since they read it at import time.
+"""
+import os
+
+import pytest
+
+os.environ["MONGO_DB_NAME"] = "quest_test"
+os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+from benchmarks import memory_backend
+
+mongo_client = memory_backend.install()
+
+
+@pytest.fixture
+def db():
+    """The test database, emptied after each test."""
+    from src.utils.cache import cache_registry
+
+    yield mongo_client[os.environ["MONGO_DB_NAME"]]
+    mongo_client.drop_database(os.environ["MONGO_DB_NAME"])
+    cache_registry.clear()
@@ -0,0 +1,45 @@
+import pytest
+
+from src.utils import admission
+from src.utils.admission import RouteBudget
+
+
+@pytest.fixture
+def login_budget(monkeypatch):
+    """Admission control on, with a login budget of one request per client and one at a time."""
+    # The route holds on to its budget from import, so the test budget's limiters are swapped in.
+    budget = admission.ROUTE_BUDGETS["login"]
+    test_budget = RouteBudget("login", rate_per_minute=1, burst=1, concurrency=1)
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(budget, "limiter", test_budget.limiter)
+    monkeypatch.setattr(budget, "concurrency", test_budget.concurrency)
+    return budget
+
+
+def _login(client, forwarded_for: str):
+    # As forwarded by nginx on the same host: it appends the address it received the request from.
+    return client.post("/auth/login/email", json={"email": "ada@example.com", "password": "wrong"},
+                       headers={"X-Forwarded-For": forwarded_for}, environ_base={"REMOTE_ADDR": "127.0.0.1"})
+
+
+def test_anonymous_clients_are_keyed_by_proxy_appended_address(db, login_budget):
+    import app as app_module
+
+    client = app_module.app.test_client()
+    assert _login(client, "203.0.113.7").status_code != 429
+    assert _login(client, "198.51.100.2").status_code != 429
+    # A client cannot get a fresh budget by prepending its own X-Forwarded-For entries.
+    assert _login(client, "10.9.9.9, 203.0.113.7").status_code == 429
+
+
+def test_busy_rejection_keeps_rate_token(db, login_budget):
+    import app as app_module
+
+    client = app_module.app.test_client()
+    assert login_budget.concurrency.try_acquire()
+    try:
+        assert _login(client, "203.0.113.7").status_code == 503
+    finally:
+        login_budget.concurrency.release()
+    assert _login(client, "203.0.113.7").status_code != 429
+    assert login_budget.concurrency.in_flight == 0
@@ -0,0 +1,16 @@
+import pytest
+
+from src.services.auth import signup_with_email
+from src.database.utils.service import ensure_indexes
+from src.utils.exceptions import EmailInUse
+
+SIGNUP = {"name": "Ada", "email": "ada@example.com", "password": "correct horse battery staple"}
+
+
+def test_signup_twice_with_one_email(db):
+    ensure_indexes()
+    signup_with_email(dict(SIGNUP))
+
+    with pytest.raises(EmailInUse):
+        signup_with_email({**SIGNUP, "name": "Someone else"})
+    assert db["Users"].count_documents({"email": SIGNUP["email"]}) == 1
@@ -0,0 +1,87 @@
+import queue
+import inspect
+import collections
+
+import pytest
+import socketio
+from engineio.socket import Socket
+from socketio import packet
+
+from src.sockets.backpressure import BackpressureManager
+
+EIO_SID = "eio-1"
+
+
+class QueuedSocket:
+    """Engine.IO socket whose writer never runs, so every packet sent to it stays queued."""
+
+    closed = False
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def send(self, eio_pkt):
+        self.queue.put(eio_pkt)
+
+
+@pytest.fixture
+def server():
+    server = socketio.Server(async_mode="threading", client_manager=BackpressureManager(max_depth=1, hard_max_depth=100))
+    server.eio.sockets[EIO_SID] = QueuedSocket()
+    server.environ[EIO_SID] = {}
+    server.manager.connect(EIO_SID, "/")
+    return server
+
+
+def queued_events(server) -> list:
+    return [packet.Packet(encoded_packet=eio_pkt.data).data for eio_pkt in server.eio.sockets[EIO_SID].queue.queue]
+
+
+def progress(user_id: str, **fields) -> dict:
+    return {"user_id": user_id, "quest_id": "quest-1", **fields}
+
+
+def test_queued_progress_updates_are_merged(server):
+    server.emit("userProgressUpdate", progress("ada", level=1, score_delta=10, time_delta=30))
+    server.emit("userProgressUpdate", progress("ada", level=2, score_delta=5, time_delta=12, completed=True))
+
+    assert queued_events(server) == [
+        ["userProgressUpdate", progress("ada", level=2, score_delta=15, time_delta=42, completed=True)],
+    ]
+
+
+def test_progress_updates_are_never_dropped(server):
+    server.emit("userProgressUpdate", progress("ada", score_delta=10))
+    server.emit("userProgressUpdate", progress("grace", score_delta=5))
+
+    assert queued_events(server) == [
+        ["userProgressUpdate", progress("ada", score_delta=10)],
+        ["userProgressUpdate", progress("grace", score_delta=5)],
+    ]
+
+
+def test_presence_makes_room_for_progress(server):
+    server.emit("questPresence", {"quest_id": "quest-1", "players": 3})
+    server.emit("questPresence", {"quest_id": "quest-1", "players": 4})
+    server.emit("userProgressUpdate", progress("ada", score_delta=10))
+
+    assert queued_events(server) == [["userProgressUpdate", progress("ada", score_delta=10)]]
+
+
+@pytest.mark.parametrize("async_mode", ["threading", "eventlet"])
+def test_engineio_internals_are_available(async_mode):
+    """
+    The private parts of python-socketio and python-engineio used by BackpressureManager and CodecManager.
+    Fails on a version that changed them; see the pins in requirements.txt.
+    """
+    server = socketio.Server(async_mode=async_mode)
+    socket = Socket(server.eio, EIO_SID)
+
+    assert len(inspect.signature(server._send_packet).parameters) == 2
+    assert len(inspect.signature(server._send_eio_packet).parameters) == 2
+    assert isinstance(socket.queue.queue, collections.deque)
+    assert callable(socket.queue.task_done) and callable(socket.queue.qsize)
+    with pytest.raises(server.eio.get_queue_empty_exception()):
+        socket.queue.get(block=False)
+    assert {"wait", "abort", "reason"} <= set(inspect.signature(socket.close).parameters)
+    assert server.eio.reason.SERVER_DISCONNECT
@@ -0,0 +1,55 @@
+import os
+
+import pymongo
+import pytest
+from bson import ObjectId
+
+from src.database.utils import service
+from src.database.utils.service import ensure_indexes, indexes_ensured
+from src.database.utils.profiler import SlowQueryProfiler, explain_entry
+from src.database.user.service import refresh_quest_history_summaries
+
+# A real MongoDB server for the tests that need one (e.g. mongodb://localhost:27017); its test database is dropped.
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+
+def test_ensure_indexes_creates_declared_indexes(db):
+    assert ensure_indexes()
+    assert indexes_ensured()
+
+    indexes = db["Users"].index_information()
+    assert list(indexes["email_unique"]["key"]) == [("email", 1)]
+    assert indexes["email_unique"]["unique"]
+    assert list(indexes["quest_history_quest_id"]["key"]) == [("quest_history.quest_id", 1)]
+
+
+def test_readiness_reports_indexes(db):
+    import app as app_module
+
+    ensure_indexes()
+    response = app_module.app.test_client().get("/general/health/ready")
+    assert response.get_json()["checks"]["indexes"] == "ok"
+
+
+@pytest.mark.skipif(not MONGO_TEST_URI, reason="explain needs a MongoDB server: set MONGO_TEST_URI")
+def test_quest_summary_refresh_uses_quest_history_index(monkeypatch):
+    """Explains the update issued by the summary refresh, as recorded by the slow query profiler."""
+    profiler = SlowQueryProfiler(threshold_ms=0, log_path=None)
+    client = pymongo.MongoClient(MONGO_TEST_URI, event_listeners=[profiler])
+    monkeypatch.setattr(service, "get_client", lambda: client)
+    try:
+        assert ensure_indexes()
+        quest_id = ObjectId()
+        client[service.DB_NAME]["Users"].insert_one({"email": "ada@example.com", "quest_history": [{"quest_id": quest_id}]})
+
+        refresh_quest_history_summaries(quest_id=quest_id, quest_summary={"title": "Lighthouse"})
+
+        update = next(entry for entry in profiler.entries if entry["command_name"] == "update")
+        analysis = explain_entry(client, update)
+    finally:
+        client.drop_database(service.DB_NAME)
+        client.close()
+
+    assert analysis["error"] is None
+    assert not analysis["collscan"]
+    assert "IXSCAN" in analysis["stages"]
@@ -0,0 +1,30 @@
+import pytest
+
+from src.sockets.presence import QuestPresence
+
+
+def test_watched_quests_count_towards_the_limit():
+    presence = QuestPresence(max_quests_per_client=2)
+    presence.join("sid-1", "quest-1")
+    presence.watch("sid-1", "quest-2")
+
+    with pytest.raises(ValueError):
+        presence.watch("sid-1", "quest-3")
+    with pytest.raises(ValueError):
+        presence.join("sid-1", "quest-3")
+    # Already in these rooms: playing a watched quest or watching a played one takes no other place.
+    assert presence.join("sid-1", "quest-2") == 1
+    assert presence.watch("sid-1", "quest-1") == 1
+
+    presence.leave("sid-1", "quest-2")
+    assert presence.watch("sid-1", "quest-3") == 0
+
+
+def test_disconnect_forgets_watched_quests():
+    presence = QuestPresence(max_quests_per_client=1)
+    presence.watch("sid-1", "quest-1")
+
+    presence.disconnect("sid-1")
+
+    assert presence._watched == {}
+    assert presence.watch("sid-1", "quest-2") == 0
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from bson import ObjectId
+
+from src.services import quest as quest_service
+from src.services.jobs import JobQueue, job_queue
+from src.sockets.events import socketio
+from src.utils.exceptions import UpdateError, JobQueueFull
+from src.utils.helpers import generate_jwt_token
+
+
+def _quest(creator_id: ObjectId) -> dict:
+    data = {"name": "lighthouse", "title": "Lighthouse", "description": "Find the keeper.", "time_limit": "30",
+            "difficulty": "easy", "created_by": str(creator_id), "levels": []}
+    quest_service._prepare_quest(data)
+    data["_id"] = ObjectId()
+    return data
+
+
+def _retry(data: dict, uploaded_pictures: dict, completed_steps: set, monkeypatch, failing_step: str):
+    """Runs the job once with `failing_step` raising, then again as the job queue's retry would."""
+    def fail(*args, **kwargs):
+        raise UpdateError("Failed to update documents.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(quest_service, failing_step, fail)
+        with pytest.raises(UpdateError):
+            quest_service._run_create_quest_job(data, {}, uploaded_pictures, completed_steps)
+    return quest_service._run_create_quest_job(data, {}, uploaded_pictures, completed_steps)
+
+
+@pytest.mark.parametrize("failing_step", ["increment_user_stats", "update_user"])
+def test_retried_quest_creation_counts_quest_once(db, monkeypatch, failing_step):
+    creator_id = db["Users"].insert_one({"name": "Ada", "email": "ada@example.com", "created_quests": []}).inserted_id
+    data = _quest(creator_id)
+
+    _retry(data, {}, set(), monkeypatch, failing_step)
+
+    assert db["Quests"].count_documents({"_id": data["_id"]}) == 1
+    assert db["UserStats"].find_one({"_id": creator_id})["quests_created"] == 1
+    assert db["Users"].find_one({"_id": creator_id})["created_quests"] == [data["_id"]]
+
+
+def test_full_job_queue_rejects_and_keeps_unfinished_jobs():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_entries=1, max_pending=2)
+    running = [queue.submit("wait", release.wait), queue.submit("wait", release.wait)]
+
+    with pytest.raises(JobQueueFull):
+        queue.submit("wait", release.wait)
+    # Over `max_entries`, yet neither job is evicted before it finishes.
+    assert all(queue.get(job["job_id"]) is not None for job in running)
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while queue._unfinished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert queue.submit("wait", release.wait)["job_id"]
+
+
+def test_subscribe_job_requires_job_owner(db):
+    import app as app_module
+
+    owner_id, other_id = str(ObjectId()), str(ObjectId())
+    job = job_queue.submit("noop", lambda: None, owner_id=owner_id)
+
+    def subscribe(auth, job_id=job["job_id"]):
+        client = socketio.test_client(app_module.app, auth=auth)
+        try:
+            return client.emit("subscribeJob", {"job_id": job_id}, callback=True)
+        finally:
+            client.disconnect()
+
+    assert subscribe(None)["status"] == "error"
+    assert subscribe({"token": generate_jwt_token(other_id)})["status"] == "error"
+    assert subscribe({"token": generate_jwt_token(owner_id)}, job_id="unknown")["status"] == "error"
+    assert subscribe({"token": generate_jwt_token(owner_id)})["status"] == "success"
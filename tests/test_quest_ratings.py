@@ -0,0 +1,53 @@
+from bson import ObjectId
+
+from src.database.quest.service import get_quest_ratings_full_info
+
+
+def test_ratings_carry_rater_details_in_order(db):
+    ada, grace, deleted = ObjectId(), ObjectId(), ObjectId()
+    db["Users"].insert_many([
+        {"_id": ada, "name": "Ada", "profile_picture": "ada.png", "email": "ada@example.com"},
+        {"_id": grace, "name": "Grace", "email": "grace@example.com"},
+    ])
+    quest_id = db["Quests"].insert_one({"title": "Lighthouse", "ratings": [
+        {"user_id": grace, "rating": 4, "review": "Good"},
+        {"user_id": deleted, "rating": 1, "review": "Gone"},
+        {"user_id": ada, "rating": 5, "review": "Great"},
+    ]}).inserted_id
+
+    assert get_quest_ratings_full_info(str(quest_id)) == [
+        {"rating": 4, "review": "Good", "user_id": grace, "user_name": "Grace"},
+        {"rating": 5, "review": "Great", "user_id": ada, "user_name": "Ada", "user_profile_picture": "ada.png"},
+    ]
+
+
+def test_quest_without_ratings(db):
+    quest_id = db["Quests"].insert_one({"title": "Lighthouse"}).inserted_id
+
+    assert get_quest_ratings_full_info(str(quest_id)) == []
+
+
+def test_rating_updates_rounded_average(db):
+    from src.services.quest import rate_quest
+
+    quest_id = db["Quests"].insert_one({"title": "Lighthouse", "ratings": [
+        {"user_id": ObjectId(), "rating": 4},
+        {"user_id": ObjectId(), "rating": 5},
+    ]}).inserted_id
+
+    result = rate_quest(str(quest_id), {"user_id": str(ObjectId()), "rating": 5, "review": "$not an operator"})
+
+    assert result["avg_rating"] == 4.7
+    quest = db["Quests"].find_one({"_id": quest_id})
+    assert quest["avg_rating"] == 4.7
+    assert quest["ratings"][-1]["review"] == "$not an operator"
+
+
+def test_rating_average_rounds_half_to_even(db):
+    from src.services.quest import rate_quest
+
+    quest_id = db["Quests"].insert_one({"title": "Lighthouse", "ratings": [
+        {"user_id": ObjectId(), "rating": rating} for rating in (4, 4, 4)
+    ]}).inserted_id
+
+    assert rate_quest(str(quest_id), {"user_id": str(ObjectId()), "rating": 5})["avg_rating"] == 4.2
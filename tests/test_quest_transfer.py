@@ -0,0 +1,21 @@
+import json
+
+from bson import ObjectId
+
+from src.services.quest_transfer import import_quests_ndjson, export_quests_ndjson
+
+
+def test_plain_json_catalog_with_ratings(db):
+    quest_id, creator_id, rater_id = ObjectId(), ObjectId(), ObjectId()
+    line = json.dumps({"_id": str(quest_id), "name": "lighthouse", "title": "Lighthouse",
+                       "description": "Find the keeper.", "time_limit": 30, "difficulty": "easy",
+                       "main_picture": None, "created_by": str(creator_id), "levels": [],
+                       "ratings": [{"user_id": str(rater_id), "rating": 5, "review": "Great"}]})
+
+    report = import_quests_ndjson([line])
+
+    assert report == {"inserted": 1, "failed": 0, "errors": []}
+    quest = db["Quests"].find_one({"_id": quest_id})
+    assert quest["created_by"] == creator_id
+    assert quest["ratings"][0]["user_id"] == rater_id
+    assert len(list(export_quests_ndjson())) == 1
@@ -0,0 +1,139 @@
+import os
+
+import pymongo
+import pytest
+from bson import ObjectId
+
+from src.database.utils import service
+from src.services import quest as quest_service
+from src.utils.helpers import generate_jwt_token
+
+# A real MongoDB server for the tests that need one (e.g. mongodb://localhost:27017); its test database is dropped.
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+
+def _level(level_id: str) -> dict:
+    return {"type": "quiz", "id": level_id, "name": f"Level {level_id}", "question": "Which way?", "picture_urls": [],
+            "options": [{"id": "a", "text": "North"}, {"id": "b", "text": "South"}], "correct_option_id": "a"}
+
+
+def _quest(creator_id: ObjectId, version: int = 1) -> dict:
+    return {"_id": ObjectId(), "name": "lighthouse", "title": "Lighthouse", "description": "Find the keeper.",
+            "time_limit": 30, "difficulty": "easy", "created_by": creator_id, "version": version,
+            "levels": [_level("1"), _level("2")]}
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """Quest ids whose history summaries were scheduled for a refresh (the job itself is not run)."""
+    quest_ids = []
+    monkeypatch.setattr(quest_service, "schedule_quest_summary_refresh", quest_ids.append)
+    return quest_ids
+
+
+def _patch(quest_id: ObjectId, user_id: ObjectId, changes: dict):
+    import app as app_module
+
+    return app_module.app.test_client().patch(f"/quest/{quest_id}", json=changes,
+                                              headers={"Authorization": f"Bearer {generate_jwt_token(str(user_id))}"})
+
+
+def test_patch_sets_fields_and_increments_version(db, refreshed):
+    creator_id = ObjectId()
+    quest = _quest(creator_id)
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], creator_id, {"version": 1, "title": "Old Lighthouse", "time_limit": 45})
+
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 2
+    stored = db["Quests"].find_one({"_id": quest["_id"]})
+    assert (stored["title"], stored["time_limit"], stored["version"]) == ("Old Lighthouse", 45, 2)
+    assert stored["levels"] == quest["levels"]
+    assert refreshed == [quest["_id"]]
+
+
+def test_patch_adds_levels(db, refreshed):
+    creator_id = ObjectId()
+    quest = _quest(creator_id)
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], creator_id, {"version": 1, "levels": {"add": [_level("3")]}})
+
+    assert response.status_code == 200
+    assert [level["id"] for level in db["Quests"].find_one({"_id": quest["_id"]})["levels"]] == ["1", "2", "3"]
+    assert _patch(quest["_id"], creator_id, {"version": 2, "levels": {"add": [_level("1")]}}).status_code == 400
+
+
+def test_patch_removes_levels(db, refreshed):
+    creator_id = ObjectId()
+    quest = _quest(creator_id)
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], creator_id, {"version": 1, "levels": {"remove": ["1"]}})
+
+    assert response.status_code == 200
+    assert [level["id"] for level in db["Quests"].find_one({"_id": quest["_id"]})["levels"]] == ["2"]
+    assert _patch(quest["_id"], creator_id, {"version": 2, "levels": {"remove": ["1"]}}).status_code == 404
+
+
+def test_patch_of_stale_version_conflicts(db, refreshed):
+    creator_id = ObjectId()
+    quest = _quest(creator_id, version=3)
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], creator_id, {"version": 2, "title": "Old Lighthouse"})
+
+    assert response.status_code == 409
+    assert response.get_json()["version"] == 3
+    assert db["Quests"].find_one({"_id": quest["_id"]})["title"] == "Lighthouse"
+    assert refreshed == []
+
+
+def test_patch_by_other_user_is_unauthorized(db, refreshed):
+    quest = _quest(ObjectId())
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], ObjectId(), {"version": 1, "title": "Old Lighthouse"})
+
+    assert response.status_code == 401
+    assert db["Quests"].find_one({"_id": quest["_id"]})["version"] == 1
+
+
+def test_patch_cannot_clear_required_level_fields(db, refreshed):
+    creator_id = ObjectId()
+    quest = _quest(creator_id)
+    db["Quests"].insert_one(quest)
+
+    response = _patch(quest["_id"], creator_id, {"version": 1, "levels": {"update": [{"id": "1", "question": None}]}})
+
+    assert response.status_code == 400
+    assert db["Quests"].find_one({"_id": quest["_id"]})["version"] == 1
+
+
+@pytest.mark.skipif(not MONGO_TEST_URI, reason="arrayFilters need a MongoDB server: set MONGO_TEST_URI")
+def test_level_update_changes_only_that_level(monkeypatch, refreshed):
+    client = pymongo.MongoClient(MONGO_TEST_URI)
+    monkeypatch.setattr(service, "get_client", lambda: client)
+    creator_id = ObjectId()
+    quest = _quest(creator_id)
+    try:
+        client[service.DB_NAME]["Quests"].insert_one(quest)
+
+        result = quest_service.update_quest(str(quest["_id"]), str(creator_id), {"version": 1, "levels": {"update": [
+            {"id": "2", "question": "Which light?", "correct_option_id": "b"},
+        ]}})
+        with pytest.raises(ValueError, match="is not a input level"):
+            quest_service.update_quest(str(quest["_id"]), str(creator_id), {"version": 2, "levels": {"update": [
+                {"id": "1", "try_limit": 3},
+            ]}})
+
+        stored = client[service.DB_NAME]["Quests"].find_one({"_id": quest["_id"]})
+    finally:
+        client.drop_database(service.DB_NAME)
+        client.close()
+
+    assert result["version"] == 2
+    assert stored["version"] == 2
+    assert stored["levels"][0] == quest["levels"][0]
+    assert stored["levels"][1] == {**quest["levels"][1], "question": "Which light?", "correct_option_id": "b"}
@@ -0,0 +1,37 @@
+from src.sockets.resume import UserEventLog
+
+
+def test_resume_replays_missed_events():
+    log = UserEventLog(size=10, max_users=10)
+    epoch, seq, _ = log.resume("ada", None, 0)
+    log.append("ada", "jobUpdate", {"status": "running"})
+    log.append("ada", "jobUpdate", {"status": "succeeded"})
+
+    assert log.resume("ada", epoch, seq) == (epoch, 2, [
+        (1, "jobUpdate", {"status": "running"}),
+        (2, "jobUpdate", {"status": "succeeded"}),
+    ])
+
+
+def test_resume_across_eviction_reloads():
+    log = UserEventLog(size=10, max_users=1)
+    log.append("ada", "jobUpdate", {"status": "running"})
+    epoch, seq, _ = log.resume("ada", None, 0)
+
+    log.append("grace", "jobUpdate", {"status": "running"})  # Drops the log of ada.
+    for status in ("running", "succeeded", "failed"):
+        log.append("ada", "jobUpdate", {"status": status})
+
+    new_epoch, new_seq, events = log.resume("ada", epoch, seq)
+    assert events is None
+    assert (new_epoch, new_seq) != (epoch, seq)
+    assert log.resume("ada", new_epoch, new_seq) == (new_epoch, new_seq, [])
+
+
+def test_resume_after_overwritten_events_reloads():
+    log = UserEventLog(size=2, max_users=10)
+    epoch, seq, _ = log.resume("ada", None, 0)
+    for status in ("running", "succeeded", "failed"):
+        log.append("ada", "jobUpdate", {"status": status})
+
+    assert log.resume("ada", epoch, seq) == (epoch, 3, None)